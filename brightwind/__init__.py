@@ -1,8 +1,9 @@
+import sys
+from .utils.utils import _LazyModule
 from .load.load import *
-from .analyse import correlation as Correl
 from .analyse.shear import *
+from .analyse.weibull import *
 from .analyse.analyse import *
-from .analyse.plot import *
 from .transform.transform import *
 from .export.export import *
 from . import datasets
@@ -11,3 +12,13 @@ from . import datasets
 __all__ = ['analyse', 'transform', 'export', 'load', 'datasets']
 
 __version__ = '1.0.0'
+
+# Modules that pull in matplotlib, scikit-learn or scipy.odr are only imported when one of their names is first used
+# so that `import brightwind` stays fast.
+_lazy_attributes = {'Correl': ('.analyse.correlation', None),
+                    'plot_timeseries': ('.analyse.plot', 'plot_timeseries'),
+                    'plot_scatter': ('.analyse.plot', 'plot_scatter'),
+                    'plot_scatter_wspd': ('.analyse.plot', 'plot_scatter_wspd'),
+                    'plot_scatter_wdir': ('.analyse.plot', 'plot_scatter_wdir')}
+# a module subclass rather than a module level __getattr__, which needs Python 3.7
+sys.modules[__name__].__class__ = _LazyModule
@@ -0,0 +1,6 @@
+import sys
+from brightwind.utils.utils import _LazyModule
+
+_lazy_attributes = {name: ('.' + name, None) for name in ['analyse', 'correlation', 'plot', 'shear', 'weibull']}
+
+sys.modules[__name__].__class__ = _LazyModule
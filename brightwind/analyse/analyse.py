@@ -15,32 +15,153 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import itertools
 import pandas as pd
 import numpy as np
 from brightwind.transform import transform as tf
 from brightwind.utils import utils
-from brightwind.analyse import plot as plt
 from brightwind.utils.utils import _convert_df_to_series
-import matplotlib
 
 __all__ = ['concurrent_coverage',
            'monthly_means',
+           'calc_monthly_means',
            'momm',
            'dist',
+           'calc_dist',
            'dist_matrix',
+           'calc_dist_matrix',
            'dist_of_wind_speed',
            'dist_by_dir_sector',
+           'calc_dist_by_dir_sector',
+           'calc_direction_bin_codes',
            'dist_matrix_by_dir_sector',
+           'calc_dist_matrix_by_dir_sector',
            'dist_12x24',
+           'calc_dist_12x24',
+           'calc_dist_12x24_multi',
            'freq_distribution',
            'freq_table',
+           'calc_freq_table',
            'time_continuity_gaps',
+           'time_continuity_gaps_by_column',
            'coverage',
            'basic_stats',
            'TI',
+           'QuantileSketch',
+           'merge_quantile_sketches',
+           'WindDataCube',
            'sector_ratio',
+           'calc_sector_ratio',
+           'sector_ratios',
+           'calc_sector_ratios',
            'calc_air_density',
-           'average_wdirs']
+           'average_wdirs',
+           'average_wdirs_by_group']
+
+
+def _get_dist_matrix_var_label(var_series, var_label, aggregation_method):
+    if var_label is None:
+        var_name = var_series.name if var_series.name is not None else 'var_series'
+        if not isinstance(aggregation_method, str):
+            aggregation_method = aggregation_method.__name__
+        var_label = aggregation_method.capitalize() + ' of ' + var_name
+    return var_label
+
+
+def _check_plot_aggregation_method(aggregation_method):
+    if getattr(aggregation_method, '__self__', None) is QuantileSketch:
+        raise TypeError('A table of QuantileSketch can not be plotted. Use the calc_ version of this function to get '
+                        'the sketches, then merge_quantile_sketches and percentile to get values to plot.')
+
+
+def calc_dist_matrix(var_series, x_series, y_series,
+                     num_bins_x=None, num_bins_y=None,
+                     x_bins=None, y_bins=None,
+                     x_bin_labels=None, y_bin_labels=None,
+                     var_label=None, x_label=None, y_label=None,
+                     aggregation_method='%frequency'):
+    """
+    Calculates the distribution of a variable against two other variables, on an X-Y plane, without creating a plot.
+    See dist_matrix() for a description of the parameters.
+
+    :return: A distribution matrix with the binned y_series as rows and the binned x_series as columns.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        df = bw.load_csv(r'C:\\Users\\Stephen\\Documents\\Analysis\\demo_data.csv')
+
+        distribution = bw.calc_dist_matrix(df.Spd40mNStd, x_series=df.T2m, y_series=df.Spd40mN,
+                                           aggregation_method='mean')
+
+    """
+
+    var_series = _convert_df_to_series(var_series).dropna()
+    y_series = _convert_df_to_series(y_series).dropna()
+    x_series = _convert_df_to_series(x_series).dropna()
+
+    if x_label is not None:
+        x_series.name = x_label
+    if y_label is not None:
+        y_series.name = y_label
+    var_series.name = _get_dist_matrix_var_label(var_series, var_label, aggregation_method)
+    if y_series.name is None:
+        y_series.name = 'binned_var_1'
+    if x_series.name is None:
+        x_series.name = 'binned_var_2'
+    if x_series.name == var_series.name:
+        x_series.name = x_series.name+"_binned"
+    if y_series.name == var_series.name:
+        y_series.name = y_series.name+"_binned"
+
+    if num_bins_x is None and x_bins is None:
+        x_bins = np.arange(int(np.floor(x_series.min())), int(np.ceil(x_series.max()) + 1 + (x_series.max() % 1 == 0)),
+                           1)
+    elif num_bins_x is not None and x_bins is None:
+        x_bins = np.linspace(x_series.min(), x_series.max(), num_bins_x + 1)
+    elif x_bins is not None:
+        x_bins = x_bins
+
+    if num_bins_y is None and y_bins is None:
+        y_bins = np.arange(int(np.floor(y_series.min())), int(np.ceil(y_series.max()) + 1 + (y_series.max() % 1 == 0)),
+                           1)
+    elif num_bins_y is not None and y_bins is None:
+        y_bins = np.linspace(y_series.min(), y_series.max(), num_bins_y + 1)
+    elif y_bins is not None:
+        y_bins = y_bins
+
+    if aggregation_method in _BINNED_STATISTICS:
+        data = pd.concat([var_series.rename('var_data'), x_series.rename('x_data'), y_series.rename('y_data')],
+                         join='inner', axis=1)
+        y_bin_codes = _bin_codes(data['y_data'].values, y_bins)
+        x_bin_codes = _bin_codes(data['x_data'].values, x_bins)
+        in_bins = (y_bin_codes >= 0) & (x_bin_codes >= 0)
+        distribution = _binned_statistic_2d(y_bin_codes[in_bins], x_bin_codes[in_bins],
+                                            data['var_data'].values[in_bins], (len(y_bins) - 1, len(x_bins) - 1),
+                                            aggregation_method)
+        y_intervals = pd.cut(y_series.iloc[:0], y_bins, right=False).cat.categories
+        x_intervals = pd.cut(x_series.iloc[:0], x_bins, right=False).cat.categories
+        distribution = pd.DataFrame(
+            distribution,
+            index=pd.CategoricalIndex(y_intervals, categories=y_intervals, ordered=True, name=y_series.name),
+            columns=pd.MultiIndex.from_product(
+                [[var_series.name], pd.CategoricalIndex(x_intervals, categories=x_intervals, ordered=True)],
+                names=[None, x_series.name]))
+        if aggregation_method == 'count' and distribution.notnull().all().all():
+            distribution = distribution.astype(np.int64)
+    else:
+        var_binned_series_1 = pd.cut(y_series, y_bins, right=False).rename(y_series.name)
+        var_binned_series_2 = pd.cut(x_series, x_bins, right=False).rename(x_series.name)
+        data = pd.concat([var_series, var_binned_series_1, var_binned_series_2], join='inner',
+                         axis=1).dropna()
+        distribution = data.groupby([y_series.name, x_series.name]).agg(aggregation_method).unstack(level=-1)
+
+    if y_bin_labels is not None:
+        distribution.index = y_bin_labels
+    if x_bin_labels is not None:
+        distribution.columns = x_bin_labels
+    return distribution
 
 
 def dist_matrix(var_series, x_series, y_series,
@@ -115,63 +236,13 @@ def dist_matrix(var_series, x_series, y_series,
                               aggregation_method=custom_agg, return_data=True)
 
     """
-
-    var_series = _convert_df_to_series(var_series).dropna()
-    y_series = _convert_df_to_series(y_series).dropna()
-    x_series = _convert_df_to_series(x_series).dropna()
-
-    if x_label is not None:
-        x_series.name = x_label
-    if y_label is not None:
-        y_series.name = y_label
-    if var_series.name is None:
-        var_series.name = 'var_series'
-    if y_series.name is None:
-        y_series.name = 'binned_var_1'
-    if x_series.name is None:
-        x_series.name = 'binned_var_2'
-    if var_label is None:
-        var_label = aggregation_method.capitalize() + ' of ' + var_series.name
-    var_series.name = var_label
-    if x_series.name == var_series.name:
-        x_series.name = x_series.name+"_binned"
-    if y_series.name == var_series.name:
-        y_series.name = y_series.name+"_binned"
-
-    if num_bins_x is None and x_bins is None:
-        x_bins = np.arange(int(np.floor(x_series.min())), int(np.ceil(x_series.max()) + 1 + (x_series.max() % 1 == 0)),
-                           1)
-    elif num_bins_x is not None and x_bins is None:
-        x_bins = np.linspace(x_series.min(), x_series.max(), num_bins_x + 1)
-    elif x_bins is not None:
-        x_bins = x_bins
-
-    if num_bins_y is None and y_bins is None:
-        y_bins = np.arange(int(np.floor(y_series.min())), int(np.ceil(y_series.max()) + 1 + (y_series.max() % 1 == 0)),
-                           1)
-    elif num_bins_y is not None and y_bins is None:
-        y_bins = np.linspace(y_series.min(), y_series.max(), num_bins_y + 1)
-    elif y_bins is not None:
-        y_bins = y_bins
-
-    var_binned_series_1 = pd.cut(y_series, y_bins, right=False).rename(y_series.name)
-    var_binned_series_2 = pd.cut(x_series, x_bins, right=False).rename(x_series.name)
-    data = pd.concat([var_series, var_binned_series_1, var_binned_series_2], join='inner',
-                     axis=1).dropna()
-
-    if aggregation_method == '%frequency':
-        counts = data.groupby([y_series.name, x_series.name]).count().unstack(level=-1)
-        distribution = counts / (counts.sum().sum()) * 100.0
-    else:
-        distribution = data.groupby([y_series.name, x_series.name]).agg(aggregation_method).unstack(level=-1)
-
-    if y_bin_labels is not None:
-        distribution.index = y_bin_labels
-    if x_bin_labels is not None:
-        distribution.columns = x_bin_labels
-
-    if not isinstance(aggregation_method, str):
-        aggregation_method = aggregation_method.__name__
+    from brightwind.analyse import plot as plt
+    _check_plot_aggregation_method(aggregation_method)
+    var_label = _get_dist_matrix_var_label(_convert_df_to_series(var_series), var_label, aggregation_method)
+    distribution = calc_dist_matrix(var_series, x_series, y_series, num_bins_x=num_bins_x, num_bins_y=num_bins_y,
+                                    x_bins=x_bins, y_bins=y_bins, x_bin_labels=x_bin_labels,
+                                    y_bin_labels=y_bin_labels, var_label=var_label, x_label=x_label, y_label=y_label,
+                                    aggregation_method=aggregation_method)
 
     if x_bin_labels is None:
         x_bin_labels = [str(i[1]) for i in distribution.columns]
@@ -224,6 +295,34 @@ def calc_target_value_by_linear_model(ref_value: float, slope: float, offset: fl
     return (ref_value*slope) + offset
 
 
+def calc_monthly_means(data, return_coverage=False):
+    """
+    Calculates the means for calendar months of a timeseries without creating a plot. Input can be a series or a
+    DataFrame.
+
+    :param data: A timeseries to find monthly means of. Can have multiple columns
+    :type data: Series or DataFrame
+    :param return_coverage: To return the monthly coverage along with the monthly means.
+    :type return_coverage: bool
+    :return: The monthly means. If return_coverage is True it returns a tuple where the first element is the monthly
+        means and the second is the monthly coverage.
+    :rtype: pandas.Series or pandas.DataFrame or tuple
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.shell_flats_80m_csv)
+
+        monthly_means = bw.calc_monthly_means(data)
+        monthly_means, coverage = bw.calc_monthly_means(data.WS80mWS425NW_Avg, return_coverage=True)
+
+    """
+    df, covrg = tf.average_data_by_period(data, period='1MS', return_coverage=True)
+    if return_coverage:
+        return df, covrg
+    return df
+
+
 def monthly_means(data, return_data=False, return_coverage=False, ylabel='Wind speed [m/s]'):
     """
     Plots means for calendar months in a timeseries plot. Input can be a series or a DataFrame. Can
@@ -260,8 +359,9 @@ def monthly_means(data, return_data=False, return_coverage=False, ylabel='Wind s
         monthly_means_plot
 
     """
+    from brightwind.analyse import plot as plt
 
-    df, covrg = tf.average_data_by_period(data, period='1MS', return_coverage=True)
+    df, covrg = calc_monthly_means(data, return_coverage=True)
     if return_data and not return_coverage:
         return plt.plot_monthly_means(df, ylbl=ylabel), df
     if return_coverage:
@@ -312,16 +412,68 @@ def _get_direction_bin_labels(sectors, direction_bins, zero_centred=True):
     return mapper.values()
 
 
-def _map_direction_bin(wdir, bins, sectors):
-    kwargs = {}
-    if wdir == max(bins):
-        kwargs['right'] = True
+def _direction_bin_codes(directions, bins, sectors):
+    """
+    Returns the direction bin, from 1 to sectors, of each direction as compact integer codes. Bins include their lower
+    edge except a direction equal to the last bin edge, e.g. 360, which goes in the last bin. The bin above sectors,
+    i.e. the part of the zero centred first sector just below 360, wraps round to bin 1.
+
+    :param directions: Directions to bin. Must not contain NaNs.
+    :type directions: numpy.ndarray
+    :param bins: Monotonically increasing bin edges as returned by utils.get_direction_bin_array() or a custom
+        direction_bin_array.
+    :type bins: list or numpy.ndarray
+    :param sectors: Number of direction sectors.
+    :type sectors: int
+    :return: Bin codes, int8 unless there are too many bins for it.
+    :rtype: numpy.ndarray
+    """
+    bins = np.asarray(bins, dtype=float)
+    directions = np.asarray(directions, dtype=float)
+    codes = np.digitize(directions, bins)
+    codes[directions == bins.max()] = np.digitize(bins.max(), bins, right=True)
+    codes[codes == sectors + 1] = 1
+    return codes.astype(np.int8 if len(bins) <= np.iinfo(np.int8).max else np.int16)
+
+
+def calc_dist(var_series, var_to_bin_against=None, bins=None, bin_labels=None, aggregation_method='%frequency'):
+    """
+    Calculates the distribution of a variable against itself as per the bins specified, without creating a plot. Can
+    also pass another variable for finding distribution with respect to another variable. See dist() for a
+    description of the parameters.
+
+    :returns: A pandas.Series with bins as row indexes and column with statistics chosen by aggregation_method.
+    :rtype: pandas.Series
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        #For distribution of mean wind speeds with respect to temperature
+        spd_dist = bw.calc_dist(data.Spd40mN, var_to_bin_against=data.T2m, bins=[-10, 4, 12, 18, 30],
+                                bin_labels=['freezing', 'cold', 'mild', 'hot'], aggregation_method='mean')
+
+    """
+    if var_to_bin_against is None:
+        var_to_bin_against = var_series.copy(deep=False)
+    var_series = _convert_df_to_series(var_series)
+    var_to_bin_against = _convert_df_to_series(var_to_bin_against)
+    var_series = var_series.dropna()
+    var_to_bin_against = var_to_bin_against.dropna()
+    if bins is None:
+        bins = np.arange(round(var_to_bin_against.min()-0.5)-0.5, var_to_bin_against.max()+0.5, 1)
+    var_binned_series = pd.cut(var_to_bin_against, bins, right=False).rename('variable_bin')
+    data = pd.concat([var_series.rename('data'), var_binned_series], join='inner', axis=1)
+    if aggregation_method == '%frequency':
+        distribution = data.groupby(['variable_bin'])['data'].count().rename('%frequency')/len(data) * 100.0
+    elif aggregation_method == 'vector_mean':
+        distribution = average_wdirs_by_group(data['data'], data['variable_bin'])
     else:
-        kwargs['right'] = False
-    bin_num = np.digitize([wdir], bins, **kwargs)[0]
-    if bin_num == sectors+1:
-        bin_num = 1
-    return bin_num
+        distribution = data.groupby(['variable_bin'])['data'].agg(aggregation_method)
+    if bin_labels is not None:
+        distribution.index = bin_labels
+    return distribution
 
 
 def dist(var_series, var_to_bin_against=None, bins=None, bin_labels=None, x_label=None,
@@ -346,7 +498,8 @@ def dist(var_series, var_to_bin_against=None, bins=None, bin_labels=None, x_labe
                         data value.
     :type max_y_value: float, int
     :param aggregation_method: Statistical method used to find distribution. It can be mean, max, min, std, count,
-           %frequency or a custom function. Computes frequency in percentages by default.
+           %frequency or a custom function. Computes frequency in percentages by default. Use vector_mean for the
+           vector average of directions, see average_wdirs().
     :type aggregation_method: str or function
     :param return_data: Set to True if you want the data returned.
     :type return_data: bool
@@ -378,22 +531,12 @@ def dist(var_series, var_to_bin_against=None, bins=None, bin_labels=None, x_labe
                            bin_labels=['freezing', 'cold', 'mild', 'hot'], aggregation_method='mean')
 
     """
-    if var_to_bin_against is None:
-        var_to_bin_against = var_series.copy(deep=False)
-    var_series = _convert_df_to_series(var_series)
-    var_to_bin_against = _convert_df_to_series(var_to_bin_against)
-    var_series = var_series.dropna()
-    var_to_bin_against = var_to_bin_against.dropna()
+    from brightwind.analyse import plot as plt
+    _check_plot_aggregation_method(aggregation_method)
     if x_label is None:
-        x_label = var_to_bin_against.name
-    if bins is None:
-        bins = np.arange(round(var_to_bin_against.min()-0.5)-0.5, var_to_bin_against.max()+0.5, 1)
-    var_binned_series = pd.cut(var_to_bin_against, bins, right=False).rename('variable_bin')
-    data = pd.concat([var_series.rename('data'), var_binned_series], join='inner', axis=1)
-    if aggregation_method == '%frequency':
-        distribution = data.groupby(['variable_bin'])['data'].count().rename('%frequency')/len(data) * 100.0
-    else:
-        distribution = data.groupby(['variable_bin'])['data'].agg(aggregation_method)
+        x_label = _convert_df_to_series(var_series if var_to_bin_against is None else var_to_bin_against).name
+    distribution = calc_dist(var_series, var_to_bin_against=var_to_bin_against, bins=bins,
+                             aggregation_method=aggregation_method)
 
     if not isinstance(aggregation_method, str):
         aggregation_method = aggregation_method.__name__
@@ -461,10 +604,13 @@ def _binned_direction_series(direction_series, sectors, direction_bin_array=None
     """
     if direction_bin_array is None:
         direction_bin_array = utils.get_direction_bin_array(sectors)
-    return direction_series.dropna().apply(_map_direction_bin, bins=direction_bin_array, sectors=sectors)
+    direction_series = direction_series.dropna()
+    return pd.Series(_direction_bin_codes(direction_series.values, direction_bin_array, sectors),
+                     index=direction_series.index, name=direction_series.name)
 
 
-def _get_direction_binned_series(sectors, direction_series, direction_bin_array=None, direction_bin_labels=None):
+def _get_direction_binned_series(sectors, direction_series, direction_bin_array=None, direction_bin_labels=None,
+                                 direction_bin_codes=None):
     if direction_bin_array is None:
         direction_bin_array = utils.get_direction_bin_array(sectors)
         zero_centered = True
@@ -473,9 +619,95 @@ def _get_direction_binned_series(sectors, direction_series, direction_bin_array=
         zero_centered = False
     if direction_bin_labels is None:
         direction_bin_labels = _get_direction_bin_labels(sectors, direction_bin_array, zero_centered)
-    direction_binned_series = _binned_direction_series(direction_series, sectors, direction_bin_array)\
-        .rename('direction_bin')
-    return direction_binned_series, direction_bin_labels, sectors, direction_bin_array, zero_centered
+    if direction_bin_codes is None:
+        direction_binned_series = _binned_direction_series(direction_series, sectors, direction_bin_array)
+    else:
+        if direction_bin_codes.max() > sectors:
+            raise ValueError("direction_bin_codes have more sectors than sectors or direction_bin_array, they must be "
+                             "from calc_direction_bin_codes() with the same sectors and direction_bin_array.")
+        direction_binned_series = direction_bin_codes
+    return direction_binned_series.rename('direction_bin'), direction_bin_labels, sectors, direction_bin_array, \
+        zero_centered
+
+
+def calc_direction_bin_codes(direction_series, sectors=12, direction_bin_array=None):
+    """
+    Bins wind directions into direction sectors, from 1 to sectors, so that the bins of a wind vane can be found once
+    and reused by several analyses. Pass them as direction_bin_codes to calc_dist_by_dir_sector(), calc_freq_table()
+    or calc_dist_matrix_by_dir_sector() with the same sectors or direction_bin_array. Directions below the first edge
+    of a custom direction_bin_array, which it doesn't cover, are given 0.
+
+    :param direction_series: Series of wind directions between [0-360].
+    :type direction_series: pandas.Series
+    :param sectors: Number of direction sectors to bin in to. The first sector is centered at 0 by default. To change
+                    that behaviour specify direction_bin_array, which overwrites sectors.
+    :type sectors: int
+    :param direction_bin_array: (Optional) To change the default behaviour of the first sector centered at 0 assign an
+                                array of bins to this.
+    :type direction_bin_array: list, array, None
+    :returns: The direction sector of each timestamp with a direction.
+    :rtype: pandas.Series
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        dir_bins = bw.calc_direction_bin_codes(data.Dir78mS, sectors=12)
+        freq_tab = bw.calc_freq_table(data.Spd80mN, data.Dir78mS, direction_bin_codes=dir_bins)
+        temp_by_sector = bw.calc_dist_by_dir_sector(data.T2m, data.Dir78mS, aggregation_method='mean',
+                                                    direction_bin_codes=dir_bins)
+
+    """
+    direction_series = _convert_df_to_series(direction_series)
+    if direction_bin_array is not None:
+        sectors = len(direction_bin_array) - 1
+    return _binned_direction_series(direction_series, sectors, direction_bin_array)
+
+
+def calc_dist_by_dir_sector(var_series, direction_series, sectors=12, aggregation_method='%frequency',
+                            direction_bin_array=None, direction_bin_labels=None, direction_bin_codes=None):
+    """
+    Derive the distribution of a time series variable with respect to wind direction sectors without creating a
+    plot. See dist_by_dir_sector() for a description of the parameters.
+
+    :param direction_bin_codes: (Optional) The direction bins of direction_series from calc_direction_bin_codes(),
+                                with the same sectors or direction_bin_array, to reuse them rather than binning the
+                                directions again.
+    :type direction_bin_codes: pandas.Series
+    :returns: A pandas.Series with wind direction sector as row indexes and statistics chosen by aggregation_method.
+    :rtype: pandas.Series
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        df = bw.load_campbell_scientific(bw.datasets.demo_campbell_scientific_site_data)
+
+        distribution = bw.calc_dist_by_dir_sector(df.Spd40mN, df.Dir38mS, aggregation_method='std')
+
+    """
+    var_series = _convert_df_to_series(var_series)
+    direction_series = _convert_df_to_series(direction_series)
+    var_series = var_series.dropna()
+    direction_series = direction_series.dropna()
+    direction_binned_series, direction_bin_labels, sectors, direction_bin_array, zero_centered = \
+        _get_direction_binned_series(sectors, direction_series, direction_bin_array, direction_bin_labels,
+                                     direction_bin_codes)
+    data = pd.concat([var_series.rename('data'), direction_binned_series], join='inner', axis=1)
+    if aggregation_method == '%frequency':
+        result = data.groupby(['direction_bin'])['data'].count().rename('%frequency')/len(data) * 100.0
+    elif aggregation_method == 'vector_mean':
+        result = average_wdirs_by_group(data['data'], data['direction_bin'])
+    else:
+        result = data.groupby(['direction_bin'])['data'].agg(aggregation_method)
+
+    for i in range(1, sectors+1):
+        if not (i in result.index):
+            # a sector without data has no mean direction
+            result[i] = np.NaN if aggregation_method == 'vector_mean' else 0.0
+    result = result.sort_index()
+    result.index = direction_bin_labels
+    return result
 
 
 def dist_by_dir_sector(var_series, direction_series, sectors=12, aggregation_method='%frequency',
@@ -492,7 +724,8 @@ def dist_by_dir_sector(var_series, direction_series, sectors=12, aggregation_met
                     that behaviour specify direction_bin_array, which overwrites sectors.
     :type sectors: int
     :param aggregation_method: Statistical method used to find distribution it can be mean, max, min, std, count,
-            %frequency or a custom function. Computes frequency in percentages by default.
+            %frequency or a custom function. Computes frequency in percentages by default. Use vector_mean for the
+            vector average of directions, e.g. of another vane, see average_wdirs().
     :type aggregation_method: str
     :param direction_bin_array: Optional, to change default behaviour of first sector centered at 0 assign an array of
             bins to this.
@@ -523,38 +756,155 @@ def dist_by_dir_sector(var_series, direction_series, sectors=12, aggregation_met
             return_data=True)
 
     """
+    from brightwind.analyse import plot as plt
+    _check_plot_aggregation_method(aggregation_method)
+    result = calc_dist_by_dir_sector(var_series, direction_series, sectors=sectors,
+                                     aggregation_method=aggregation_method, direction_bin_array=direction_bin_array)
     var_series = _convert_df_to_series(var_series)
-    direction_series = _convert_df_to_series(direction_series)
-    var_series = var_series.dropna()
-    direction_series = direction_series.dropna()
-    direction_binned_series, direction_bin_labels, sectors, direction_bin_array, zero_centered = \
-        _get_direction_binned_series(sectors, direction_series, direction_bin_array, direction_bin_labels)
-    data = pd.concat([var_series.rename('data'), direction_binned_series], join='inner', axis=1)
-    if aggregation_method == '%frequency':
-        result = data.groupby(['direction_bin'])['data'].count().rename('%frequency')/len(data) * 100.0
-    else:
-        result = data.groupby(['direction_bin'])['data'].agg(aggregation_method)
-
-    for i in range(1, sectors+1):
-        if not (i in result.index):
-            result[i] = 0.0
-    result = result.sort_index()
-    result.index = _get_direction_bin_labels(sectors, direction_bin_array, zero_centered)
     if var_series.name is None:
         var_label = aggregation_method.capitalize() + ' of  var_series'
     else:
         var_label = aggregation_method.capitalize() + ' of ' + var_series.name
     graph = plt.plot_rose(result, var_label)
-    result.index = direction_bin_labels
+    if direction_bin_labels is not None:
+        result.index = direction_bin_labels
     if return_data:
         return graph, result
     else:
         return graph
 
 
+_BINNED_STATISTICS = ['%frequency', 'count', 'sum', 'mean', 'std']
+
+
+def _bin_codes(values, bins):
+    """
+    Returns the zero based bin of each value for bins which include their lower edge, [bin-start, bin-end), as with
+    pd.cut(values, bins, right=False). Values outside the bins, or NaN, are given -1.
+
+    Evenly spaced bins are found arithmetically and any value sitting on a bin edge is then nudged into the right bin
+    by comparing it against the edges, so the result is the same as for a search of the bins.
+    """
+    bins = np.asarray(bins, dtype=float)
+    values = np.asarray(values, dtype=float)
+    bin_widths = np.diff(bins)
+    if len(bin_widths) < 2 or not (bin_widths > 0).all() or \
+            not np.allclose(bin_widths, bin_widths[0], rtol=1e-9, atol=0):
+        codes = np.searchsorted(bins, values, side='right') - 1
+        codes[codes == len(bins) - 1] = -1
+        return codes
+    with np.errstate(invalid='ignore'):
+        in_bins = (values >= bins[0]) & (values < bins[-1])
+        codes = np.floor((values - bins[0]) / bin_widths[0])
+        codes[~in_bins] = 0
+        codes = np.clip(codes, 0, len(bin_widths) - 1).astype(np.int64)
+        codes -= values < bins[codes]
+        codes += values >= bins[codes + 1]
+    codes[~in_bins] = -1
+    return codes
+
+
+def _binned_statistic_2d(row_codes, col_codes, values, shape, aggregation_method):
+    """
+    Aggregates values into a 2D grid of bins using bincount on the flattened bin codes rather than a groupby. Bins
+    without any data are NaN, as they are for a groupby followed by an unstack.
+
+    :param row_codes: Zero based row bin of each value.
+    :type row_codes: numpy.ndarray
+    :param col_codes: Zero based column bin of each value.
+    :type col_codes: numpy.ndarray
+    :param values: Values to aggregate. Must not contain NaNs.
+    :type values: numpy.ndarray
+    :param shape: Number of row bins and column bins.
+    :type shape: tuple(int, int)
+    :param aggregation_method: One of _BINNED_STATISTICS.
+    :type aggregation_method: str
+    :return: The aggregated grid.
+    :rtype: numpy.ndarray
+    """
+    flat_codes = row_codes.astype(np.int64) * shape[1] + col_codes
+    counts = np.bincount(flat_codes, minlength=shape[0] * shape[1]).reshape(shape).astype(float)
+    sums, sums_of_squares, shift = None, None, 0.0
+    if aggregation_method == 'std':
+        # sums are taken about the overall mean to limit the loss of precision in sum of squares - sum squared
+        shift = values.mean() if len(values) else 0.0
+        values = values - shift
+        sums_of_squares = np.bincount(flat_codes, weights=values * values, minlength=shape[0] * shape[1]).reshape(shape)
+    if aggregation_method in ['sum', 'mean', 'std']:
+        sums = np.bincount(flat_codes, weights=values, minlength=shape[0] * shape[1]).reshape(shape).astype(float)
+    return _statistic_from_sums(counts, sums, sums_of_squares, shift, aggregation_method)
+
+
+def _statistic_from_sums(counts, sums, sums_of_squares, shift, aggregation_method):
+    """
+    Derives one of _BINNED_STATISTICS from the count, sum and sum of squares of the values in each bin, where the sums
+    are of the values less shift. Bins without any data are NaN.
+    """
+    counts = np.asarray(counts, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if aggregation_method == '%frequency':
+            result = counts / counts.sum() * 100.0
+        elif aggregation_method == 'count':
+            result = counts.copy()
+        elif aggregation_method == 'sum':
+            result = sums + shift * counts
+        elif aggregation_method == 'mean':
+            result = sums / counts + shift
+        elif aggregation_method == 'std':
+            result = np.sqrt(np.clip((sums_of_squares - sums * sums / counts) / (counts - 1), 0, None))
+            result[counts == 1] = np.NaN
+        else:
+            raise ValueError('aggregation_method must be one of ' + ', '.join(_BINNED_STATISTICS) + '.')
+    result[counts == 0] = np.NaN
+    return result
+
+
+def _binned_statistics(codes, values, num_bins, percentiles=()):
+    """
+    Finds the count, mean, std and any number of percentiles of the values in each bin in one pass. The values are
+    sorted once by bin and then by value so that each percentile can be taken by position within its bin, linearly
+    interpolated as in np.percentile. Bins without any data have a count of 0 and NaN statistics.
+
+    :param codes: Zero based bin of each value.
+    :type codes: numpy.ndarray
+    :param values: Values to aggregate. Must not contain NaNs.
+    :type values: numpy.ndarray
+    :param num_bins: Number of bins.
+    :type num_bins: int
+    :param percentiles: Percentiles, between 0 and 100, to find.
+    :type percentiles: list
+    :return: Arrays of the statistic for each bin with keys 'count', 'mean', 'std' and each percentile.
+    :rtype: dict
+    """
+    column_codes = np.zeros(len(codes), dtype=np.int64)
+    statistics = {'count': np.bincount(codes, minlength=num_bins)}
+    for aggregation_method in ['mean', 'std']:
+        statistics[aggregation_method] = _binned_statistic_2d(codes, column_codes, values, (num_bins, 1),
+                                                              aggregation_method)[:, 0]
+    if len(percentiles):
+        # sorting the values and then stable sorting their bins is much faster than a lexsort, more so when the bins
+        # fit an int16 and can be radix sorted
+        order = np.argsort(values)
+        bin_order = codes[order].astype(np.int16) if num_bins <= np.iinfo(np.int16).max else codes[order]
+        sorted_values = values[order[np.argsort(bin_order, kind='stable')]]
+        bin_starts = np.concatenate([[0], np.cumsum(statistics['count'])[:-1]])
+        for percentile in percentiles:
+            with np.errstate(invalid='ignore'):
+                positions = bin_starts + (statistics['count'] - 1) * percentile / 100.0
+                lower = np.clip(np.floor(positions), 0, max(len(values) - 1, 0)).astype(np.int64)
+                upper = np.clip(np.ceil(positions), 0, max(len(values) - 1, 0)).astype(np.int64)
+            if len(values):
+                result = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+            else:
+                result = np.full(num_bins, np.NaN)
+            result[statistics['count'] == 0] = np.NaN
+            statistics[percentile] = result
+    return statistics
+
+
 def _get_dist_matrix_by_dir_sector(var_series, var_to_bin_series, direction_series,
                                    var_bin_array, sectors=12, direction_bin_array=None, direction_bin_labels=None,
-                                   aggregation_method='%frequency'):
+                                   aggregation_method='%frequency', direction_bin_codes=None):
     var_series = _convert_df_to_series(var_series).dropna()
     var_to_bin_series = _convert_df_to_series(var_to_bin_series).dropna()
     direction_series = _convert_df_to_series(direction_series).dropna()
@@ -565,7 +915,29 @@ def _get_dist_matrix_by_dir_sector(var_series, var_to_bin_series, direction_seri
     if var_to_bin_series.name is None:
         var_to_bin_series.name = 'var_to_bin_by'
     direction_binned_series, direction_bin_labels, sectors, direction_bin_array, zero_centered = \
-        _get_direction_binned_series(sectors, direction_series, direction_bin_array, direction_bin_labels)
+        _get_direction_binned_series(sectors, direction_series, direction_bin_array, direction_bin_labels,
+                                     direction_bin_codes)
+
+    if aggregation_method in _BINNED_STATISTICS:
+        data = pd.concat([var_series.rename('var_data'), var_to_bin_series.rename('var_to_bin'),
+                          direction_binned_series], axis=1, join='inner')
+        var_bin_codes = _bin_codes(data['var_to_bin'].values, var_bin_array)
+        num_var_bins = len(var_bin_array) - 1
+        # directions a custom direction_bin_array doesn't cover have no sector
+        in_bins = (var_bin_codes >= 0) & (data['direction_bin'].values >= 1) & (data['direction_bin'].values <= sectors)
+        distribution = _binned_statistic_2d(var_bin_codes[in_bins], data['direction_bin'].values[in_bins] - 1,
+                                            data['var_data'].values[in_bins], (num_var_bins, sectors),
+                                            aggregation_method)
+        var_bins = pd.cut(var_to_bin_series.iloc[:0], var_bin_array, right=False).cat.categories
+        distribution = pd.DataFrame(distribution, columns=_get_direction_bin_labels(sectors, direction_bin_array,
+                                                                                    zero_centered),
+                                    index=pd.CategoricalIndex(var_bins, categories=var_bins, ordered=True,
+                                                              name=var_to_bin_series.name))
+        observed_sectors = distribution.columns[distribution.notnull().any()]
+        if aggregation_method == 'count' and distribution[observed_sectors].notnull().all().all():
+            # as from a groupby, counts are left as integers when every bin of the observed sectors has data
+            distribution = distribution.astype({label: np.int64 for label in observed_sectors})
+        return distribution
 
     var_binned_series = pd.cut(var_to_bin_series, var_bin_array, right=False).rename(var_to_bin_series.name)
     data = pd.concat([var_series.rename('var_data'), var_binned_series, direction_binned_series], axis=1).dropna()
@@ -584,10 +956,67 @@ def _get_dist_matrix_by_dir_sector(var_series, var_to_bin_series, direction_seri
     return distribution.sort_index()
 
 
-def dist_matrix_by_dir_sector(var_series, var_to_bin_by_series, direction_series,
-                              num_bins=None, var_to_bin_by_array=None, var_to_bin_by_labels=None,
-                              sectors=12, direction_bin_array=None, direction_bin_labels=None,
-                              aggregation_method='mean', return_data=False):
+def calc_dist_matrix_by_dir_sector(var_series, var_to_bin_by_series, direction_series,
+                                   num_bins=None, var_to_bin_by_array=None, var_to_bin_by_labels=None,
+                                   sectors=12, direction_bin_array=None, direction_bin_labels=None,
+                                   aggregation_method='mean', direction_bin_codes=None):
+    """
+    Calculates a distribution matrix of a variable against another variable and wind direction without creating a
+    plot. See dist_matrix_by_dir_sector() for a description of the parameters.
+
+    :param direction_bin_codes: (Optional) The direction bins of direction_series from calc_direction_bin_codes(),
+                                with the same sectors or direction_bin_array, to reuse them rather than binning the
+                                directions again.
+    :type direction_bin_codes: pandas.Series
+
+    :return: A distribution matrix for the given variable
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        dist_mat = bw.calc_dist_matrix_by_dir_sector(data.T2m, data.Spd80mN, data.Dir38mS)
+
+    """
+
+    if num_bins is None and var_to_bin_by_array is None:
+        var_to_bin_by_array = np.arange(int(np.floor(var_to_bin_by_series.min())),
+                                        int(np.ceil(var_to_bin_by_series.max()) + 1 +
+                                            (var_to_bin_by_series.max() % 1 == 0)), 1)
+    elif num_bins is not None and var_to_bin_by_array is None:
+        var_to_bin_by_array = np.linspace(var_to_bin_by_series.min(), var_to_bin_by_series.max(), num_bins + 1)
+    elif var_to_bin_by_array is not None:
+        var_to_bin_by_array = var_to_bin_by_array
+
+    dist_mat_dir = _get_dist_matrix_by_dir_sector(var_series=var_series, var_to_bin_series=var_to_bin_by_series,
+                                                  direction_series=direction_series, var_bin_array=var_to_bin_by_array,
+                                                  sectors=sectors, direction_bin_array=direction_bin_array,
+                                                  direction_bin_labels=None, aggregation_method=aggregation_method,
+                                                  direction_bin_codes=direction_bin_codes)
+    if direction_bin_labels is not None:
+        dist_mat_dir.columns = direction_bin_labels
+    if var_to_bin_by_labels is not None:
+        dist_mat_dir.index = var_to_bin_by_labels
+
+    if var_series.name is None:
+        var_label = aggregation_method.capitalize() + ' of  var_series'
+    else:
+        var_label = aggregation_method.capitalize() + ' of ' + var_series.name
+    table_label = var_label
+
+    dist_mat_dir.columns = pd.MultiIndex(levels=[[table_label], dist_mat_dir.columns],
+                                         codes=[[0 for i in range(len(dist_mat_dir.columns))],
+                                                list(range(len(dist_mat_dir.columns)))],
+                                         names=[None, direction_series.name])
+    return dist_mat_dir
+
+
+def dist_matrix_by_dir_sector(var_series, var_to_bin_by_series, direction_series,
+                              num_bins=None, var_to_bin_by_array=None, var_to_bin_by_labels=None,
+                              sectors=12, direction_bin_array=None, direction_bin_labels=None,
+                              aggregation_method='mean', return_data=False):
     """
     Calculates a distribution matrix of a variable against another variable and wind direction. Returns a plot
     of the distribution matrix.
@@ -644,46 +1073,63 @@ def dist_matrix_by_dir_sector(var_series, var_to_bin_by_series, direction_series
                              var_to_bin_by_array=[0,4,8,12,16,20,24])
 
     """
+    from brightwind.analyse import plot as plt
+    _check_plot_aggregation_method(aggregation_method)
+
+    dist_mat_dir = calc_dist_matrix_by_dir_sector(var_series, var_to_bin_by_series, direction_series,
+                                                  num_bins=num_bins, var_to_bin_by_array=var_to_bin_by_array,
+                                                  var_to_bin_by_labels=var_to_bin_by_labels, sectors=sectors,
+                                                  direction_bin_array=direction_bin_array,
+                                                  direction_bin_labels=direction_bin_labels,
+                                                  aggregation_method=aggregation_method)
+    heatmap = plt.plot_dist_matrix(dist_mat_dir, dist_mat_dir.columns.get_level_values(0)[0],
+                                   xticklabels=dist_mat_dir.columns.get_level_values(1),
+                                   yticklabels=dist_mat_dir.index)
 
-    if num_bins is None and var_to_bin_by_array is None:
-        var_to_bin_by_array = np.arange(int(np.floor(var_to_bin_by_series.min())),
-                                        int(np.ceil(var_to_bin_by_series.max()) + 1 +
-                                            (var_to_bin_by_series.max() % 1 == 0)), 1)
-    elif num_bins is not None and var_to_bin_by_array is None:
-        var_to_bin_by_array = np.linspace(var_to_bin_by_series.min(), var_to_bin_by_series.max(), num_bins + 1)
-    elif var_to_bin_by_array is not None:
-        var_to_bin_by_array = var_to_bin_by_array
-
-    dist_mat_dir = _get_dist_matrix_by_dir_sector(var_series=var_series, var_to_bin_series=var_to_bin_by_series,
-                                                  direction_series=direction_series, var_bin_array=var_to_bin_by_array,
-                                                  sectors=sectors, direction_bin_array=direction_bin_array,
-                                                  direction_bin_labels=None, aggregation_method=aggregation_method)
-    if direction_bin_labels is not None:
-        dist_mat_dir.columns = direction_bin_labels
-    else:
-        direction_bin_labels = dist_mat_dir.columns
-    if var_to_bin_by_labels is not None:
-        dist_mat_dir.index = var_to_bin_by_labels
+    if return_data:
+        return heatmap, dist_mat_dir
     else:
-        var_to_bin_by_labels = dist_mat_dir.index
+        return heatmap
 
-    if var_series.name is None:
-        var_label = aggregation_method.capitalize() + ' of  var_series'
-    else:
-        var_label = aggregation_method.capitalize() + ' of ' + var_series.name
-    table_label = var_label
 
-    dist_mat_dir.columns = pd.MultiIndex(levels=[[table_label], dist_mat_dir.columns],
-                                         codes=[[0 for i in range(len(dist_mat_dir.columns))],
-                                                list(range(len(dist_mat_dir.columns)))],
-                                         names=[None, direction_series.name])
-    heatmap = plt.plot_dist_matrix(dist_mat_dir, var_label, xticklabels=direction_bin_labels,
-                                   yticklabels=var_to_bin_by_labels)
+def calc_freq_table(var_series, direction_series, var_bin_array=np.arange(-0.5, 41, 1), var_bin_labels=None,
+                    sectors=12, direction_bin_array=None, direction_bin_labels=None, freq_as_percentage=True,
+                    direction_bin_codes=None):
+    """
+    Accepts a variable series and direction series and computes a frequency table of percentages without creating a
+    plot. Both variable and direction are binned. See freq_table() for a description of the parameters.
 
-    if return_data:
-        return heatmap, dist_mat_dir
+    :param direction_bin_codes: (Optional) The direction bins of direction_series from calc_direction_bin_codes(),
+                                with the same sectors or direction_bin_array, to reuse them rather than binning the
+                                directions again.
+    :type direction_bin_codes: pandas.Series
+
+    :returns: A frequency table with the variable bins as rows and the direction sectors as columns.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        df = bw.load_campbell_scientific(bw.datasets.demo_campbell_scientific_site_data)
+
+        freq_table = bw.calc_freq_table(df.Spd40mN, df.Dir38mS, var_bin_array=[0,8,14,41],
+                                        var_bin_labels=['low', 'mid', 'high'])
+
+    """
+    if freq_as_percentage:
+        agg_method = '%frequency'
     else:
-        return heatmap
+        agg_method = 'count'
+    result = _get_dist_matrix_by_dir_sector(var_series=var_series, var_to_bin_series=var_series,
+                                            direction_series=direction_series, var_bin_array=var_bin_array,
+                                            sectors=sectors, direction_bin_array=direction_bin_array,
+                                            direction_bin_labels=None, aggregation_method=agg_method,
+                                            direction_bin_codes=direction_bin_codes).replace(np.nan, 0.0)
+    if direction_bin_labels is not None:
+        result.columns = direction_bin_labels
+    if var_bin_labels is not None:
+        result.index = var_bin_labels
+    return result
 
 
 def freq_table(var_series, direction_series, var_bin_array=np.arange(-0.5, 41, 1), var_bin_labels=None, sectors=12,
@@ -751,15 +1197,9 @@ def freq_table(var_series, direction_series, var_bin_array=np.arange(-0.5, 41, 1
                            plot_labels=None, return_data=True)
 
     """
-    if freq_as_percentage:
-            agg_method = '%frequency'
-    else:
-        agg_method = 'count'
-    result = _get_dist_matrix_by_dir_sector(var_series=var_series, var_to_bin_series=var_series,
-                                            direction_series=direction_series, var_bin_array=var_bin_array,
-                                            sectors=sectors, direction_bin_array=direction_bin_array,
-                                            direction_bin_labels=None, aggregation_method=agg_method).replace(np.nan,
-                                                                                                              0.0)
+    from brightwind.analyse import plot as plt
+    result = calc_freq_table(var_series, direction_series, var_bin_array=var_bin_array, sectors=sectors,
+                             direction_bin_array=direction_bin_array, freq_as_percentage=freq_as_percentage)
     if plot_bins is None:
         plot_bins = [0, 3, 6, 9, 12, 15, 41]
         if plot_labels is None:
@@ -811,21 +1251,68 @@ def time_continuity_gaps(data):
     """
     indexes = data.dropna(how='all').index
     resolution = tf._get_data_resolution(indexes)
-    # print(resolution)
-    continuity = pd.DataFrame({'Date From': indexes.values.flatten()[:-1],
-                               'Date To': indexes.values.flatten()[1:]})
-    continuity['Days Lost'] = (continuity['Date To'] - continuity['Date From']) / pd.Timedelta('1 days')
+    return _get_continuity_gaps(indexes.asi8, resolution.value)
 
-    # Remove indexes where no days are lost before returning
-    filtered = continuity[continuity['Days Lost'] != (tf._get_data_resolution(indexes) / pd.Timedelta('1 days'))]
 
+def _get_continuity_gaps(timestamps, resolution):
+    """
+    Finds the missing data periods in an array of int64 timestamps, in nanoseconds, from one np.diff. A missing period
+    runs from one resolution after the timestamp before it to one resolution before the timestamp after it.
+
+    :param timestamps: Timestamps in nanoseconds, as from DatetimeIndex.asi8.
+    :type timestamps: numpy.ndarray
+    :param resolution: Resolution of the data in nanoseconds.
+    :type resolution: int
+    :return: The start and end timestamps and days lost of each missing data period, indexed by the position of the
+             timestamp before it.
+    :rtype: pandas.DataFrame
+    """
+    gap_positions = np.flatnonzero(np.diff(timestamps) != resolution)
+    date_from = timestamps[gap_positions] + resolution
+    date_to = timestamps[gap_positions + 1] - resolution
+    days_lost = (date_to - date_from) / pd.Timedelta('1 days').value
     # where only one timestamp is lost replace 0 by resolution lost.
-    filtered['Date From'] = filtered['Date From'] + resolution
-    filtered['Date To'] = filtered['Date To'] - resolution
-    filtered['Days Lost'] = (filtered['Date To'] - filtered['Date From']) / pd.Timedelta('1 days')
-    filtered.replace(0, (tf._get_data_resolution(indexes) / pd.Timedelta('1 days')), inplace=True)
+    days_lost[days_lost == 0] = resolution / pd.Timedelta('1 days').value
+    return pd.DataFrame({'Date From': date_from.view('datetime64[ns]'), 'Date To': date_to.view('datetime64[ns]'),
+                         'Days Lost': days_lost}, index=gap_positions)
+
 
-    return filtered
+def time_continuity_gaps_by_column(data):
+    """
+    Returns the missing data periods of each column of the data, as for time_continuity_gaps(), along with a summary
+    of the number of periods, total days lost and longest period of each column. The resolution is found once from
+    the timestamps of the data as a whole and each column is then checked with one np.diff of its timestamps, so a
+    mast with many channels can be checked in one call.
+
+    :param data: Data for checking continuity, timestamp must be the index
+    :type data: pandas.DataFrame or pandas.Series
+    :return: A DataFrame of the start and end timestamps and days lost of the missing data periods, indexed by
+        Variable, and a DataFrame with the 'Number of Gaps', 'Days Lost' and 'Longest Gap' in days of each column.
+    :rtype: tuple(pandas.DataFrame, pandas.DataFrame)
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+        gaps, gaps_summary = bw.time_continuity_gaps_by_column(data)
+
+        # the missing data periods of one column
+        gaps.loc[['Spd80mN']]
+
+    """
+    data = pd.DataFrame(data)
+    resolution = tf._get_data_resolution(data.dropna(how='all').index).value
+    timestamps = data.index.asi8
+    is_valid = data.notnull().values
+    gaps = [_get_continuity_gaps(timestamps[is_valid[:, col]], resolution) for col in range(data.shape[1])]
+    gaps_summary = pd.DataFrame({'Number of Gaps': [len(column_gaps) for column_gaps in gaps],
+                                 'Days Lost': [column_gaps['Days Lost'].sum() for column_gaps in gaps],
+                                 'Longest Gap': [column_gaps['Days Lost'].max() if len(column_gaps) else 0.0
+                                                 for column_gaps in gaps]},
+                                index=data.columns, columns=['Number of Gaps', 'Days Lost', 'Longest Gap'])
+    gaps = pd.concat([column_gaps.reset_index(drop=True) for column_gaps in gaps], keys=data.columns,
+                     names=['Variable', None]).reset_index(level=1, drop=True)
+    return gaps, gaps_summary
 
 
 def coverage(data, period='1M', aggregation_method='mean'):
@@ -837,8 +1324,8 @@ def coverage(data, period='1M', aggregation_method='mean'):
     maximum number of data points in one period is 6. But if the number if data points available is only 3 for that
     hour the coverage is 3/6=0.5 . For more details see average_data_by_period as this function is a wrapper around it.
 
-    :param data: Data to find average or aggregate of
-    :type data: pandas.Series or pandas.DataFrame
+    :param data: Data to find average or aggregate of. Can also be an AggregationPyramid of the data.
+    :type data: pandas.Series or pandas.DataFrame or AggregationPyramid
     :param period: Groups data by the period specified here. The following formats are supported
 
             - Set period to 10min for 10 minute average, 20min for 20 minute average and so on for 4min, 15min, etc.
@@ -913,6 +1400,111 @@ def basic_stats(data):
         return data.to_frame().describe(percentiles=[0.5]).T.drop(['50%'], axis=1)
 
 
+def calc_dist_12x24(var_series, aggregation_method='mean'):
+    """
+    Accepts a variable series and returns a 12x24 (12 months x 24 hours) table for the 'mean' of the variable
+    without creating a plot. See dist_12x24() for a description of the parameters.
+
+    :return: A 12x24 table with hours as row labels and months as column labels
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        table12x24 = bw.calc_dist_12x24(data.PrcpTot, aggregation_method='sum')
+
+    """
+    if isinstance(var_series, pd.DataFrame):
+        var_series = var_series[var_series.columns[0]]
+    if aggregation_method in _BINNED_STATISTICS + ['vector_mean']:
+        table_12x24 = calc_dist_12x24_multi(var_series.rename('Variable').to_frame(),
+                                            aggregation_method=aggregation_method)
+        return table_12x24.loc['Variable'].unstack(level='Month')
+    table_12x24 = pd.concat([var_series.rename('Variable'), var_series.index.to_series().dt.month.rename('Month'),
+                             var_series.index.to_series().dt.hour.rename('Hour')], axis=1, join='inner')
+    return table_12x24.pivot_table(index='Hour', columns='Month', values='Variable', aggfunc=aggregation_method)
+
+
+def _get_month_hour_keys(timestamps, offset=None):
+    """
+    Returns the month (1 to 12) and hour (0 to 23) of each timestamp, worked out directly from the int64 nanoseconds
+    of the DatetimeIndex.
+    """
+    nanoseconds = timestamps.asi8
+    if offset is not None:
+        nanoseconds = nanoseconds + pd.Timedelta(offset).value
+    hours = (nanoseconds // 3600000000000) % 24
+    months = (nanoseconds // 86400000000000).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+    return months, hours
+
+
+def calc_dist_12x24_multi(data, aggregation_method='mean', offset=None):
+    """
+    Calculates the 12x24 (12 months x 24 hours) table of every column of a DataFrame in one pass. The month and hour
+    of each timestamp are worked out once and the 'mean', 'sum', 'std', 'count' and '%frequency' of all columns are
+    found together from grouped sums and counts. Other aggregation methods are passed to a pandas groupby.
+
+    :param data: Variables to compute the 12x24 tables for, e.g. all the anemometers, TIs and temperatures of a mast.
+    :type data: pandas.DataFrame or pandas.Series
+    :param aggregation_method: 'mean' by default, calculates mean of each variable passed. Can change it to
+            'sum', 'std', 'count', '%frequency', 'min', 'max' or 'vector_mean' for the vector average of directions.
+            Can also pass a function.
+    :type aggregation_method: str or function
+    :param offset: (Optional) A string specifying the time to offset the timestamps by before finding their month and
+                   hour, e.g. '1H' to add an hour or '-5H' to subtract five, to show data logged in UTC in local time.
+                   None by default.
+    :type offset: str
+    :return: The stacked 12x24 tables, indexed by Variable, Month and Hour. Only the month and hours with data are
+             included.
+    :rtype: pandas.Series
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        tables_12x24 = bw.calc_dist_12x24_multi(data[['Spd80mN', 'Spd60mN', 'T2m']], offset='1H')
+
+        # To get the 12x24 table of one of the variables, with hours as rows and months as columns
+        tables_12x24.loc['Spd80mN'].unstack(level='Month')
+
+    """
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    months, hours = _get_month_hour_keys(data.index, offset)
+
+    if aggregation_method not in _BINNED_STATISTICS:
+        grouped_data = data.groupby([months, hours])
+        if aggregation_method == 'vector_mean':
+            table_12x24 = average_wdirs_by_group(data, [months, hours]).T.stack(level=[0, 1], dropna=False)
+        else:
+            table_12x24 = grouped_data.agg(aggregation_method).T.stack(level=[0, 1], dropna=False)
+        table_12x24 = table_12x24[grouped_data.count().T.stack(level=[0, 1], dropna=False) > 0]
+        table_12x24.index.names = ['Variable', 'Month', 'Hour']
+        return table_12x24
+
+    values = data.values.astype(float)
+    is_valid = ~np.isnan(values)
+    month_hour_codes = np.broadcast_to(((months - 1) * 24 + hours)[:, None], values.shape)[is_valid]
+    variable_codes = np.broadcast_to(np.arange(values.shape[1]), values.shape)[is_valid]
+    counts = _binned_statistic_2d(variable_codes, month_hour_codes, values[is_valid], (values.shape[1], 12 * 24),
+                                  'count')
+    if aggregation_method == '%frequency':
+        # as for a single variable, the %frequency is of each variable's own data
+        table_12x24 = counts / np.nansum(counts, axis=1, keepdims=True) * 100.0
+    else:
+        table_12x24 = _binned_statistic_2d(variable_codes, month_hour_codes, values[is_valid],
+                                           (values.shape[1], 12 * 24), aggregation_method)
+    table_12x24 = pd.Series(table_12x24.ravel(), index=pd.MultiIndex.from_product(
+        [data.columns, np.arange(1, 13), np.arange(24)], names=['Variable', 'Month', 'Hour']))
+    table_12x24 = table_12x24[~np.isnan(counts.ravel())]
+    if aggregation_method == 'count':
+        table_12x24 = table_12x24.astype(np.int64)
+    return table_12x24
+
+
 def dist_12x24(var_series, aggregation_method='mean', var_name_label=None, return_data=False):
     """
     Accepts a variable series and returns a plot of 12x24 (12 months x 24 hours) for the 'mean' of the variable with
@@ -920,7 +1512,8 @@ def dist_12x24(var_series, aggregation_method='mean', var_name_label=None, retur
     :param var_series: Variable to compute 12x24 for
     :type var_series: pandas.Series
     :param aggregation_method: 'mean' by default, calculates mean of the variable passed. Can change it to
-            'sum', 'std', 'min', 'max', for sum, standard deviation, minimum, maximum. Can also pass a function.
+            'sum', 'std', 'min', 'max', for sum, standard deviation, minimum, maximum or 'vector_mean' for the vector
+            average of directions. Can also pass a function.
     :type aggregation_method: str or function
     :param var_name_label: (Optional) Label to appear on the plot, can be name and unit of the variable
     :type var_name_label: str
@@ -947,13 +1540,13 @@ def dist_12x24(var_series, aggregation_method='mean', var_name_label=None, retur
         graph, table12x24 = bw.dist_12x24(data.PrcpTot, aggregation_method=custom_agg, return_data=True)
 
     """
+    from brightwind.analyse import plot as plt
+    _check_plot_aggregation_method(aggregation_method)
     if isinstance(var_series, pd.DataFrame):
         var_series = var_series[var_series.columns[0]]
     if isinstance(var_series, pd.Series) and var_name_label is None:
         var_name_label = var_series.name
-    table_12x24 = pd.concat([var_series.rename('Variable'), var_series.index.to_series().dt.month.rename('Month'),
-                             var_series.index.to_series().dt.hour.rename('Hour')], axis=1, join='inner')
-    pvt_tbl = table_12x24.pivot_table(index='Hour', columns='Month', values='Variable', aggfunc=aggregation_method)
+    pvt_tbl = calc_dist_12x24(var_series, aggregation_method=aggregation_method)
     if not isinstance(aggregation_method, str):
         aggregation_method = aggregation_method.__name__
     if return_data:
@@ -962,6 +1555,225 @@ def dist_12x24(var_series, aggregation_method='mean', var_name_label=None, retur
     return plt.plot_12x24_contours(pvt_tbl, label=(var_name_label, aggregation_method))
 
 
+class QuantileSketch:
+    """
+    A mergeable KLL quantile sketch, for finding percentiles of more data than can be held in memory, e.g. multi-year
+    1 Hz or 20 Hz sonic data processed in chunks or across worker processes.
+
+    Values are kept in a stack of compactors. When a compactor is full its values are sorted and every second one,
+    starting from a random offset, is promoted to the compactor above with twice the weight. The capacity of the
+    compactors shrinks by 2/3 going down the stack, so the sketch never holds more than about 3 * k values however
+    many are added. Sketches built from different chunks can be merged and give the same accuracy as one sketch of all
+    the data.
+
+    The error is in the rank of the value returned. For a single quantile, with 99% confidence, it is within
+    2.296 / k^0.9723 of the count of values, about 1.3% for the default k of 200 and 0.3% for a k of 1000. This is the
+    empirical bound published for KLL sketches. Until more than k values have been added the sketch is exact and its
+    quantiles are linearly interpolated as in np.percentile.
+
+    **Example usage**
+    ::
+        import brightwind as bw
+
+        sketch = bw.QuantileSketch()
+        for chunk in chunks:
+            sketch.update(chunk.Spd80mN)
+        sketch.percentile(90)
+
+        # As the aggregation method of the distribution functions, to be merged across chunks
+        sketches = [bw.calc_dist(chunk.Spd80mN, var_to_bin_against=chunk.T2m, bins=[-10, 4, 12, 18, 30],
+                                 aggregation_method=bw.QuantileSketch.from_values) for chunk in chunks]
+        percentile_90 = bw.merge_quantile_sketches(*sketches).apply(lambda sketch: sketch.percentile(90))
+
+    """
+
+    def __init__(self, k=200, seed=None):
+        """
+        :param k: Controls the size and accuracy of the sketch. Must be at least 8.
+        :type k: int
+        :param seed: (Optional) Seed for the random offsets used when compacting, for repeatable results.
+        :type seed: int
+        """
+        if k < 8:
+            raise ValueError('k must be at least 8.')
+        self.k = int(k)
+        self.count = 0
+        self.min = np.NaN
+        self.max = np.NaN
+        self._levels = [np.empty(0)]
+        self._random_state = np.random.RandomState(seed)
+
+    @classmethod
+    def from_values(cls, values, k=200):
+        """
+        Returns a sketch of the values, ignoring NaNs. Can be passed as the aggregation method of calc_dist,
+        calc_dist_by_dir_sector, calc_dist_matrix and the other calc_ distribution functions to get a sketch for each
+        bin. The plotting functions, e.g. dist, raise a TypeError for it as a table of sketches can not be plotted.
+
+        :param values: Values to add to the sketch.
+        :type values: pandas.Series or numpy.ndarray
+        :param k: Controls the size and accuracy of the sketch.
+        :type k: int
+        :rtype: QuantileSketch
+        """
+        return cls(k).update(values)
+
+    def __repr__(self):
+        return 'QuantileSketch(k={}, count={})'.format(self.k, self.count)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def rank_error(self):
+        """
+        The 99% confidence bound on the error in the rank of a single quantile, as a fraction of the count.
+        """
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** (len(self._levels) - 1 - level))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            if len(self._levels[level]) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                values = np.sort(self._levels[level])
+                # an odd value out stays where it is, the rest are halved and promoted
+                self._levels[level] = values[len(values) - len(values) % 2:]
+                values = values[:len(values) - len(values) % 2]
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1],
+                                                          values[self._random_state.randint(2)::2]])
+            level += 1
+
+    def update(self, values):
+        """
+        Adds values to the sketch, ignoring NaNs.
+
+        :param values: Values to add to the sketch.
+        :type values: pandas.Series or numpy.ndarray or float
+        :return: The sketch itself.
+        :rtype: QuantileSketch
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.min = np.nanmin([self.min, values.min()])
+            self.max = np.nanmax([self.max, values.max()])
+            self._levels[0] = np.concatenate([self._levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Merges another sketch, e.g. of another chunk of data, into this one.
+
+        :param other: Sketch to merge in. It is not changed.
+        :type other: QuantileSketch
+        :return: The sketch itself.
+        :rtype: QuantileSketch
+        """
+        if other.count:
+            self.count += other.count
+            self.min = np.nanmin([self.min, other.min])
+            self.max = np.nanmax([self.max, other.max])
+            while len(self._levels) < len(other._levels):
+                self._levels.append(np.empty(0))
+            for level, values in enumerate(other._levels):
+                self._levels[level] = np.concatenate([self._levels[level], values])
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """
+        Returns the value at quantile q, or NaN if the sketch is empty. While the sketch still holds every value added
+        the quantile is linearly interpolated between them, as in np.percentile.
+
+        :param q: Quantile, or array of quantiles, between 0 and 1.
+        :type q: float or list or numpy.ndarray
+        :rtype: float or numpy.ndarray
+        """
+        q = np.asarray(q, dtype=float)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError('q must be between 0 and 1.')
+        if self.count == 0:
+            return np.full(q.shape, np.NaN)[()]
+        if len(self._levels[0]) == self.count:
+            return np.percentile(self._levels[0], q * 100.0)[()]
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level_values), 2.0 ** level)
+                                  for level, level_values in enumerate(self._levels)])
+        order = np.argsort(values, kind='mergesort')
+        cumulative_weights = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative_weights, q * cumulative_weights[-1], side='left')
+        result = values[order][np.clip(positions, 0, len(values) - 1)]
+        result = np.where(q == 0, self.min, np.where(q == 1, self.max, result))
+        return result[()]
+
+    def percentile(self, percentile):
+        """
+        Returns the value at a percentile, or NaN if the sketch is empty.
+
+        :param percentile: Percentile, or array of percentiles, between 0 and 100.
+        :type percentile: float or list or numpy.ndarray
+        :rtype: float or numpy.ndarray
+        """
+        return self.quantile(np.asarray(percentile, dtype=float) / 100.0)
+
+
+def _get_sketches_by_bin(codes, values, num_bins, k=200):
+    """
+    Returns a QuantileSketch of the values in each bin. Values with a code of -1, outside the bins, or NaN are left out.
+    """
+    is_valid = (codes >= 0) & ~np.isnan(values)
+    order = np.argsort(codes[is_valid], kind='stable')
+    values_by_bin = np.split(values[is_valid][order], np.cumsum(np.bincount(codes[is_valid], minlength=num_bins))[:-1])
+    return [QuantileSketch.from_values(bin_values, k=k) for bin_values in values_by_bin]
+
+
+def merge_quantile_sketches(*sketch_tables):
+    """
+    Merges tables of QuantileSketch, e.g. the distributions of a number of chunks of data found using
+    QuantileSketch.from_values as the aggregation method, bin by bin. Bins that are missing or NaN in some of the
+    tables are merged from the others. The sketches passed in are not changed.
+
+    :param sketch_tables: Tables of sketches with matching bins.
+    :type sketch_tables: pandas.Series or pandas.DataFrame
+    :return: A table of the merged sketches for all the bins.
+    :rtype: pandas.Series or pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+
+        sketches = [bw.TI.sketch_by_speed(chunk.Spd80mN, chunk.Spd80mNStd) for chunk in chunks]
+        rep_ti = bw.merge_quantile_sketches(*sketches).apply(lambda sketch: sketch.percentile(90))
+
+    """
+    def merge_sketches(*sketches):
+        merged_sketch = None
+        for sketch in sketches:
+            if isinstance(sketch, QuantileSketch):
+                if merged_sketch is None:
+                    merged_sketch = QuantileSketch(sketch.k)
+                merged_sketch.merge(sketch)
+        return merged_sketch if merged_sketch is not None else np.NaN
+
+    merged_table = sketch_tables[0].astype(object)
+    for sketch_table in sketch_tables[1:]:
+        merged_table = merged_table.align(sketch_table.astype(object), join='outer')[0]
+    aligned_tables = [sketch_table.astype(object).reindex_like(merged_table) for sketch_table in sketch_tables]
+    if isinstance(merged_table, pd.DataFrame):
+        merged_values = [[merge_sketches(*[table.iat[row, col] for table in aligned_tables])
+                          for col in range(merged_table.shape[1])] for row in range(merged_table.shape[0])]
+        return pd.DataFrame(merged_values, index=merged_table.index, columns=merged_table.columns)
+    return pd.Series([merge_sketches(*[table.iat[row] for table in aligned_tables])
+                      for row in range(len(merged_table))], index=merged_table.index, name=merged_table.name)
+
+
 class TI:
 
     @staticmethod
@@ -971,6 +1783,74 @@ class TI:
         ti = pd.concat([wspd[wspd > 3].rename('wspd'), wspd_std.rename('wspd_std')], axis=1, join='inner')
         return ti['wspd_std'] / ti['wspd']
 
+    @staticmethod
+    def _dist_by_speed(wspd, wspd_std, speed_bin_array, speed_bin_labels, percentile):
+        ti = pd.concat([wspd.rename('wspd'), wspd_std.rename('wspd_std')], axis=1, join='inner')
+        # as in TI.calc, without realigning the already aligned series
+        ti = ti[ti['wspd'] > 3].dropna()
+        ti['Turbulence_Intensity'] = ti['wspd_std'] / ti['wspd']
+        speed_bin_codes = _bin_codes(ti['wspd'].values, speed_bin_array)
+        in_bins = speed_bin_codes >= 0
+        ti_stats = _binned_statistics(speed_bin_codes[in_bins], ti['Turbulence_Intensity'].values[in_bins],
+                                      len(speed_bin_array) - 1, percentiles=[percentile])
+        speed_bins = pd.cut(ti['wspd'].iloc[:0], speed_bin_array, right=False).cat.categories
+        ti_dist = pd.DataFrame({'Mean_TI': ti_stats['mean'], 'TI_Count': ti_stats['count'],
+                                'Rep_TI': ti_stats[percentile], 'TI_2Sigma': ti_stats['std']},
+                               index=pd.CategoricalIndex(speed_bins, categories=speed_bins, ordered=True),
+                               columns=['Mean_TI', 'TI_Count', 'Rep_TI', 'TI_2Sigma'])
+        ti_dist.loc[:, 'Char_TI'] = ti_dist.loc[:, 'Mean_TI'] + (ti_dist.loc[:, 'TI_2Sigma'] / speed_bins.mid)
+        if speed_bin_labels is not None:
+            ti_dist.index = speed_bin_labels
+        ti_dist.index.rename('Speed Bin', inplace=True)
+        return ti_dist
+
+    @staticmethod
+    def calc_by_speed(wspd, wspd_std, speed_bin_array=np.arange(-0.5, 41, 1), speed_bin_labels=range(0, 41),
+                      percentile=90):
+        """
+        Accepts a wind speed series and its standard deviation, calculates turbulence intensity (TI) and returns the
+        distribution by of TI by speed bins without creating a plot. See TI.by_speed() for a description of the
+        parameters.
+
+        :return: TI distribution with columns names Mean_TI, TI_Count, Rep_TI, TI_2Sigma and Char_TI.
+        :rtype: pandas.DataFrame
+
+        """
+        wspd = _convert_df_to_series(wspd)
+        wspd_std = _convert_df_to_series(wspd_std)
+        return TI._dist_by_speed(wspd, wspd_std, speed_bin_array, speed_bin_labels, percentile).dropna(how='any')
+
+    @staticmethod
+    def sketch_by_speed(wspd, wspd_std, speed_bin_array=np.arange(-0.5, 41, 1), speed_bin_labels=range(0, 41), k=200):
+        """
+        Accepts a wind speed series and its standard deviation, calculates turbulence intensity (TI) and returns a
+        QuantileSketch of the TI in each speed bin. The sketches of each chunk of a long dataset can be merged with
+        merge_quantile_sketches to find the representative TI of all of the data in bounded memory. See TI.by_speed()
+        for a description of the other parameters.
+
+        :param k: Controls the size and accuracy of the sketches, see QuantileSketch.
+        :type k: int
+        :return: A sketch of the TI for every speed bin.
+        :rtype: pandas.Series
+
+        **Example usage**
+        ::
+            import brightwind as bw
+
+            sketches = [bw.TI.sketch_by_speed(chunk.Spd80mN, chunk.Spd80mNStd) for chunk in chunks]
+            rep_ti = bw.merge_quantile_sketches(*sketches).apply(lambda sketch: sketch.percentile(90))
+
+        """
+        ti = pd.concat([_convert_df_to_series(wspd).rename('wspd'), _convert_df_to_series(wspd_std).rename('wspd_std')],
+                       axis=1, join='inner')
+        ti = ti[ti['wspd'] > 3].dropna()
+        ti_sketches = _get_sketches_by_bin(_bin_codes(ti['wspd'].values, speed_bin_array),
+                                           (ti['wspd_std'] / ti['wspd']).values, len(speed_bin_array) - 1, k)
+        speed_bins = pd.cut(ti['wspd'].iloc[:0], speed_bin_array, right=False).cat.categories
+        return pd.Series(ti_sketches,
+                         index=speed_bins if speed_bin_labels is None else speed_bin_labels,
+                         name='TI_Sketch').rename_axis('Speed Bin')
+
     @staticmethod
     def by_speed(wspd, wspd_std, speed_bin_array=np.arange(-0.5, 41, 1), speed_bin_labels=range(0, 41),
                  percentile=90, IEC_class=None, return_data=False):
@@ -1004,41 +1884,50 @@ class TI:
         :rtype: pandas.DataFrame
 
         """
+        from brightwind.analyse import plot as plt
         wspd = _convert_df_to_series(wspd)
         wspd_std = _convert_df_to_series(wspd_std)
-        ti = pd.concat([wspd.rename('wspd'), wspd_std.rename('wspd_std')], axis=1, join='inner')
-        ti['Turbulence_Intensity'] = TI.calc(ti['wspd'], ti['wspd_std'])
-        ti_dist = pd.concat([
-            dist(var_series=ti['Turbulence_Intensity'], var_to_bin_against=ti['wspd'],
-                 bins=speed_bin_array, bin_labels=speed_bin_labels,
-                 aggregation_method='mean', return_data=True)[-1].rename("Mean_TI"),
-            dist(var_series=ti['Turbulence_Intensity'],
-                 var_to_bin_against=ti['wspd'],
-                 bins=speed_bin_array,
-                 bin_labels=speed_bin_labels,
-                 aggregation_method='count', return_data=True)[-1].rename("TI_Count"),
-            dist(var_series=ti['Turbulence_Intensity'],
-                 var_to_bin_against=ti['wspd'],
-                 bins=speed_bin_array,
-                 bin_labels=speed_bin_labels,
-                 aggregation_method=lambda x: np.percentile(x, q=percentile),
-                 return_data=True)[-1].rename("Rep_TI"),
-            dist(var_series=ti['Turbulence_Intensity'],
-                 var_to_bin_against=ti['wspd'],
-                 bins=speed_bin_array,
-                 bin_labels=speed_bin_labels,
-                 aggregation_method='std', return_data=True)[-1].rename("TI_2Sigma")], axis=1, join='inner')
-        categ_index = dist(var_series=ti['Turbulence_Intensity'], var_to_bin_against=ti['wspd'],
-                           bins=speed_bin_array, aggregation_method='mean', return_data=True)[-1].index
-        num_index = [i.mid for i in categ_index]
-        ti_dist.loc[:, 'Char_TI'] = ti_dist.loc[:, 'Mean_TI'] + (ti_dist.loc[:, 'TI_2Sigma'] / num_index)
-        # ti_dist.loc[0, 'Char_TI'] = 0
-        ti_dist.index.rename('Speed Bin', inplace=True)
-        # return ti_dist
+        ti_dist = TI._dist_by_speed(wspd, wspd_std, speed_bin_array, speed_bin_labels, percentile)
         if return_data:
             return plt.plot_TI_by_speed(wspd, wspd_std, ti_dist, IEC_class=IEC_class), ti_dist.dropna(how='any')
         return plt.plot_TI_by_speed(wspd, wspd_std, ti_dist, IEC_class=IEC_class)
 
+    @staticmethod
+    def _dist_by_sector(wspd, wspd_std, wdir, min_speed, sectors, direction_bin_array, direction_bin_labels):
+        ti = pd.concat([wspd.rename('wspd'), wspd_std.rename('wspd_std'), wdir.rename('wdir')], axis=1,
+                       join='inner')
+        ti = ti[ti['wspd'] >= min_speed]
+        ti['Turbulence_Intensity'] = TI.calc(ti['wspd'], ti['wspd_std'])
+        ti_dist = pd.concat([
+            calc_dist_by_dir_sector(var_series=ti['Turbulence_Intensity'],
+                                    direction_series=ti['wdir'],
+                                    sectors=sectors, direction_bin_array=direction_bin_array,
+                                    direction_bin_labels=direction_bin_labels,
+                                    aggregation_method='mean').rename("Mean_TI"),
+            calc_dist_by_dir_sector(var_series=ti['Turbulence_Intensity'],
+                                    direction_series=ti['wdir'],
+                                    sectors=sectors, direction_bin_array=direction_bin_array,
+                                    direction_bin_labels=direction_bin_labels,
+                                    aggregation_method='count').rename("TI_Count")], axis=1, join='outer')
+
+        ti_dist.index.rename('Direction Bin', inplace=True)
+        return ti, ti_dist
+
+    @staticmethod
+    def calc_by_sector(wspd, wspd_std, wdir, min_speed=0, sectors=12, direction_bin_array=None,
+                       direction_bin_labels=None):
+        """
+        Accepts a wind speed series, its standard deviation and a direction series, calculates turbulence intensity (TI)
+        and returns the distribution by of TI by sector without creating a plot. See TI.by_sector() for a description
+        of the parameters.
+
+        :return: TI distribution with columns names Mean_TI and TI_Count.
+        :rtype: pandas.DataFrame
+
+        """
+        return TI._dist_by_sector(wspd, wspd_std, wdir, min_speed, sectors, direction_bin_array,
+                                  direction_bin_labels)[1].dropna(how='all')
+
     @staticmethod
     def by_sector(wspd, wspd_std, wdir, min_speed=0, sectors=12, direction_bin_array=None,
                   direction_bin_labels=None, return_data=False):
@@ -1071,29 +1960,104 @@ class TI:
         :rtype: pandas.DataFrame
 
         """
-        ti = pd.concat([wspd.rename('wspd'), wspd_std.rename('wspd_std'), wdir.rename('wdir')], axis=1,
-                       join='inner')
-        ti = ti[ti['wspd'] >= min_speed]
-        ti['Turbulence_Intensity'] = TI.calc(ti['wspd'], ti['wspd_std'])
-        ti_dist = pd.concat([
-            dist_by_dir_sector(var_series=ti['Turbulence_Intensity'],
-                               direction_series=ti['wdir'],
-                               sectors=sectors, direction_bin_array=direction_bin_array,
-                               direction_bin_labels=direction_bin_labels,
-                               aggregation_method='mean', return_data=True)[-1].rename("Mean_TI"),
-            dist_by_dir_sector(var_series=ti['Turbulence_Intensity'],
-                               direction_series=ti['wdir'],
-                               sectors=sectors, direction_bin_array=direction_bin_array,
-                               direction_bin_labels=direction_bin_labels,
-                               aggregation_method='count', return_data=True)[-1].rename("TI_Count")],
-            axis=1, join='outer')
-
-        ti_dist.index.rename('Direction Bin', inplace=True)
+        from brightwind.analyse import plot as plt
+        ti, ti_dist = TI._dist_by_sector(wspd, wspd_std, wdir, min_speed, sectors, direction_bin_array,
+                                         direction_bin_labels)
         if return_data:
             return plt.plot_TI_by_sector(ti['Turbulence_Intensity'], ti['wdir'], ti_dist), ti_dist.dropna(how='all')
         else:
             return plt.plot_TI_by_sector(ti['Turbulence_Intensity'], ti['wdir'], ti_dist)
 
+    @staticmethod
+    def calc_cube(wspds, wspd_stds, wdir, speed_bin_array=np.arange(-0.5, 41, 1), speed_bin_labels=range(0, 41),
+                  sectors=12, direction_bin_array=None, direction_bin_labels=None, percentile=90):
+        """
+        Accepts the wind speeds of all the anemometers on a mast, their standard deviations and a direction series and
+        calculates the turbulence intensity (TI) by speed bin, direction sector and anemometer in one pass. TI is
+        calculated as in TI.calc and all the anemometers are binned against the one direction series.
+
+        :param wspds: Wind speed data of each anemometer.
+        :type wspds: pandas.DataFrame
+        :param wspd_stds: Wind speed standard deviation data of each anemometer, with the columns in the same order
+                          as wspds.
+        :type wspd_stds: pandas.DataFrame
+        :param wdir: Wind direction series
+        :type wdir: pandas.Series
+        :param speed_bin_array: (Optional) Array of wind speeds where adjacent elements of array form a bin
+        :type speed_bin_array: List or array
+        :param speed_bin_labels: (Optional) Labels to use for speed bins, 0, 1, 2, 3 .. and so on by default
+        :type speed_bin_labels: List, range or array
+        :param sectors: Set the number of direction sectors. Usually 12, 16, 24, 36 or 72.
+        :type sectors: int
+        :param direction_bin_array: (Optional) To change default behaviour of first sector centered at 0 assign an
+            array of bins to this
+        :param direction_bin_labels: (Optional) you can specify an array of labels to be used for the bins. uses string
+                labels of the format '30-90' by default
+        :param percentile: The percentile representative of TI
+        :type percentile: float, int
+        :return: TI distribution indexed by Anemometer, Speed Bin and Direction Bin with columns Mean_TI, TI_Count,
+                 Rep_TI, TI_2Sigma and Char_TI, as for TI.by_speed. Every combination of bins is included, those
+                 without data have a TI_Count of 0.
+        :rtype: pandas.DataFrame
+
+        **Example usage**
+        ::
+            import brightwind as bw
+            data = bw.load_csv(bw.datasets.demo_data)
+
+            ti_cube = bw.TI.calc_cube(data[['Spd80mN', 'Spd60mN', 'Spd40mN']],
+                                      data[['Spd80mNStd', 'Spd60mNStd', 'Spd40mNStd']], data.Dir78mS)
+
+            # The TI by speed bin and direction sector of one anemometer
+            ti_cube.loc['Spd80mN', 'Mean_TI'].unstack(level='Direction Bin')
+
+            # The TI by anemometer and direction sector of the 5 m/s speed bin
+            ti_cube.xs(5, level='Speed Bin')
+
+        """
+        wspds = pd.DataFrame(wspds)
+        wspd_stds = pd.DataFrame(wspd_stds)
+        if wspds.shape[1] != wspd_stds.shape[1]:
+            raise ValueError('wspds and wspd_stds must have the same number of columns.')
+        direction_binned_series, direction_bin_labels, sectors, direction_bin_array, zero_centered = \
+            _get_direction_binned_series(sectors, _convert_df_to_series(wdir).dropna(), direction_bin_array,
+                                         direction_bin_labels)
+        data = pd.concat([wspds, wspd_stds, direction_binned_series], axis=1, join='inner')
+        wspd_values = data.iloc[:, :wspds.shape[1]].values.astype(float)
+        wspd_std_values = data.iloc[:, wspds.shape[1]:2 * wspds.shape[1]].values.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ti_values = wspd_std_values / wspd_values
+            ti_values[~(wspd_values > 3)] = np.NaN
+
+        num_speed_bins = len(speed_bin_array) - 1
+        speed_bin_codes = _bin_codes(wspd_values.ravel(), speed_bin_array).reshape(wspd_values.shape)
+        direction_bin_codes = np.broadcast_to(data.iloc[:, -1].values[:, None].astype(np.int64) - 1,
+                                              wspd_values.shape)
+        anemometer_codes = np.broadcast_to(np.arange(wspds.shape[1]), wspd_values.shape)
+        # directions a custom direction_bin_array doesn't cover have no sector
+        is_valid = ~np.isnan(ti_values) & (speed_bin_codes >= 0) & (direction_bin_codes >= 0) & \
+            (direction_bin_codes < sectors)
+        cube_codes = (anemometer_codes[is_valid] * num_speed_bins + speed_bin_codes[is_valid]) * sectors + \
+            direction_bin_codes[is_valid]
+        ti_stats = _binned_statistics(cube_codes, ti_values[is_valid], wspds.shape[1] * num_speed_bins * sectors,
+                                      percentiles=[percentile])
+
+        speed_bins = pd.cut(pd.Series([], dtype=float), speed_bin_array, right=False).cat.categories
+        if speed_bin_labels is None:
+            speed_bin_labels = speed_bins
+        ti_cube = pd.DataFrame({'Mean_TI': ti_stats['mean'], 'TI_Count': ti_stats['count'],
+                                'Rep_TI': ti_stats[percentile], 'TI_2Sigma': ti_stats['std']},
+                               index=pd.MultiIndex(
+                                   levels=[wspds.columns, pd.Index(speed_bin_labels), pd.Index(direction_bin_labels)],
+                                   codes=[np.repeat(np.arange(wspds.shape[1]), num_speed_bins * sectors),
+                                          np.tile(np.repeat(np.arange(num_speed_bins), sectors), wspds.shape[1]),
+                                          np.tile(np.arange(sectors), wspds.shape[1] * num_speed_bins)],
+                                   names=['Anemometer', 'Speed Bin', 'Direction Bin']),
+                               columns=['Mean_TI', 'TI_Count', 'Rep_TI', 'TI_2Sigma'])
+        ti_cube['Char_TI'] = ti_cube['Mean_TI'] + ti_cube['TI_2Sigma'] / np.tile(
+            np.repeat(speed_bins.mid, sectors), wspds.shape[1])
+        return ti_cube
+
     @staticmethod
     def twelve_by_24(wspd, wspd_std, return_data=False, var_name_label='Turbulence Intensity'):
         tab_12x24, graph = dist_12x24(TI.calc(wspd, wspd_std), return_data=True, var_name_label=var_name_label)
@@ -1102,6 +2066,235 @@ class TI:
         return graph
 
 
+class WindDataCube:
+    """
+    Bins the data of a mast once, by month, hour, direction sector and wind speed bin, and keeps the count, sum and
+    sum of squares of each variable in every bin. Distributions such as the frequency table, the distribution by
+    direction sector, the 12x24 and TI by speed or sector can then be taken from the cube as a cheap reduction,
+    instead of re-binning and regrouping all of the data for each one. The tables returned match those of the
+    functions with the same names, for the speed bins and sectors the cube was built with.
+
+    Only the 'mean', 'sum', 'std', 'count' and '%frequency' can be found from the sums. The representative TI is taken
+    from a QuantileSketch of the TI in each speed bin, so matches TI.calc_by_speed() for the speed bins with up to
+    ti_sketch_k values and is within the rank error of the sketch for the others, see QuantileSketch.
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        cube = bw.WindDataCube(data.Spd80mN, data.Dir78mS, data=data[['T2m', 'P2m']], wspd_std=data.Spd80mNStd)
+
+        freq_tab = cube.calc_freq_table()
+        rose = cube.calc_dist_by_dir_sector()
+        temperature_12x24 = cube.calc_dist_12x24('T2m')
+        ti_by_speed = cube.calc_ti_by_speed()
+
+    """
+
+    def __init__(self, wspd, wdir, data=None, wspd_std=None, speed_bin_array=np.arange(-0.5, 41, 1), sectors=12,
+                 direction_bin_array=None, offset=None, ti_sketch_k=200):
+        """
+        :param wspd: Wind speed series, binned by speed.
+        :type wspd: pandas.Series
+        :param wdir: Wind direction series, binned by sector.
+        :type wdir: pandas.Series
+        :param data: (Optional) Other variables to keep the sums of, e.g. temperature or other anemometers.
+        :type data: pandas.DataFrame or pandas.Series
+        :param wspd_std: (Optional) Wind speed standard deviation, to keep the sums of the turbulence intensity, as
+                         calculated by TI.calc, under the variable name 'TI'.
+        :type wspd_std: pandas.Series
+        :param speed_bin_array: Array of wind speeds where adjacent elements of array form a bin.
+        :type speed_bin_array: list or numpy.ndarray
+        :param sectors: Number of direction sectors, the first centered at 0.
+        :type sectors: int
+        :param direction_bin_array: (Optional) Array of directions where adjacent elements form a sector, overrides
+                                    sectors.
+        :type direction_bin_array: list or numpy.ndarray
+        :param offset: (Optional) A string specifying the time to offset the timestamps by before finding their month
+                       and hour, e.g. '1H'. See calc_dist_12x24_multi().
+        :type offset: str
+        :param ti_sketch_k: Size of the QuantileSketch used for the representative TI.
+        :type ti_sketch_k: int
+        """
+        wspd = _convert_df_to_series(wspd)
+        wdir = _convert_df_to_series(wdir)
+        self.wspd_name = wspd.name if wspd.name is not None else 'wspd'
+        direction_binned_series, self.direction_bin_labels, self.sectors, self.direction_bin_array, \
+            self.zero_centered = _get_direction_binned_series(sectors, wdir.dropna(), direction_bin_array)
+        self.speed_bin_array = np.asarray(speed_bin_array, dtype=float)
+        self.speed_bins = pd.cut(pd.Series([], dtype=float), speed_bin_array, right=False).cat.categories
+
+        variables = [wspd.rename(self.wspd_name)]
+        if data is not None:
+            variables.append(pd.DataFrame(data))
+        if wspd_std is not None:
+            variables.append(_convert_df_to_series(wspd_std).rename('TI'))
+        data = pd.concat(variables + [direction_binned_series], axis=1)
+        if wspd_std is not None:
+            # as in TI.calc
+            data['TI'] = (data['TI'] / data[self.wspd_name]).where(data[self.wspd_name] > 3)
+        self.variables = list(data.columns[:-1])
+
+        # an extra sector holds the data without a direction or with one outside direction_bin_array, and two extra
+        # speed bins the data with a wind speed outside the speed bins and the data without a wind speed
+        num_speed_bins = len(self.speed_bin_array) - 1
+        self.shape = (12, 24, self.sectors + 1, num_speed_bins + 2)
+        months, hours = _get_month_hour_keys(data.index, offset)
+        direction_bin_codes = data.iloc[:, -1].fillna(0).values.astype(np.int64) - 1
+        direction_bin_codes[direction_bin_codes < 0] = self.sectors
+        speed_bin_codes = _bin_codes(data[self.wspd_name].values, self.speed_bin_array)
+        self.ti_sketches = _get_sketches_by_bin(speed_bin_codes, data['TI'].values, num_speed_bins, ti_sketch_k) \
+            if wspd_std is not None else None
+        speed_bin_codes[speed_bin_codes < 0] = num_speed_bins
+        speed_bin_codes[np.isnan(data[self.wspd_name].values)] = num_speed_bins + 1
+        cell_codes = np.ravel_multi_index((months - 1, hours, direction_bin_codes, speed_bin_codes), self.shape)
+
+        values = data.iloc[:, :-1].values.astype(float)
+        is_valid = ~np.isnan(values)
+        # sums are taken about the mean of each variable to limit the loss of precision in the std
+        self._shifts = np.array([values[is_valid[:, col], col].mean() if is_valid[:, col].any() else 0.0
+                                 for col in range(values.shape[1])])
+        values = values - self._shifts
+        codes = (np.arange(values.shape[1]) * int(np.prod(self.shape)) + cell_codes[:, None])[is_valid]
+        cube_shape = (values.shape[1],) + self.shape
+        self._counts = np.bincount(codes, minlength=int(np.prod(cube_shape))).reshape(cube_shape)
+        self._sums = np.bincount(codes, weights=values[is_valid],
+                                 minlength=int(np.prod(cube_shape))).reshape(cube_shape)
+        self._sums_of_squares = np.bincount(codes, weights=values[is_valid] ** 2,
+                                            minlength=int(np.prod(cube_shape))).reshape(cube_shape)
+
+    def __repr__(self):
+        return 'WindDataCube(variables={}, sectors={}, speed_bins={})'.format(
+            self.variables, self.sectors, len(self.speed_bins))
+
+    def _reduce(self, var_name, aggregation_method, axes, index, frequency_index):
+        """
+        Sums the cube of a variable over all but the given axes, (month, hour, sector, speed bin), and derives the
+        statistic for the part of the remaining axes selected by index. The %frequency is of all the data in the part
+        selected by frequency_index.
+        """
+        var_name = self.wspd_name if var_name is None else var_name
+        if var_name not in self.variables:
+            raise KeyError('{} is not one of the variables of the cube, {}.'.format(var_name, self.variables))
+        var_index = self.variables.index(var_name)
+        summed_axes = tuple(axis for axis in range(4) if axis not in axes)
+        counts, sums, sums_of_squares = [cube[var_index].sum(axis=summed_axes)
+                                         for cube in [self._counts, self._sums, self._sums_of_squares]]
+        result = _statistic_from_sums(counts[index], sums[index], sums_of_squares[index], self._shifts[var_index],
+                                      'count' if aggregation_method == '%frequency' else aggregation_method)
+        if aggregation_method == '%frequency':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = result / counts[frequency_index].sum() * 100.0
+        return result, counts[index]
+
+    def calc_freq_table(self, var_bin_labels=None, direction_bin_labels=None, freq_as_percentage=True):
+        """
+        Returns the frequency table of the wind speed by direction sector. See calc_freq_table().
+
+        :rtype: pandas.DataFrame
+        """
+        in_bins = (slice(0, self.sectors), slice(0, len(self.speed_bins)))
+        result, _ = self._reduce(None, '%frequency' if freq_as_percentage else 'count', (2, 3), in_bins, in_bins)
+        result = pd.DataFrame(np.nan_to_num(result.T), columns=self.direction_bin_labels,
+                              index=pd.CategoricalIndex(self.speed_bins, categories=self.speed_bins, ordered=True,
+                                                        name=self.wspd_name))
+        if direction_bin_labels is not None:
+            result.columns = direction_bin_labels
+        if var_bin_labels is not None:
+            result.index = var_bin_labels
+        return result
+
+    def calc_dist_by_dir_sector(self, var_name=None, aggregation_method='%frequency', direction_bin_labels=None):
+        """
+        Returns the distribution of a variable by direction sector. See calc_dist_by_dir_sector().
+
+        :param var_name: Variable of the cube, the wind speed by default.
+        :type var_name: str
+        :rtype: pandas.Series
+        """
+        in_sectors = slice(0, self.sectors)
+        result, counts = self._reduce(var_name, aggregation_method, (2,), in_sectors, in_sectors)
+        result[counts == 0] = 0.0
+        if aggregation_method == 'count':
+            result = result.astype(np.int64)
+        return pd.Series(result, name='%frequency' if aggregation_method == '%frequency' else 'data',
+                         index=self.direction_bin_labels if direction_bin_labels is None else direction_bin_labels)
+
+    def calc_dist_12x24(self, var_name=None, aggregation_method='mean'):
+        """
+        Returns the 12x24 table of a variable. See calc_dist_12x24().
+
+        :param var_name: Variable of the cube, the wind speed by default.
+        :type var_name: str
+        :rtype: pandas.DataFrame
+        """
+        every_hour = (slice(None), slice(None))
+        result, counts = self._reduce(var_name, aggregation_method, (0, 1), every_hour, every_hour)
+        result = pd.DataFrame(result.T, index=pd.Index(np.arange(24), name='Hour'),
+                              columns=pd.Index(np.arange(1, 13), name='Month'))
+        result = result.loc[counts.sum(axis=0) > 0, counts.sum(axis=1) > 0]
+        return result.astype(np.int64) if aggregation_method == 'count' else result
+
+    def calc_dist(self, var_name=None, aggregation_method='%frequency', bin_labels=None):
+        """
+        Returns the distribution of a variable by wind speed bin. See calc_dist(), for the wind speed this is the
+        distribution of dist_of_wind_speed().
+
+        :param var_name: Variable of the cube, the wind speed by default.
+        :type var_name: str
+        :rtype: pandas.Series
+        """
+        # the %frequency is of all the data with a wind speed, including those outside the speed bins
+        result, _ = self._reduce(var_name, aggregation_method, (3,), slice(0, len(self.speed_bins)),
+                                 slice(0, len(self.speed_bins) + 1))
+        result = pd.Series(result, name='%frequency' if aggregation_method == '%frequency' else 'data',
+                           index=pd.CategoricalIndex(self.speed_bins, categories=self.speed_bins, ordered=True,
+                                                     name='variable_bin'))
+        if aggregation_method in ['%frequency', 'count', 'sum']:
+            result = result.fillna(0)
+        if aggregation_method == 'count':
+            result = result.astype(np.int64)
+        if bin_labels is not None:
+            result.index = bin_labels
+        return result
+
+    def calc_ti_by_speed(self, speed_bin_labels=None, percentile=90):
+        """
+        Returns the TI distribution by speed bin, with columns Mean_TI, TI_Count, Rep_TI, TI_2Sigma and Char_TI. See
+        TI.calc_by_speed(). The cube must be built with wspd_std.
+
+        :rtype: pandas.DataFrame
+        """
+        if self.ti_sketches is None:
+            raise ValueError('The cube must be built with wspd_std to find the TI.')
+        ti_dist = pd.DataFrame({'Mean_TI': self.calc_dist('TI', 'mean').values,
+                                'TI_Count': self.calc_dist('TI', 'count').values,
+                                'Rep_TI': [sketch.percentile(percentile) for sketch in self.ti_sketches],
+                                'TI_2Sigma': self.calc_dist('TI', 'std').values},
+                               index=pd.CategoricalIndex(self.speed_bins, categories=self.speed_bins, ordered=True)
+                               if speed_bin_labels is None else speed_bin_labels,
+                               columns=['Mean_TI', 'TI_Count', 'Rep_TI', 'TI_2Sigma'])
+        ti_dist['Char_TI'] = ti_dist['Mean_TI'] + ti_dist['TI_2Sigma'] / self.speed_bins.mid.values
+        ti_dist.index.rename('Speed Bin', inplace=True)
+        return ti_dist.dropna(how='any')
+
+    def calc_ti_by_sector(self, direction_bin_labels=None):
+        """
+        Returns the TI distribution by direction sector, with columns Mean_TI and TI_Count. See TI.calc_by_sector().
+        The cube must be built with wspd_std.
+
+        :rtype: pandas.DataFrame
+        """
+        if self.ti_sketches is None:
+            raise ValueError('The cube must be built with wspd_std to find the TI.')
+        ti_dist = pd.concat([self.calc_dist_by_dir_sector('TI', 'mean', direction_bin_labels).rename('Mean_TI'),
+                             self.calc_dist_by_dir_sector('TI', 'count', direction_bin_labels).rename('TI_Count')],
+                            axis=1)
+        ti_dist.index.rename('Direction Bin', inplace=True)
+        return ti_dist.dropna(how='all')
+
+
 def _calc_ratio(var_1, var_2, min_var=3, max_var=50):
 
     var_1_bounded = var_1[(var_1 >= min_var) & (var_1 < max_var)]
@@ -1111,6 +2304,33 @@ def _calc_ratio(var_1, var_2, min_var=3, max_var=50):
     return ratio['var_2'] / ratio['var_1']
 
 
+def calc_sector_ratio(wspd_1, wspd_2, wdir, sectors=72, min_wspd=3, direction_bin_array=None):
+    """
+    Calculates the wind speed ratio of two wind speed time series averaged by direction sector, without creating a
+    plot. See sector_ratio() for a description of the parameters.
+
+    :returns: The average ratio by sector.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        sec_rat = bw.calc_sector_ratio(data.Spd80mN, data.Spd80mS, wdir=data.Dir78mS)
+
+    """
+    wspd_1 = _convert_df_to_series(wspd_1).dropna()
+    wspd_2 = _convert_df_to_series(wspd_2).dropna()
+    wdir = _convert_df_to_series(wdir).dropna()
+
+    sec_rat = _calc_ratio(wspd_1, wspd_2, min_wspd)
+    common_idxs = sec_rat.index.intersection(wdir.index)
+    sec_rat_dist = calc_dist_by_dir_sector(sec_rat.loc[common_idxs], wdir.loc[common_idxs], sectors=sectors,
+                                           aggregation_method='mean', direction_bin_array=direction_bin_array)
+    return sec_rat_dist.rename('Mean_Sector_Ratio').to_frame()
+
+
 def sector_ratio(wspd_1, wspd_2, wdir, sectors=72, min_wspd=3, direction_bin_array=None, boom_dir_1=-1,
                  boom_dir_2=-1, return_data=False):
     """
@@ -1161,17 +2381,15 @@ def sector_ratio(wspd_1, wspd_2, wdir, sectors=72, min_wspd=3, direction_bin_arr
                         direction_bin_array=[0, 45, 135, 180, 220, 360], boom_dir_1=0, boom_dir_2=180)
 
     """
+    from brightwind.analyse import plot as plt
     wspd_1 = _convert_df_to_series(wspd_1).dropna()
     wspd_2 = _convert_df_to_series(wspd_2).dropna()
     wdir = _convert_df_to_series(wdir).dropna()
 
+    sec_rat_dist = calc_sector_ratio(wspd_1, wspd_2, wdir, sectors=sectors, min_wspd=min_wspd,
+                                     direction_bin_array=direction_bin_array)
     sec_rat = _calc_ratio(wspd_1, wspd_2, min_wspd)
     common_idxs = sec_rat.index.intersection(wdir.index)
-    sec_rat_plot, sec_rat_dist = dist_by_dir_sector(sec_rat.loc[common_idxs], wdir.loc[common_idxs], sectors=sectors,
-                                                    aggregation_method='mean', direction_bin_array=direction_bin_array,
-                                                    direction_bin_labels=None,return_data=True)
-    matplotlib.pyplot.close()
-    sec_rat_dist = sec_rat_dist.rename('Mean_Sector_Ratio').to_frame()
     if return_data:
         return plt.plot_sector_ratio(sec_rat.loc[common_idxs], wdir.loc[common_idxs],
                                      sec_rat_dist, [wspd_1.name, wspd_2.name],
@@ -1181,6 +2399,125 @@ def sector_ratio(wspd_1, wspd_2, wdir, sectors=72, min_wspd=3, direction_bin_arr
                                  boom_dir_1=boom_dir_1, boom_dir_2=boom_dir_2)
 
 
+def _get_anemometer_pairs(wspds, pairs):
+    if pairs is None:
+        return list(itertools.combinations(wspds.columns, 2))
+    return [tuple(pair) for pair in pairs]
+
+
+def calc_sector_ratios(wspds, wdirs, pairs=None, sectors=72, min_wspd=3, direction_bin_array=None):
+    """
+    Calculates the wind speed ratio of every pair of anemometers averaged by the direction sectors of every wind vane,
+    without creating a plot, for commissioning checks of a whole mast. Each vane is binned once and the mean, count
+    and standard deviation of the ratios of all the pairs are found for it in one pass. The Mean_Sector_Ratio of each
+    pair and vane is the same as from calc_sector_ratio(). See sector_ratio() for a description of the other
+    parameters.
+
+    :param wspds: Wind speeds of all the anemometers.
+    :type wspds: pandas.DataFrame
+    :param wdirs: Wind directions of all the vanes.
+    :type wdirs: pandas.DataFrame or pandas.Series
+    :param pairs: (Optional) List of the (wspd_1, wspd_2) column names to compare, where wspd_1 is the divisor. By
+                  default every pair of columns is compared, the column that comes first being the divisor.
+    :type pairs: list(tuple(str, str))
+    :returns: A tidy table with a row for each pair, vane and direction sector, with columns Wspd_1, Wspd_2, Wdir,
+              Direction Bin, Mean_Sector_Ratio, Sector_Ratio_Count and Std_Sector_Ratio.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        sec_rats = bw.calc_sector_ratios(data[['Spd80mN', 'Spd80mS', 'Spd60mN', 'Spd60mS']],
+                                         data[['Dir78mS', 'Dir58mS']])
+
+        # The pairs with the largest spread of ratio in any sector
+        sec_rats.groupby(['Wspd_1', 'Wspd_2', 'Wdir'])['Std_Sector_Ratio'].max().sort_values()
+
+    """
+    wspds = pd.DataFrame(wspds)
+    wdirs = pd.DataFrame(wdirs)
+    pairs = _get_anemometer_pairs(wspds, pairs)
+    data = pd.concat([wspds, wdirs], axis=1, join='inner')
+    wspd_values = data[wspds.columns].values.astype(float)
+    with np.errstate(invalid='ignore'):
+        wspd_values[~((wspd_values >= min_wspd) & (wspd_values < 50))] = np.NaN
+        columns = list(wspds.columns)
+        ratios = wspd_values[:, [columns.index(pair[1]) for pair in pairs]] / \
+            wspd_values[:, [columns.index(pair[0]) for pair in pairs]]
+
+    sec_rats = []
+    for wdir_name in wdirs.columns:
+        direction_binned_series, direction_bin_labels, num_sectors, _, _ = \
+            _get_direction_binned_series(sectors, data[wdir_name], direction_bin_array)
+        direction_bin_codes = direction_binned_series.reindex(data.index).values
+        # NaN directions, and those a custom direction_bin_array doesn't cover with a code of 0, have no sector
+        is_valid = ~np.isnan(ratios) & (np.nan_to_num(direction_bin_codes) >= 1)[:, None]
+        pair_codes = np.broadcast_to(np.arange(len(pairs)), ratios.shape)[is_valid]
+        sector_codes = np.broadcast_to(direction_bin_codes[:, None], ratios.shape)[is_valid].astype(np.int64) - 1
+        stats = _binned_statistics(pair_codes * num_sectors + sector_codes, ratios[is_valid],
+                                   len(pairs) * num_sectors)
+        # as from calc_sector_ratio, sectors without data have a mean ratio of 0
+        stats['mean'][stats['count'] == 0] = 0.0
+        sec_rats.append(pd.DataFrame({'Wspd_1': np.repeat([pair[0] for pair in pairs], num_sectors),
+                                      'Wspd_2': np.repeat([pair[1] for pair in pairs], num_sectors),
+                                      'Wdir': wdir_name,
+                                      'Direction Bin': np.tile(list(direction_bin_labels), len(pairs)),
+                                      'Mean_Sector_Ratio': stats['mean'],
+                                      'Sector_Ratio_Count': stats['count'],
+                                      'Std_Sector_Ratio': stats['std']}))
+    return pd.concat(sec_rats, ignore_index=True)
+
+
+def sector_ratios(wspds, wdirs, pairs=None, sectors=72, min_wspd=3, direction_bin_array=None, boom_dirs=None,
+                  return_data=False):
+    """
+    Calculates the wind speed ratio of every pair of anemometers averaged by the direction sectors of every wind vane,
+    see calc_sector_ratios(), and plots each of them as in sector_ratio(). The plots are only made as they are asked
+    for, so looking at a few of them doesn't cost the plotting of all of them.
+
+    :param boom_dirs: (Optional) Boom direction in degrees of each anemometer, by column name. Anemometers that are
+                      top mounted, or left out, don't have a boom plotted.
+    :type boom_dirs: dict
+    :param return_data: Set to True if you want the data returned.
+    :type return_data: bool
+    :returns: A generator of ((wspd_1, wspd_2, wdir), plot) for each pair and vane and optionally the table from
+              calc_sector_ratios().
+    :rtype: generator, pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        plots, sec_rats = bw.sector_ratios(data[['Spd80mN', 'Spd80mS', 'Spd60mN', 'Spd60mS']],
+                                           data[['Dir78mS', 'Dir58mS']], boom_dirs={'Spd80mN': 0, 'Spd80mS': 180},
+                                           return_data=True)
+        (wspd_1, wspd_2, wdir), plot = next(plots)
+
+    """
+    wspds = pd.DataFrame(wspds)
+    wdirs = pd.DataFrame(wdirs)
+    boom_dirs = {} if boom_dirs is None else boom_dirs
+    sec_rats = calc_sector_ratios(wspds, wdirs, pairs=pairs, sectors=sectors, min_wspd=min_wspd,
+                                  direction_bin_array=direction_bin_array)
+
+    def plots():
+        from brightwind.analyse import plot as plt
+        for (wspd_1, wspd_2, wdir), sec_rat_dist in sec_rats.groupby(['Wspd_1', 'Wspd_2', 'Wdir'], sort=False):
+            sec_rat = _calc_ratio(wspds[wspd_1].dropna(), wspds[wspd_2].dropna(), min_wspd)
+            common_idxs = sec_rat.index.intersection(wdirs[wdir].dropna().index)
+            yield (wspd_1, wspd_2, wdir), plt.plot_sector_ratio(
+                sec_rat.loc[common_idxs], wdirs[wdir].loc[common_idxs],
+                sec_rat_dist.set_index('Direction Bin')[['Mean_Sector_Ratio']], [wspd_1, wspd_2],
+                boom_dir_1=boom_dirs.get(wspd_1, -1), boom_dir_2=boom_dirs.get(wspd_2, -1))
+
+    if return_data:
+        return plots(), sec_rats
+    return plots()
+
+
 def calc_air_density(temperature, pressure, elevation_ref=None, elevation_site=None, lapse_rate=-0.113,
                      specific_gas_constant=286.9):
     """
@@ -1241,7 +2578,8 @@ def average_wdirs(wdirs, wspds=None):
     """
     Average wind directions together using vector averaging.
 
-    :param wdirs: Wind directions to calculate the average of
+    :param wdirs: Wind directions to calculate the average of. Directions where either the direction or its wind
+                  speed is NaN are skipped.
     :type wdirs:  list or array or np.array or pd.Series
     :param wspds: Wind speeds for the magnitude of the wind direction vector.
                   If not provided the magnitude is assumed to be unity.
@@ -1269,20 +2607,58 @@ def average_wdirs(wdirs, wspds=None):
     negative (-6.9e-17) instead of zero which results in 270 instead of NaN. Similar for cosine when 90, 270 sent.
     Solution is to round both sin and cos to 5 decimal places to make them zero.
     """
+    return utils._vector_mean_dir(wdirs, wspds)
 
-    if wspds is None:
-        sine = np.mean(np.round(np.sin(np.deg2rad(wdirs)), 5))  # sin of each angle, East component
-        cosine = np.mean(np.round(np.cos(np.deg2rad(wdirs)), 5))  # cos of each angle, North component
-    else:
-        sine = np.mean(np.round(np.sin(np.deg2rad(wdirs)), 5) * wspds)  # sin of each angle, East component
-        cosine = np.mean(np.round(np.cos(np.deg2rad(wdirs)), 5) * wspds)  # cos of each angle, North component
 
-    # If both sine and cosine result in zero then all the directions cancel and you end up where you started which
-    # means there is no wind direction => return NaN
-    if sine == 0 and cosine == 0:
-        avg_dir = np.NaN
-    else:
-        avg_dir = np.rad2deg(np.arctan2(sine, cosine)) % 360
-        if avg_dir == 360.0:  # preference to have 0 returned instead of 360
-            avg_dir = 0.0
-    return avg_dir
+def average_wdirs_by_group(wdirs, by, wspds=None):
+    """
+    Average wind directions together using vector averaging, as in average_wdirs(), for every group at once, e.g. for
+    each hour or day, each direction sector of another vane or each month and hour. The sine and cosine of all the
+    directions are found together and summed by group, rather than calling average_wdirs() once for each group.
+    Groups whose vectors cancel out give NaN.
+
+    :param wdirs: Wind directions to calculate the average of. Each column of a DataFrame is averaged separately.
+                  Directions where either the direction or its wind speed is NaN are skipped.
+    :type wdirs: pandas.Series or pandas.DataFrame
+    :param by: Keys to group the directions by. Anything a pandas groupby accepts, e.g. a Series of labels with the
+               same index as wdirs, a list of them, or pd.Grouper(freq='1D') for periods.
+    :type by: pandas.Series or list or pandas.Grouper or numpy.ndarray
+    :param wspds: Wind speeds for the magnitude of the wind direction vectors. If not provided the magnitude is
+                  assumed to be unity. A Series is used for every column of wdirs.
+    :type wspds: pandas.Series or pandas.DataFrame
+    :return: Average wind direction of each group.
+    :rtype: pandas.Series or pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        import pandas as pd
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        # Daily mean direction weighted by wind speed
+        bw.average_wdirs_by_group(data.Dir78mS, pd.Grouper(freq='1D'), wspds=data.Spd80mN)
+
+        # Mean direction of one vane for each 30 degree sector of the other
+        sectors = pd.cut(data.Dir78mS, bins=range(0, 361, 30), right=False)
+        bw.average_wdirs_by_group(data.Dir58mS, sectors)
+
+        # Mean direction of each month and hour
+        bw.average_wdirs_by_group(data[['Dir78mS', 'Dir58mS']], [data.index.month, data.index.hour])
+
+    """
+    series_name = wdirs.name if isinstance(wdirs, pd.Series) else None
+    is_series = isinstance(wdirs, pd.Series)
+    wdirs = pd.DataFrame(wdirs)
+    if isinstance(wspds, pd.Series):
+        wspds = wspds.reindex(wdirs.index).values[:, None]
+    elif isinstance(wspds, pd.DataFrame):
+        wspds = wspds.reindex(wdirs.index).values
+    east, north = utils._direction_components(wdirs.values, wspds)
+    sums = pd.DataFrame(np.hstack([east, north]), index=wdirs.index).groupby(by).sum()
+    num_cols = wdirs.shape[1]
+    average_wdirs = pd.DataFrame(utils._direction_from_components(sums.values[:, :num_cols],
+                                                                  sums.values[:, num_cols:]),
+                                 index=sums.index, columns=wdirs.columns)
+    if is_series:
+        return average_wdirs[wdirs.columns[0]].rename(series_name)
+    return average_wdirs
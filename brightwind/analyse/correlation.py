@@ -18,12 +18,8 @@ import pandas as pd
 import numpy as np
 from typing import List
 from brightwind.transform import transform as tf
-from brightwind.analyse.plot import _scatter_plot
-from scipy.odr import ODR, RealData, Model
 from scipy.linalg import lstsq
 from brightwind.analyse.analyse import momm, _binned_direction_series
-from sklearn.svm import SVR as sklearn_SVR
-from sklearn.model_selection import cross_val_score as sklearn_cross_val_score
 from brightwind.utils import utils
 
 
@@ -98,6 +94,7 @@ class CorrelBase:
 
     def plot(self, title=""):
         """For plotting"""
+        from brightwind.analyse.plot import _scatter_plot
         return _scatter_plot(self.data['ref_spd'].values.flatten(), self.data['target_spd'].values.flatten(),
                              self._predict(self.data['ref_spd']).values.flatten())
 
@@ -211,6 +208,7 @@ class OrthogonalLeastSquares(CorrelBase):
         return 'Orthogonal Least Squares Model ' + str(self.params)
 
     def run(self, show_params=True):
+        from scipy.odr import ODR, RealData, Model
         fit_data = RealData(self.data['ref_spd'].values.flatten(), self.data['target_spd'].values.flatten())
         p, res = lstsq(np.nan_to_num(fit_data.x[:, np.newaxis] ** [1, 0]), np.nan_to_num(np.asarray(fit_data.y)
                                                                                          [:, np.newaxis]))[0:2]
@@ -238,9 +236,10 @@ class MultipleLinearRegression(CorrelBase):
         self.coverage_threshold = coverage_threshold
         self.preprocess = preprocess
         if preprocess:
-            self.data = pd.concat(list(tf._preprocess_data_for_correlations(
-                self.ref_spd, self.target_spd, averaging_prd, coverage_threshold)),
-                axis=1, join='inner')
+            # each reference is aligned with the target on its own, so one with gaps doesn't cost the others coverage
+            self.data = tf._preprocess_refs_for_correlations(
+                {'ref_spd_' + str(i + 1): ref for i, ref in enumerate(ref_spd)},
+                utils._convert_df_to_series(target_spd).rename('target_spd'), averaging_prd, coverage_threshold)
         else:
             self.data = pd.concat(list(self.ref_spd, self.target_spd), axis=1, join='inner')
         self.data.columns = ['ref_spd_' + str(i + 1) for i in range(0, len(self.ref_spd.columns))] + ['target_spd']
@@ -353,6 +352,7 @@ class SpeedSort(CorrelBase):
             return x.transform(linear_function, slope=self.params['slope'], offset=self.params['offset'])
 
         def plot_model(self, title):
+            from brightwind.analyse.plot import _scatter_plot
             _scatter_plot(sorted(self.sector_ref.values.flatten()), sorted(self.sector_target.values.flatten()),
                           sorted(self.sector_predict(self.sector_ref).values.flatten()))
 
@@ -399,8 +399,7 @@ class SpeedSort(CorrelBase):
     def _adjust_low_reference_speed_dir(self):
         idxs = self.data[(self.data['ref_spd'] < 2) & (self.data['target_spd'] > (self.data['ref_spd'] + 4))].index
 
-        self.data.loc[idxs, 'ref_dir'] = (self.data.loc[idxs, 'target_dir'] - self.overall_veer).apply(
-            utils._range_0_to_360)
+        self.data.loc[idxs, 'ref_dir'] = utils._range_0_to_360(self.data.loc[idxs, 'target_dir'] - self.overall_veer)
 
     @staticmethod
     def _get_veer_cutoff(speed_col):
@@ -408,16 +407,7 @@ class SpeedSort(CorrelBase):
 
     @staticmethod
     def _get_veer(ref_d, target_d):
-        def change_range(veer):
-            if veer > 180:
-                return veer - 360.0
-            elif veer < -180:
-                return veer + 360.0
-            else:
-                return veer
-
-        v = target_d - ref_d
-        return v.apply(change_range)
+        return utils._angular_difference(ref_d, target_d)
 
     def _avg_veer(self, sector_data):
         sector_data = sector_data[(sector_data['ref_spd'] >= self.ref_veer_cutoff) & (sector_data['target_spd'] >=
@@ -478,7 +468,7 @@ class SpeedSort(CorrelBase):
         x['sec_veer'] = [sec_veer[i - 1] for i in x['veer_bin']]
         x['multiply_factor'] = [sec_veer[i]-sec_veer[i-1] for i in x['veer_bin']]
         x['adjustment'] = x['sec_veer'] + (x['ratio']*x['multiply_factor'])
-        return (x['dir']+x['adjustment']).sort_index().apply(utils._range_0_to_360)
+        return utils._range_0_to_360((x['dir']+x['adjustment']).sort_index())
 
     def _predict(self, x_spd, x_dir):
         x = pd.concat([x_spd.dropna().rename('spd'),
@@ -520,6 +510,7 @@ class SpeedSort(CorrelBase):
         """
         Plots reference and target directions in a scatter plot
         """
+        from brightwind.analyse.plot import _scatter_plot
 
         # _scatter_plot(self.ref_dir, self.target_dir,title='original data')
         _scatter_plot(
@@ -531,6 +522,7 @@ class SpeedSort(CorrelBase):
 class SVR(CorrelBase):
     def __init__(self, ref_spd, target_spd, averaging_prd, coverage_threshold, bw_model=0, preprocess=True,
                  **sklearn_args):
+        from sklearn.svm import SVR as sklearn_SVR
         CorrelBase.__init__(self, ref_spd, target_spd, averaging_prd, coverage_threshold, preprocess=preprocess)
         bw_models = [{'kernel': 'rbf', 'C': 30, 'gamma': 0.01}, {'kernel': 'linear', 'C': 10}]
         self.model = sklearn_SVR(**{**bw_models[bw_model], **sklearn_args})
@@ -540,6 +532,7 @@ class SVR(CorrelBase):
         return 'Support Vector Regression Model ' + str(self.params)
 
     def run(self, show_params=True):
+        from sklearn.model_selection import cross_val_score as sklearn_cross_val_score
         if len(self.data['ref_spd'].values.shape) == 1:
             x = self.data['ref_spd'].values.reshape(-1, 1)
         else:
@@ -572,5 +565,6 @@ class SVR(CorrelBase):
 
     def plot(self, title=""):
         """For plotting"""
+        from brightwind.analyse.plot import _scatter_plot
         _scatter_plot(self.data['ref_spd'].values.flatten(), self.data['target_spd'].values.flatten(),
                       self._predict(self.data['ref_spd']).values.flatten(), prediction_marker='.')
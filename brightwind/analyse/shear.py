@@ -19,12 +19,8 @@ import numpy as np
 import datetime
 import calendar
 from math import e
-from brightwind.analyse import plot as plt
 # noinspection PyProtectedMember
 from brightwind.analyse.analyse import dist_by_dir_sector, dist_12x24, coverage, _convert_df_to_series
-from ipywidgets import FloatProgress
-from IPython.display import display
-from IPython.display import clear_output
 import re
 import warnings
 
@@ -94,6 +90,7 @@ class Shear:
                 pprint.pprint(timeseries_log_law.info)
 
            """
+            from IPython.display import clear_output
             print('This may take a while...')
 
             wspds, cvg = Shear._data_prep(wspds=wspds, heights=heights, min_speed=min_speed, maximise_data=maximise_data)
@@ -233,6 +230,7 @@ class Shear:
                 pprint.pprint(timeofday_log_law.info)
 
             """
+            from brightwind.analyse import plot as plt
 
             wspds, cvg = Shear._data_prep(wspds=wspds, heights=heights, min_speed=min_speed)
 
@@ -465,6 +463,7 @@ class Shear:
                 pprint.pprint(average_log_law.info)
 
             """
+            from brightwind.analyse import plot as plt
 
             wspds, cvg = Shear._data_prep(wspds=wspds, heights=heights, min_speed=min_speed)
 
@@ -619,6 +618,8 @@ class Shear:
                 pprint.pprint(by_sector_log_law.info)
 
             """
+            from brightwind.analyse import plot as plt
+            from IPython.display import clear_output
             print('This may take a while...')
             wspds, cvg = Shear._data_prep(wspds=wspds, heights=heights, min_speed=min_speed)
 
@@ -858,6 +859,7 @@ class Shear:
 
     @staticmethod
     def _by_12x24(wspds, heights, min_speed=3, return_data=False, var_name='Shear'):
+        from brightwind.analyse import plot as plt
         tab_12x24 = dist_12x24(wspds[(wspds > min_speed).all(axis=1)].apply(Shear._calc_power_law, heights=heights,
                                                                             axis=1), return_data=True)[1]
         if return_data:
@@ -932,6 +934,8 @@ class Shear:
 
     @staticmethod
     def _apply(self, wspds, height, shear_to, wdir=None):
+        from ipywidgets import FloatProgress
+        from IPython.display import display
         scaled_wspds = pd.Series([])
         result = pd.Series([])
 
@@ -0,0 +1,231 @@
+#     brightwind is a library that provides wind analysts with easy to use tools for working with meteorological data.
+#     Copyright (C) 2018 Stephen Holleran, Inder Preet
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU Lesser General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Lesser General Public License for more details.
+#
+#     You should have received a copy of the GNU Lesser General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pandas as pd
+import numpy as np
+# noinspection PyProtectedMember
+from brightwind.analyse.analyse import _get_direction_binned_series
+
+__all__ = ['calc_weibull',
+           'calc_weibull_from_freq_table']
+
+_WEIBULL_METHODS = ['moment', 'energy_pattern_factor']
+
+
+def _k_from_coefficient_of_variation(cv, k_min=0.05, k_max=50.0, iterations=60):
+    """
+    Finds the Weibull shape factor k whose coefficient of variation, sqrt(gamma(1+2/k)/gamma(1+1/k)^2 - 1), is cv for
+    every element of cv at once, by bisection of log k. The coefficient of variation falls monotonically with k.
+    """
+    from scipy.special import gammaln
+    log_k_low = np.full(cv.shape, np.log(k_min))
+    log_k_high = np.full(cv.shape, np.log(k_max))
+    for _ in range(iterations):
+        k = np.exp((log_k_low + log_k_high) / 2)
+        too_low = np.exp(gammaln(1 + 2 / k) - 2 * gammaln(1 + 1 / k)) - 1 > cv ** 2
+        log_k_low = np.where(too_low, np.log(k), log_k_low)
+        log_k_high = np.where(too_low, log_k_high, np.log(k))
+    k = np.exp((log_k_low + log_k_high) / 2)
+    k[np.isnan(cv)] = np.NaN
+    return k
+
+
+def _refine_weibull_mle(codes, values, weights, num_groups, k, means, max_iterations=50, tolerance=1e-10):
+    """
+    Refines the shape factor k of every group to its maximum likelihood estimate with Newton's method, all groups
+    stepping together, and returns the maximum likelihood A and k. Only values above zero take part. The values are
+    scaled by their group mean so that raising them to the power k can't overflow.
+    """
+    is_positive = values > 0
+    codes, weights = codes[is_positive], weights[is_positive]
+    log_values = np.log(values[is_positive] / means[codes])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_weights = np.bincount(codes, weights, minlength=num_groups)
+        mean_log_values = np.bincount(codes, weights * log_values, minlength=num_groups) / total_weights
+        k = k.copy()
+        for _ in range(max_iterations):
+            powered_weights = weights * np.exp(k[codes] * log_values)
+            sum_0 = np.bincount(codes, powered_weights, minlength=num_groups)
+            ratio_1 = np.bincount(codes, powered_weights * log_values, minlength=num_groups) / sum_0
+            ratio_2 = np.bincount(codes, powered_weights * log_values ** 2, minlength=num_groups) / sum_0
+            step = (ratio_1 - 1 / k - mean_log_values) / (ratio_2 - ratio_1 ** 2 + 1 / k ** 2)
+            new_k = np.where(k - step > 0, k - step, k / 2)
+            # groups without data stay NaN and don't hold up the others
+            converged = not np.any(np.abs(new_k - k) / new_k >= tolerance)
+            k = new_k
+            if converged:
+                break
+        sum_0 = np.bincount(codes, weights * np.exp(k[codes] * log_values), minlength=num_groups)
+        return means * (sum_0 / total_weights) ** (1 / k), k
+
+
+def _fit_weibull(codes, values, weights, num_groups, method='moment', mle=False):
+    """
+    Fits a Weibull distribution to the weighted values of every group at once from the weighted sums of the values,
+    their squares and their cubes for each group. The 'moment' method matches the mean and standard deviation and the
+    'energy_pattern_factor' method the mean and the mean of the cubes, i.e. the power density, using the
+    approximation k = 1 + 3.69/Epf^2. Optionally both A and k are then refined to their maximum likelihood estimates.
+
+    :return: The A and k of each group and the sum of the weights of each group.
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    from scipy.special import gammaln
+    if method not in _WEIBULL_METHODS:
+        raise ValueError('method must be one of ' + ', '.join(_WEIBULL_METHODS) + '.')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_weights = np.bincount(codes, weights, minlength=num_groups)
+        means = np.bincount(codes, weights * values, minlength=num_groups) / total_weights
+        if method == 'moment':
+            mean_squares = np.bincount(codes, weights * values ** 2, minlength=num_groups) / total_weights
+            k = _k_from_coefficient_of_variation(np.sqrt(np.clip(mean_squares - means ** 2, 0, None)) / means)
+        else:
+            energy_pattern_factor = np.bincount(codes, weights * values ** 3, minlength=num_groups) / total_weights / \
+                means ** 3
+            k = 1 + 3.69 / energy_pattern_factor ** 2
+        a = means / np.exp(gammaln(1 + 1 / k))
+    if mle:
+        a, k = _refine_weibull_mle(codes, values, weights, num_groups, k, means)
+    return a, k, total_weights
+
+
+def _weibull_table(names, direction_labels, a, k, total_weights, is_multi):
+    """
+    Arranges the fitted A and k of each name and direction bin, the last bin of each name being 'All', in a table
+    with the frequency of each direction bin as a percentage of its name's data.
+    """
+    groups = [(name, label) for name in names for label in list(direction_labels[name]) + ['All']]
+    num_groups = [len(direction_labels[name]) + 1 for name in names]
+    all_weights = np.repeat(total_weights[np.cumsum(num_groups) - 1], num_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frequencies = total_weights / all_weights * 100.0
+    if is_multi:
+        index = pd.MultiIndex.from_tuples(groups, names=['Variable', 'Direction Bin'])
+    else:
+        index = pd.Index([label for _, label in groups], name='Direction Bin')
+    return pd.DataFrame({'A': a, 'k': k, 'Frequency': frequencies}, index=index, columns=['A', 'k', 'Frequency'])
+
+
+def calc_weibull(wspds, wdir=None, sectors=12, direction_bin_array=None, method='moment', mle=False):
+    """
+    Fits the Weibull scale factor A and shape factor k to the wind speeds of every direction sector of every
+    anemometer at once, along with the frequency of each sector, e.g. for WAsP-style outputs. The count, sum, sum of
+    squares and sum of cubes of the wind speeds of all anemometers and sectors are found together and each fit is
+    derived from them, rather than fitting each sector of each anemometer in turn.
+
+    :param wspds: Wind speeds of one or more anemometers, e.g. at different heights.
+    :type wspds: pandas.Series or pandas.DataFrame
+    :param wdir: (Optional) Wind directions to fit each direction sector by. If not given only the omnidirectional
+                 fit is found. Timestamps without a direction are left out of every fit.
+    :type wdir: pandas.Series
+    :param sectors: Number of direction sectors to bin in to. The first sector is centered at 0 by default. To change
+                    that behaviour specify direction_bin_array, which overwrites sectors.
+    :type sectors: int
+    :param direction_bin_array: (Optional) To change the default behaviour of the first sector centered at 0 assign an
+                                array of bins to this.
+    :type direction_bin_array: list, array, None
+    :param method: 'moment' by default, to match the mean and standard deviation of the wind speeds. Can also be
+                   'energy_pattern_factor' to match the mean and the mean of the cubed wind speeds, i.e. the energy.
+    :type method: str
+    :param mle: Set to True to refine the fits to their maximum likelihood estimates, all at once with Newton's method.
+                Wind speeds of zero are left out of the maximum likelihood fits.
+    :type mle: bool
+    :returns: A, k and Frequency, as a percentage, of each direction bin and 'All' directions. Indexed by Variable and
+              Direction Bin if a DataFrame of wind speeds is given.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        weibull = bw.calc_weibull(data[['Spd80mN', 'Spd60mN', 'Spd40mN']], data.Dir78mS, sectors=12)
+
+        # The omnidirectional fit of each anemometer refined to the maximum likelihood estimates
+        bw.calc_weibull(data[['Spd80mN', 'Spd60mN', 'Spd40mN']], mle=True).xs('All', level='Direction Bin')
+
+    """
+    is_multi = isinstance(wspds, pd.DataFrame)
+    wspds = pd.DataFrame(wspds)
+    if wdir is None:
+        num_sectors, direction_bin_labels = 0, []
+        direction_bin_codes = np.ones(len(wspds))
+    else:
+        direction_binned_series, direction_bin_labels, num_sectors, _, _ = \
+            _get_direction_binned_series(sectors, pd.Series(wdir).dropna(), direction_bin_array)
+        direction_bin_codes = direction_binned_series.reindex(wspds.index).values
+    values = wspds.values.astype(float)
+    # NaN directions, and those a custom direction_bin_array doesn't cover with a code of 0, have no sector
+    is_valid = ~np.isnan(values) & (np.nan_to_num(direction_bin_codes) >= 1)[:, None]
+    variable_codes = np.broadcast_to(np.arange(values.shape[1]) * (num_sectors + 1), values.shape)[is_valid]
+    all_codes = variable_codes + num_sectors
+    if num_sectors:
+        sector_codes = variable_codes + np.broadcast_to(direction_bin_codes[:, None], values.shape)[is_valid]\
+            .astype(np.int64) - 1
+        codes = np.concatenate([sector_codes, all_codes])
+        values = np.tile(values[is_valid], 2)
+    else:
+        codes, values = all_codes, values[is_valid]
+    a, k, total_weights = _fit_weibull(codes, values, np.ones(len(values)), wspds.shape[1] * (num_sectors + 1),
+                                       method=method, mle=mle)
+    return _weibull_table(list(wspds.columns), {name: direction_bin_labels for name in wspds.columns}, a, k,
+                          total_weights, is_multi)
+
+
+def calc_weibull_from_freq_table(freq_tabs, method='moment', mle=False):
+    """
+    Fits the Weibull scale factor A and shape factor k to every direction sector of one or more frequency tables at
+    once, along with the frequency of each sector. Each wind speed bin is represented by its mid point. See
+    calc_weibull() for a description of the methods.
+
+    :param freq_tabs: Frequency distribution by wind speed and direction sector, as returned by freq_table(), or a
+                      dict of them, e.g. by height. The wind speed bins must be intervals, i.e. the default labels.
+    :type freq_tabs: pandas.DataFrame or dict
+    :param method: 'moment' by default. Can also be 'energy_pattern_factor'.
+    :type method: str
+    :param mle: Set to True to refine the fits to their maximum likelihood estimates. The bin centred on zero is left
+                out of the maximum likelihood fits.
+    :type mle: bool
+    :returns: A, k and Frequency, as a percentage, of each direction sector and 'All' directions. Indexed by Variable
+              and Direction Bin if a dict of frequency tables is given.
+    :rtype: pandas.DataFrame
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        freq_tabs = {80: bw.calc_freq_table(data.Spd80mN, data.Dir78mS),
+                     60: bw.calc_freq_table(data.Spd60mN, data.Dir58mS)}
+        weibull = bw.calc_weibull_from_freq_table(freq_tabs)
+
+    """
+    is_multi = isinstance(freq_tabs, dict)
+    if not is_multi:
+        freq_tabs = {None: freq_tabs}
+    codes, values, weights = [], [], []
+    offset = 0
+    for freq_tab in freq_tabs.values():
+        mid_points = np.array([interval.mid for interval in freq_tab.index], dtype=float)
+        frequencies = np.nan_to_num(freq_tab.values.astype(float))
+        frequencies = np.hstack([frequencies, frequencies.sum(axis=1, keepdims=True)])
+        codes.append(offset + np.broadcast_to(np.arange(frequencies.shape[1]), frequencies.shape).ravel())
+        values.append(np.broadcast_to(mid_points[:, None], frequencies.shape).ravel())
+        weights.append(frequencies.ravel())
+        offset += frequencies.shape[1]
+    a, k, total_weights = _fit_weibull(np.concatenate(codes), np.concatenate(values), np.concatenate(weights), offset,
+                                       method=method, mle=mle)
+    return _weibull_table(list(freq_tabs), {name: freq_tab.columns for name, freq_tab in freq_tabs.items()}, a, k,
+                          total_weights, is_multi)
@@ -17,7 +17,6 @@
 import pandas as pd
 import numpy as np
 import datetime
-import requests
 from typing import List
 import errno
 import os
@@ -26,7 +25,6 @@ import json
 from io import StringIO
 import warnings
 from dateutil.parser import parse
-from brightwind.analyse import plot as plt
 from time import sleep
 
 
@@ -500,6 +498,7 @@ class LoadBrightdata:
         :param query_params: dictionary of the query parameters to be sent
         :return: List(Node)
         """
+        import requests
         username = _get_environment_variable('BRIGHTDATA_USERNAME')
         password = _get_environment_variable('BRIGHTDATA_PASSWORD')
 
@@ -918,6 +917,7 @@ class _LoadBWPlatform:
 
     @staticmethod
     def _get_token():
+        import requests
         username = _get_environment_variable('BW_PLATFORM_USERNAME')
         password = _get_environment_variable('BW_PLATFORM_PASSWORD')
 
@@ -961,6 +961,7 @@ class _LoadBWPlatform:
 
         :return:
         """
+        import requests
         access_token = _LoadBWPlatform._get_token()
         headers = {'Authorization': 'Bearer ' + access_token}
         response = requests.get(_LoadBWPlatform._base_url + '/api/plants', headers=headers)
@@ -996,6 +997,7 @@ class _LoadBWPlatform:
         :return: A list of all the measurement locations you have access to.
         :rtype: List(Dict())
         """
+        import requests
         access_token = _LoadBWPlatform._get_token()
         headers = {'Authorization': 'Bearer ' + access_token}
         response = requests.get(_LoadBWPlatform._base_url + '/api/measurement-locations', headers=headers)
@@ -1028,6 +1030,7 @@ class _LoadBWPlatform:
         :param meas_loc_uuid:
         :return:
         """
+        import requests
         access_token = _LoadBWPlatform._get_token()
         headers = {'Authorization': 'Bearer ' + access_token}
         response = requests.get(_LoadBWPlatform._base_url + '/api/measurement-points', headers=headers, params={
@@ -1069,6 +1072,7 @@ class _LoadBWPlatform:
         :param meas_point_uuid:
         :return:
         """
+        import requests
         access_token = _LoadBWPlatform._get_token()
         headers = {'Authorization': 'Bearer ' + access_token}
         response = requests.get(_LoadBWPlatform._base_url + '/api/sensor-configs', headers=headers, params={
@@ -1114,6 +1118,7 @@ class _LoadBWPlatform:
             df
 
         """
+        import requests
         access_token = _LoadBWPlatform._get_token()
         headers = {'Authorization': 'Bearer ' + access_token}
 
@@ -1250,6 +1255,7 @@ class _LoadBWPlatform:
         :param return_data:
         :return:
         """
+        from brightwind.analyse import plot as plt
 
         meas_points_df = _LoadBWPlatform._get_meas_points_in_df(meas_loc_uuid, Include_Tilt_Angle=Include_Tilt_Angle)
         sen_configs_df = _LoadBWPlatform._get_sen_configs_in_df(meas_points_df)
@@ -4,6 +4,15 @@ import pandas as pd
 import numpy as np
 
 
+def _get_data(start='2017-01-01', periods=5000):
+    idx = pd.date_range(start, periods=periods, freq='10min')
+    rng = np.random.RandomState(5)
+    return pd.DataFrame({'Spd80mN': rng.weibull(2, len(idx)) * 8, 'Spd60mN': rng.weibull(2, len(idx)) * 7.5,
+                         'Spd80mNStd': rng.uniform(0.1, 2, len(idx)), 'Spd60mNStd': rng.uniform(0.1, 2, len(idx)),
+                         'Dir78mS': rng.uniform(0, 360, len(idx)), 'Dir58mS': rng.uniform(0, 360, len(idx)),
+                         'T2m': rng.normal(10, 5, len(idx))}, idx)
+
+
 def test_monthly_means():
     # Load data
     bw.monthly_means(bw.load_csv(bw.datasets.shell_flats_80m_csv))
@@ -28,6 +37,35 @@ def test_sector_ratio():
     assert True
 
 
+def test_sector_ratios():
+    idx = pd.date_range('2017-01-01', periods=5000, freq='10min')
+    rng = np.random.RandomState(4)
+    wspds = pd.DataFrame({name: rng.weibull(2, len(idx)) * 8 for name in ['Spd80mN', 'Spd80mS', 'Spd60mN']}, idx)
+    wspds.iloc[::7, 1] = np.NaN
+    wdirs = pd.DataFrame({'Dir78mS': rng.uniform(0, 360, len(idx)), 'Dir58mS': rng.uniform(0, 360, len(idx))}, idx)
+    wdirs.iloc[::11, 0] = np.NaN
+    sec_rats = bw.calc_sector_ratios(wspds, wdirs, sectors=12)
+    assert len(sec_rats) == 3 * 2 * 12
+    for (wspd_1, wspd_2, wdir), sec_rat in sec_rats.groupby(['Wspd_1', 'Wspd_2', 'Wdir']):
+        sec_rat_dist = bw.calc_sector_ratio(wspds[wspd_1], wspds[wspd_2], wdirs[wdir], sectors=12)
+        assert sec_rat['Direction Bin'].tolist() == sec_rat_dist.index.tolist()
+        assert np.allclose(sec_rat['Mean_Sector_Ratio'], sec_rat_dist['Mean_Sector_Ratio'])
+    sec_rats = bw.calc_sector_ratios(wspds, wdirs.Dir78mS, pairs=[('Spd60mN', 'Spd80mN')],
+                                     direction_bin_array=[0, 45, 135, 180, 220, 360])
+    assert np.allclose(sec_rats['Mean_Sector_Ratio'],
+                       bw.calc_sector_ratio(wspds.Spd60mN, wspds.Spd80mN, wdirs.Dir78mS,
+                                            direction_bin_array=[0, 45, 135, 180, 220, 360])['Mean_Sector_Ratio'])
+    # directions below the first edge of a custom direction_bin_array aren't counted anywhere
+    sec_rats = bw.calc_sector_ratios(wspds, wdirs.Dir78mS, pairs=[('Spd60mN', 'Spd80mN')],
+                                     direction_bin_array=[45, 135, 225, 315])
+    covered = wdirs.Dir78mS >= 45
+    assert np.allclose(sec_rats['Mean_Sector_Ratio'],
+                       bw.calc_sector_ratios(wspds[covered], wdirs.Dir78mS[covered], pairs=[('Spd60mN', 'Spd80mN')],
+                                             direction_bin_array=[45, 135, 225, 315])['Mean_Sector_Ratio'])
+    plots, sec_rats = bw.sector_ratios(wspds, wdirs, boom_dirs={'Spd80mN': 0, 'Spd80mS': 180}, return_data=True)
+    assert next(plots)[0] == ('Spd80mN', 'Spd80mS', 'Dir78mS')
+
+
 def test_basic_stats():
     data = bw.load_csv(bw.datasets.shell_flats_80m_csv)
     bw.basic_stats(data)
@@ -50,6 +88,19 @@ def test_time_continuity_gaps():
     assert abs(gaps.iloc[1, 2] - 0.006944) < 1e-5
 
 
+def test_time_continuity_gaps_by_column():
+    idx = pd.date_range('2017-01-01', periods=100, freq='10min').delete([10, 50, 51, 52])
+    data = pd.DataFrame({'Spd80mN': np.ones(len(idx)), 'T2m': np.ones(len(idx))}, idx)
+    data.iloc[20:23, 1] = np.NaN
+    gaps, gaps_summary = bw.time_continuity_gaps_by_column(data)
+    assert gaps.loc[['Spd80mN']].values.tolist() == bw.time_continuity_gaps(data.Spd80mN).values.tolist()
+    assert gaps.loc[['T2m']]['Date From'].tolist() == [pd.Timestamp('2017-01-01 01:40'),
+                                                       pd.Timestamp('2017-01-01 03:30'),
+                                                       pd.Timestamp('2017-01-01 08:20')]
+    assert gaps_summary['Number of Gaps'].tolist() == [2, 3]
+    assert np.allclose(gaps_summary.loc['T2m', ['Days Lost', 'Longest Gap']], [(1 + 2 + 2) / 144, 2 / 144])
+
+
 def test_dist_12x24():
     df = bw.load_csv(bw.datasets.demo_data)
     graph, table12x24 = bw.dist_12x24(df[['Spd40mN']], return_data=True)
@@ -239,3 +290,246 @@ def test_average_wdirs():
     assert bw.average_wdirs(wdirs_series, wspds_series) == 0.0
     wspds = np.array([5, 8.5, 10, 10, 6, 5])
     assert round(bw.average_wdirs(wdirs, wspds), 4) == 0.5774
+
+
+def test_average_wdirs_by_group():
+    wdirs = pd.Series([0, 180, 45, 135, 350, 10, 90])
+    average_wdirs = bw.average_wdirs_by_group(wdirs, [0, 0, 1, 1, 2, 2, 3])
+    assert np.isnan(average_wdirs[0]) and average_wdirs[1] == 90 and average_wdirs[2] == 0.0
+    assert average_wdirs[3] == 90
+    wspds = pd.Series([5, 8.5, 10, 10, 6, 5, 1])
+    wdirs = pd.Series([0, 10, 20, 340, 350, 360, 90])
+    assert round(bw.average_wdirs_by_group(wdirs, np.zeros(7), wspds=wspds)[0], 4) == \
+        round(bw.average_wdirs(wdirs, wspds), 4)
+
+    data = _get_data()[['Spd80mN', 'Dir78mS', 'Dir58mS']]
+    data.iloc[::13, 1] = np.NaN
+    idx = data.index
+    daily = bw.average_wdirs_by_group(data.Dir78mS, pd.Grouper(freq='1D'), wspds=data.Spd80mN)
+    assert np.allclose(daily, data.groupby(pd.Grouper(freq='1D')).apply(
+        lambda x: bw.average_wdirs(x.Dir78mS, x.Spd80mN)))
+    assert np.allclose(daily, bw.average_data_by_period(data, '1D', aggregation_method={
+        'Dir78mS': ('vector_mean', 'Spd80mN')}).Dir78mS)
+    table_12x24 = bw.calc_dist_12x24(data.Dir58mS, aggregation_method='vector_mean')
+    assert np.allclose(table_12x24, data.Dir58mS.groupby([idx.hour, idx.month]).apply(
+        bw.average_wdirs).unstack(level=1))
+    sector_wdirs = bw.calc_dist_by_dir_sector(data.Dir58mS, data.Dir78mS, aggregation_method='vector_mean')
+    assert sector_wdirs.index.tolist() == bw.calc_dist_by_dir_sector(data.Dir58mS, data.Dir78mS).index.tolist()
+
+
+def test_calc_functions():
+    import matplotlib.pyplot
+    data = _get_data()
+    spd, spd_2, spd_std, wdir = data.Spd80mN, data.Spd60mN, data.Spd80mNStd, data.Dir78mS
+    num_figures = len(matplotlib.pyplot.get_fignums())
+
+    assert bw.calc_dist(spd).equals(bw.dist(spd, return_data=True)[1])
+    assert bw.calc_dist_by_dir_sector(spd, wdir).equals(bw.dist_by_dir_sector(spd, wdir, return_data=True)[1])
+    assert bw.calc_dist_matrix(spd_std, spd_2, spd, aggregation_method='mean').equals(
+        bw.dist_matrix(spd_std, spd_2, spd, aggregation_method='mean', return_data=True)[1])
+    assert bw.calc_dist_matrix_by_dir_sector(spd_std, spd, wdir).equals(
+        bw.dist_matrix_by_dir_sector(spd_std, spd, wdir, return_data=True)[1])
+    assert bw.calc_freq_table(spd, wdir).equals(bw.freq_table(spd, wdir, return_data=True)[1])
+    assert bw.calc_dist_12x24(spd).equals(bw.dist_12x24(spd, return_data=True)[1])
+    assert bw.calc_monthly_means(spd).equals(bw.monthly_means(spd, return_data=True)[1])
+    assert bw.TI.calc_by_speed(spd, spd_std).equals(bw.TI.by_speed(spd, spd_std, return_data=True)[1])
+    assert bw.TI.calc_by_sector(spd, spd_std, wdir).equals(bw.TI.by_sector(spd, spd_std, wdir, return_data=True)[1])
+    assert bw.calc_sector_ratio(spd, spd_2, wdir).equals(bw.sector_ratio(spd, spd_2, wdir, return_data=True)[1])
+    assert len(matplotlib.pyplot.get_fignums()) == num_figures
+
+
+def test_binned_direction_series():
+    wdir = pd.Series([0, 14.9, 15, 344.9, 345, 359.9, 360, np.NaN, 180])
+    binned = bw.analyse.analyse._binned_direction_series(wdir, sectors=12)
+    assert binned.dtype == np.int8
+    assert list(binned) == [1, 1, 2, 12, 1, 1, 1, 7]
+    assert list(binned.index) == [0, 1, 2, 3, 4, 5, 6, 8]
+    binned = bw.analyse.analyse._binned_direction_series(wdir, sectors=4, direction_bin_array=[0, 90, 130, 200, 360])
+    assert list(binned) == [1, 1, 1, 4, 4, 4, 4, 3]
+
+
+def test_calc_direction_bin_codes():
+    data = _get_data()
+    data.loc[data.index[::10], 'Dir78mS'] = np.NaN
+    spd, wdir = data.Spd80mN, data.Dir78mS
+    dir_bins = bw.calc_direction_bin_codes(wdir, sectors=8)
+    assert dir_bins.index.equals(wdir.dropna().index) and dir_bins.between(1, 8).all()
+    assert bw.calc_freq_table(spd, wdir, sectors=8, direction_bin_codes=dir_bins).equals(
+        bw.calc_freq_table(spd, wdir, sectors=8))
+    assert bw.calc_dist_by_dir_sector(spd, wdir, sectors=8, aggregation_method='std',
+                                      direction_bin_codes=dir_bins).equals(
+        bw.calc_dist_by_dir_sector(spd, wdir, sectors=8, aggregation_method='std'))
+    assert bw.calc_dist_matrix_by_dir_sector(spd, spd, wdir, sectors=8, direction_bin_codes=dir_bins).equals(
+        bw.calc_dist_matrix_by_dir_sector(spd, spd, wdir, sectors=8))
+    dir_bins = bw.calc_direction_bin_codes(wdir, direction_bin_array=[0, 90, 130, 200, 360])
+    assert bw.calc_freq_table(spd, wdir, direction_bin_array=[0, 90, 130, 200, 360],
+                              direction_bin_codes=dir_bins).equals(
+        bw.calc_freq_table(spd, wdir, direction_bin_array=[0, 90, 130, 200, 360]))
+    with pytest.raises(ValueError):
+        bw.calc_freq_table(spd, wdir, sectors=4, direction_bin_codes=bw.calc_direction_bin_codes(wdir, sectors=8))
+
+
+def test_dist_matrix_by_dir_sector_engine():
+    data = _get_data()
+    # directions on and either side of the sector edges
+    data['Dir78mS'] = np.resize([0, 15, 90, 200.5, 345, 360], len(data))
+    data.loc[data.index[::7], 'Dir78mS'] = np.NaN
+    spd, temp, wdir = data.Spd80mN, data.T2m, data.Dir78mS
+    get_dist_matrix = bw.analyse.analyse._get_dist_matrix_by_dir_sector
+    for aggregation_method, groupby_method in [('mean', lambda x: x.mean()), ('sum', lambda x: x.sum()),
+                                               ('count', lambda x: float(len(x)))]:
+        engine = get_dist_matrix(temp, spd, wdir, [0, 3, 6, 9, 12, 15, 41], sectors=16,
+                                 aggregation_method=aggregation_method)
+        groupby = get_dist_matrix(temp, spd, wdir, [0, 3, 6, 9, 12, 15, 41], sectors=16,
+                                  aggregation_method=groupby_method)
+        assert engine.index.equals(groupby.index) and list(engine.columns) == list(groupby.columns)
+        assert np.allclose(engine.values.astype(float), groupby.values, equal_nan=True)
+    freq_tab = bw.calc_freq_table(spd, wdir, direction_bin_array=[0, 90, 130, 200, 360])
+    assert freq_tab.shape == (41, 4) and round(freq_tab.values.sum(), 6) == 100
+    assert (freq_tab.iloc[:, 2] == 0).all()
+    # directions below the first edge of a custom direction_bin_array aren't counted anywhere
+    freq_tab = bw.calc_freq_table(spd, wdir, direction_bin_array=[45, 135, 225, 315])
+    assert np.allclose(freq_tab.values,
+                       bw.calc_freq_table(spd, wdir[wdir >= 45], direction_bin_array=[45, 135, 225, 315]).values)
+
+
+def test_dist_matrix_engine():
+    values = np.array([0, 0.1, 0.2, 0.3, 0.30000000000000004, 0.7, 0.9999999999, 1.0, -0.1, np.NaN])
+    for bins in [np.arange(0, 1.01, 0.1), [0, 0.2, 0.25, 0.7, 1]]:
+        assert (bw.analyse.analyse._bin_codes(values, bins) == pd.cut(values, bins, right=False).codes).all()
+
+    data = _get_data()
+    # rounded so that some of the values fall on the bin edges
+    data['T2m'] = np.round(data.T2m, 1)
+    data.loc[data.index[::9], 'T2m'] = np.NaN
+    spd, spd_std, temp = data.Spd80mN, data.Spd80mNStd, data.T2m
+    for aggregation_method, groupby_method in [('mean', lambda x: x.mean()), ('std', lambda x: x.std()),
+                                               ('count', lambda x: float(len(x)))]:
+        engine = bw.calc_dist_matrix(spd_std, temp, spd, num_bins_x=12, y_bins=[0, 3, 5, 8, 20],
+                                     aggregation_method=aggregation_method)
+        groupby = bw.calc_dist_matrix(spd_std, temp, spd, num_bins_x=12, y_bins=[0, 3, 5, 8, 20],
+                                      var_label=aggregation_method.capitalize() + ' of Spd80mNStd',
+                                      aggregation_method=groupby_method)
+        assert engine.index.equals(groupby.index)
+        assert engine.columns.equals(groupby.columns)
+        assert np.allclose(engine.values.astype(float), groupby.values, equal_nan=True)
+
+
+def test_calc_dist_12x24_multi():
+    data = _get_data('2016-12-31 22:00', periods=3000)[['Spd80mN', 'T2m']]
+    data.iloc[::3, 0] = np.NaN
+    for aggregation_method in ['mean', 'std', 'count', 'max']:
+        tables_12x24 = bw.calc_dist_12x24_multi(data, aggregation_method=aggregation_method)
+        assert list(tables_12x24.index.names) == ['Variable', 'Month', 'Hour']
+        for col in data.columns:
+            expected = data[col].groupby([data.index.month, data.index.hour]).agg(aggregation_method)
+            assert np.allclose(tables_12x24.loc[col].values, expected.values)
+    assert tables_12x24.loc['T2m'].index[-2:].tolist() == [(12, 22), (12, 23)]
+    assert (bw.calc_dist_12x24_multi(data.T2m, offset='2H').loc['T2m'].index.get_level_values('Month') == 1).all()
+    assert bw.calc_dist_12x24(data.T2m).shape == (24, 2)
+
+
+def test_binned_statistics():
+    codes = np.array([2, 0, 2, 2, 0, 2, 3])
+    values = np.array([1.0, 5.0, 4.0, 2.0, 3.0, 8.0, 7.0])
+    stats = bw.analyse.analyse._binned_statistics(codes, values, 5, percentiles=[10, 90])
+    assert stats['count'].tolist() == [2, 0, 4, 1, 0]
+    assert np.allclose(stats['mean'], [4, np.NaN, 3.75, 7, np.NaN], equal_nan=True)
+    assert np.allclose(stats['std'], [np.std([5, 3], ddof=1), np.NaN, np.std([1, 4, 2, 8], ddof=1), np.NaN, np.NaN],
+                       equal_nan=True)
+    for percentile in [10, 90]:
+        assert np.allclose(stats[percentile], [np.percentile([5, 3], percentile), np.NaN,
+                                               np.percentile([1, 4, 2, 8], percentile), 7, np.NaN], equal_nan=True)
+
+    data = _get_data(periods=1000)
+    spd, spd_std = data.Spd80mN, data.Spd80mNStd
+    ti_dist = bw.TI.calc_by_speed(spd, spd_std)
+    assert list(ti_dist.columns) == ['Mean_TI', 'TI_Count', 'Rep_TI', 'TI_2Sigma', 'Char_TI']
+    ti = (spd_std / spd)[(spd >= 4.5) & (spd < 5.5)]
+    assert ti_dist.loc[5, 'TI_Count'] == len(ti)
+    assert np.isclose(ti_dist.loc[5, 'Rep_TI'], np.percentile(ti, 90))
+    assert np.isclose(ti_dist.loc[5, 'Char_TI'], ti.mean() + ti.std() / 5)
+
+
+def test_TI_calc_cube():
+    data = _get_data(periods=2000)
+    wspds, wspd_stds, wdir = data[['Spd80mN', 'Spd60mN']], data[['Spd80mNStd', 'Spd60mNStd']], data.Dir78mS
+    ti_cube = bw.TI.calc_cube(wspds, wspd_stds, wdir, sectors=4)
+    assert ti_cube.shape == (2 * 41 * 4, 5)
+    assert list(ti_cube.index.names) == ['Anemometer', 'Speed Bin', 'Direction Bin']
+    assert ti_cube.loc['Spd60mN', 'TI_Count'].sum() == ((wspds.Spd60mN > 3) & (wspds.Spd60mN < 40.5)).sum()
+
+    east = (wdir >= 45) & (wdir < 135)
+    ti_by_speed = bw.analyse.analyse.TI._dist_by_speed(wspds.Spd80mN[east], wspd_stds.Spd80mNStd[east],
+                                                       np.arange(-0.5, 41, 1), range(0, 41), 90)
+    ti_east = ti_cube.xs(('Spd80mN', '45.0-135.0'), level=['Anemometer', 'Direction Bin'])
+    assert np.allclose(ti_east.values, ti_by_speed.values, equal_nan=True)
+
+    # directions below the first edge of a custom direction_bin_array aren't counted anywhere
+    ti_cube = bw.TI.calc_cube(wspds, wspd_stds, wdir, direction_bin_array=[45, 135, 225, 315])
+    covered = wdir >= 45
+    assert ti_cube.loc['Spd60mN', 'TI_Count'].sum() == ((wspds.Spd60mN > 3) & (wspds.Spd60mN < 40.5) & covered).sum()
+
+
+def test_quantile_sketch():
+    values = np.random.RandomState(5).lognormal(size=200000)
+    sketch = bw.QuantileSketch(k=200, seed=0)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    merged_sketch = bw.QuantileSketch(k=200, seed=0)
+    for seed, chunk in enumerate(np.array_split(values, 8)):
+        merged_sketch.merge(bw.QuantileSketch(k=200, seed=seed).update(chunk))
+    quantiles = np.linspace(0.01, 0.99, 99)
+    for qs in [sketch, merged_sketch]:
+        assert qs.count == len(values) and sum(len(level) for level in qs._levels) < 4 * qs.k
+        ranks = np.searchsorted(np.sort(values), qs.quantile(quantiles), side='right') / len(values)
+        # rank_error bounds a single quantile, allow for finding 99 of them at once
+        assert np.abs(ranks - quantiles).max() < 2 * qs.rank_error
+    assert bw.QuantileSketch().update([3, 1, np.NaN, 2]).percentile([0, 50, 100]).tolist() == [1, 2, 3]
+    assert np.isnan(bw.QuantileSketch().percentile(90))
+
+    data = _get_data(periods=2000)
+    spd, spd_std = data.Spd80mN, data.Spd80mNStd
+    sketches = [bw.TI.sketch_by_speed(spd[:1000], spd_std[:1000]), bw.TI.sketch_by_speed(spd[1000:], spd_std[1000:])]
+    rep_ti = bw.merge_quantile_sketches(*sketches).apply(lambda ti_sketch: ti_sketch.percentile(90))
+    ti_dist = bw.TI.calc_by_speed(spd, spd_std)
+    assert (bw.merge_quantile_sketches(*sketches).apply(len)[ti_dist.index] == ti_dist.TI_Count).all()
+    well_populated = ti_dist.index[ti_dist.TI_Count > 50]
+    assert np.allclose(rep_ti[well_populated], ti_dist.Rep_TI[well_populated], atol=0.05)
+    dist = bw.merge_quantile_sketches(*[bw.calc_dist(spd[i::2], bins=[0, 5, 10, 50],
+                                                     aggregation_method=bw.QuantileSketch.from_values)
+                                        for i in range(2)])
+    assert dist.apply(len).tolist() == bw.calc_dist(spd, bins=[0, 5, 10, 50], aggregation_method='count').tolist()
+    with pytest.raises(TypeError):
+        bw.dist(spd, bins=[0, 5, 10, 50], aggregation_method=bw.QuantileSketch.from_values)
+
+
+def test_wind_data_cube():
+    data = _get_data('2016-12-31 20:00')
+    data.loc[data.index[::13], 'Spd80mN'] = np.NaN
+    data.loc[data.index[::7], 'Dir78mS'] = np.NaN
+    data.loc[data.index[::5], 'T2m'] = np.NaN
+    wspd, wspd_std, wdir, temp = data.Spd80mN, data.Spd80mNStd, data.Dir78mS, data.T2m
+    cube = bw.WindDataCube(wspd, wdir, data=temp, wspd_std=wspd_std, sectors=8)
+    assert cube.variables == ['Spd80mN', 'T2m', 'TI']
+
+    assert np.allclose(cube.calc_freq_table(), bw.calc_freq_table(wspd, wdir, sectors=8))
+    for aggregation_method in ['%frequency', 'mean', 'std']:
+        assert np.allclose(cube.calc_dist_by_dir_sector('T2m', aggregation_method),
+                           bw.calc_dist_by_dir_sector(temp, wdir, sectors=8, aggregation_method=aggregation_method))
+        assert np.allclose(cube.calc_dist_12x24('T2m', aggregation_method.replace('%frequency', 'sum')),
+                           bw.calc_dist_12x24(temp, aggregation_method.replace('%frequency', 'sum')), equal_nan=True)
+        assert np.allclose(cube.calc_dist('T2m', aggregation_method),
+                           bw.calc_dist(temp, var_to_bin_against=wspd, bins=np.arange(-0.5, 41, 1),
+                                        aggregation_method=aggregation_method), equal_nan=True)
+    ti_by_speed = bw.TI.calc_by_speed(wspd, wspd_std, speed_bin_labels=None)
+    assert np.allclose(cube.calc_ti_by_speed().drop(columns='Rep_TI'), ti_by_speed.drop(columns='Rep_TI'))
+    # the sketch of the TI is exact up to ti_sketch_k values
+    exact = ti_by_speed.TI_Count <= 200
+    assert exact.any() and np.allclose(cube.calc_ti_by_speed().Rep_TI[exact], ti_by_speed.Rep_TI[exact])
+    assert np.allclose(cube.calc_ti_by_speed().Rep_TI, ti_by_speed.Rep_TI, atol=0.05)
+    assert np.allclose(cube.calc_ti_by_sector(), bw.TI.calc_by_sector(wspd, wspd_std, wdir, sectors=8))
+
+    # directions below the first edge of a custom direction_bin_array are kept out of the sectors
+    cube = bw.WindDataCube(wspd, wdir, direction_bin_array=[45, 135, 225, 315])
+    assert np.allclose(cube.calc_freq_table(), bw.calc_freq_table(wspd, wdir, direction_bin_array=[45, 135, 225, 315]))
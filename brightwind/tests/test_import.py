@@ -0,0 +1,26 @@
+import pytest
+import subprocess
+import sys
+
+
+def test_import_is_lazy():
+    # The heavy dependencies should only be imported once the feature needing them is used.
+    code = ("import sys\n"
+            "import brightwind as bw\n"
+            "print(','.join(m for m in ['matplotlib.pyplot', 'sklearn', 'scipy.odr', 'scipy.special', 'ipywidgets', "
+            "'IPython', 'requests'] if m in sys.modules))\n"
+            "bw.Correl.OrdinaryLeastSquares, bw.plot_timeseries, bw.analyse.plot.COLOR_PALETTE\n"
+            "print('matplotlib.pyplot' in sys.modules)\n"
+            # the lazy attributes mustn't rely on a module level __getattr__, which Python 3.6 ignores
+            "print('__getattr__' in vars(bw) or '__getattr__' in vars(bw.analyse))\n")
+    output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).splitlines()
+    assert output == ['', 'True', 'False']
+
+
+def test_lazy_attributes():
+    import brightwind as bw
+    assert 'Correl' in dir(bw) and 'plot' in dir(bw.analyse)
+    with pytest.raises(AttributeError):
+        bw.not_an_attribute
+    with pytest.raises(AttributeError):
+        bw.analyse.not_a_submodule
@@ -66,6 +66,15 @@ def test_selective_avg():
                                         boom_dir_1=270, boom_dir_2=180, sector_width=60))
     assert np_array_equal(sel_avg, result)
 
+    # Test Case 6: Several pairs in one call, returned with the timestamp index
+    sel_avg = bw.selective_avg(data[['Spd1', 'Spd2']], data[['Spd2', 'Spd1']], data.Dir,
+                               boom_dir_1=[315, 20], boom_dir_2=[135, 200], sector_width=60)
+    assert list(sel_avg.columns) == ['Spd1_Spd2', 'Spd2_Spd1'] and sel_avg.index.equals(data.index)
+    assert np_array_equal(sel_avg['Spd1_Spd2'].values, bw.selective_avg(data.Spd1, data.Spd2, data.Dir, boom_dir_1=315,
+                                                                        boom_dir_2=135, sector_width=60).values)
+    assert np_array_equal(sel_avg['Spd2_Spd1'].values, bw.selective_avg(data.Spd2, data.Spd1, data.Dir, boom_dir_1=20,
+                                                                        boom_dir_2=200, sector_width=60).values)
+
     # Test Case 5: Sectors overlap error msg
     with pytest.raises(ValueError) as except_info:
         result = bw.selective_avg(data.Spd1, data.Spd2, data.Dir, boom_dir_1=180, boom_dir_2=185, sector_width=60)
@@ -136,6 +145,22 @@ def test_offset_wind_direction_series():
     assert wdir_series_offset.equals(bw.offset_wind_direction(pd.Series([10, 30, np.NaN, 40, 350]), 345))
 
 
+def test_circular_kernels():
+    from brightwind.utils import utils
+    wdirs = np.array([-10, 0, 350, 360, 370, 725, np.NaN])
+    assert np.allclose(utils._range_0_to_360(wdirs), [350, 0, 350, 360, 10, 5, np.NaN], equal_nan=True)
+    assert utils._range_0_to_360(pd.Series(wdirs)).equals(pd.Series([350, 0, 350, 360, 10, 5, np.NaN]))
+    assert utils._range_0_to_360(360) == 360 and utils._range_0_to_360(-1e-14) == 0
+    assert np.allclose(utils._angular_difference(np.array([350, 10, 0, 90, 180, 0, 360]),
+                                                 np.array([10, 350, 180, 0, 0, 360, 0])),
+                       [20, -20, 180, -90, -180, 0, 0])
+    assert np.allclose(utils._vector_mean_dir(np.array([[350, 10, np.NaN], [0, 180, np.NaN]]), axis=1),
+                       [0, np.NaN], equal_nan=True)
+    assert round(utils._vector_mean_dir([0, 10, 20, 340, 350, 360], [5, 8.5, 10, 10, 6, 5]), 4) == 0.5774
+    assert np.allclose(utils._circular_std(np.array([[350, 10, np.NaN], [90, 90, 90]]), axis=1),
+                       [10.0256, 0], atol=1e-4)
+
+
 def test_get_data_resolution():
     import warnings
     series1 = bw.load_campbell_scientific(bw.datasets.demo_campbell_scientific_site_data)['Spd80mS'].index
@@ -152,6 +177,18 @@ def test_get_data_resolution():
         assert len(w) == 1
 
 
+def test_bw_accessor():
+    data = pd.DataFrame({'Spd': 1.0}, index=pd.date_range('2016-01-01', periods=1000, freq='10min').delete([5, 6, 100]))
+    assert data.bw.resolution == pd.Timedelta('10min') and data['Spd'].bw.resolution == pd.Timedelta('10min')
+    assert data.bw.is_monotonic_increasing
+    assert list(data.bw.gaps['Date From']) == [pd.Timestamp('2016-01-01 00:40'), pd.Timestamp('2016-01-01 16:30')]
+    assert list(data.bw.gaps['Date To']) == [pd.Timestamp('2016-01-01 01:10'), pd.Timestamp('2016-01-01 16:50')]
+
+    data.index = data.index[::-1]
+    assert not data.bw.is_monotonic_increasing
+    assert data.bw.resolution == pd.Timedelta('-10min')
+
+
 def test_offset_timestamps():
     series1 = bw.load_campbell_scientific(bw.datasets.demo_campbell_scientific_site_data)
 
@@ -215,6 +252,36 @@ def test_offset_timestamps():
     assert len(op) + 1 == len(series1.Spd60mN)
     
     
+def test_offset_timestamps_table():
+    data = pd.DataFrame({'Spd': np.arange(144.0)}, index=pd.date_range('2016-01-01', periods=144, freq='10min'))
+    clock_corrections = [('2016-01-01 02:00:00', '2016-01-01 03:50:00', '10min'),
+                         ('2016-01-01 06:00:00', '2016-01-01 08:00:00', '-20min'),
+                         ('2016-01-01 20:00:00', None, '1H')]
+    op = bw.offset_timestamps(data, clock_corrections)
+    assert op.index.is_monotonic_increasing and not op.index.has_duplicates
+    assert op.loc['2016-01-01 02:10:00', 'Spd'] == data.loc['2016-01-01 02:00:00', 'Spd']
+    assert op.loc['2016-01-01 04:00:00', 'Spd'] == data.loc['2016-01-01 04:00:00', 'Spd']
+    assert op.loc['2016-01-01 05:40:00', 'Spd'] == data.loc['2016-01-01 05:40:00', 'Spd']
+    assert op.loc['2016-01-01 07:40:00', 'Spd'] == data.loc['2016-01-01 08:00:00', 'Spd']
+    assert op.index[-1] == pd.Timestamp('2016-01-02 00:50:00')
+    assert len(op) == len(data) - 3
+
+    op_overwrite = bw.offset_timestamps(data, pd.DataFrame(clock_corrections,
+                                                           columns=['date_from', 'date_to', 'offset']),
+                                        overwrite=True)
+    assert op_overwrite.loc['2016-01-01 04:00:00', 'Spd'] == data.loc['2016-01-01 03:50:00', 'Spd']
+    assert op_overwrite.loc['2016-01-01 05:40:00', 'Spd'] == data.loc['2016-01-01 06:00:00', 'Spd']
+    assert len(op_overwrite) == len(data) - 3
+
+    for date_from, date_to, offset in clock_corrections[::-1]:
+        data = bw.offset_timestamps(data, offset, date_from, date_to, overwrite=True)
+    assert op_overwrite.equals(data)
+
+    with pytest.raises(ValueError):
+        bw.offset_timestamps(data, [('2016-01-01 02:00:00', '2016-01-01 05:00:00', '10min'),
+                                    ('2016-01-01 04:00:00', '2016-01-01 06:00:00', '10min')])
+
+
 def test_average_data_by_period():
     data = bw.load_campbell_scientific(bw.datasets.demo_campbell_scientific_site_data)
     bw.average_data_by_period(data[['Spd80mN']], period='1H')
@@ -294,3 +361,186 @@ def dummy_data_frame(start_date='2016-01-01T00:00:00', end_date='2016-12-31T11:5
     dummy_df.set_index('Timestamp', inplace=True)
 
     return dummy_df
+
+
+def test_average_data_by_period_aggregation_spec():
+    data = dummy_data_frame('2016-01-01T00:00:00', '2016-02-29T23:50:00')
+    data['Dir'] = (np.arange(len(data)) * 7.0) % 360
+    data['Dir_opposite'] = (np.arange(len(data)) % 2) * 180.0
+    data['Gust'] = np.arange(len(data)) % 13
+    spec = {'Dir': ('vector_mean', 'Mean Wind Speed'), 'Dir_opposite': 'vector_mean', 'Gust': 'max'}
+    avg = bw.average_data_by_period(data, '1D', aggregation_method=spec)
+    assert list(avg.columns) == list(data.columns)
+    assert np.allclose(avg['Mean Wind Speed'], data['Mean Wind Speed'].resample('1D').mean())
+    assert avg['Gust'].equals(data['Gust'].resample('1D').max())
+    expected_dir = [bw.average_wdirs(day['Dir'], day['Mean Wind Speed']) for _, day in data.resample('1D')]
+    assert np.allclose(avg['Dir'], expected_dir)
+    assert avg['Dir_opposite'].isnull().all()
+    dir_avg = bw.average_data_by_period(data['Dir'], '6H', aggregation_method='vector_mean')
+    assert np.allclose(dir_avg, data['Dir'].resample('6H').agg(bw.average_wdirs)) and dir_avg.name == 'Dir'
+    dir_avg = bw.average_data_by_period(data['Dir'].rename(None), '6H', aggregation_method='vector_mean')
+    assert np.allclose(dir_avg, data['Dir'].resample('6H').agg(bw.average_wdirs)) and dir_avg.name is None
+
+
+def test_aggregation_pyramid():
+    data = dummy_data_frame('2016-01-01T00:00:00', '2016-03-31T23:50:00')
+    data['Spd'] = np.sin(np.arange(len(data)) / 50.0) + data['Mean Wind Speed']
+    data = data.drop(data.index[100:300])
+    pyramid = bw.AggregationPyramid(data, base_period='1H')
+
+    for period in ['1H', '6H', '1D', '1W', '1M']:
+        for aggregation_method in ['mean', 'sum', 'count', 'std']:
+            avg, cvg = bw.average_data_by_period(data, period, aggregation_method=aggregation_method,
+                                                 coverage_threshold=0.5, return_coverage=True)
+            pyr_avg, pyr_cvg = bw.average_data_by_period(pyramid, period, aggregation_method=aggregation_method,
+                                                         coverage_threshold=0.5, return_coverage=True)
+            assert np.allclose(avg.values, pyr_avg.values, equal_nan=True)
+            assert cvg.equals(pyr_cvg)
+
+    spd_pyramid = bw.AggregationPyramid(data['Spd'])
+    assert bw.coverage(data['Spd'], period='1M').equals(bw.coverage(spd_pyramid, period='1M'))
+
+    ref = data['Spd'].resample('1H').mean().dropna() * 0.8
+    for period in ['1H', '1D']:
+        ref_avg, target_avg = bw.transform.transform._preprocess_data_for_correlations(ref, data['Spd'], period, 0.9)
+        ref_pyr, target_pyr = bw.transform.transform._preprocess_data_for_correlations(ref, spd_pyramid, period, 0.9)
+        assert np.allclose(ref_avg.values, ref_pyr.values) and np.allclose(target_avg.values, target_pyr.values)
+
+    with pytest.raises(ValueError):
+        bw.average_data_by_period(pyramid, '10min')
+    with pytest.raises(ValueError):
+        bw.average_data_by_period(pyramid, '1D', aggregation_method='median')
+
+
+def test_average_data_by_period_chunked():
+    data = dummy_data_frame('2016-01-01T00:00:00', '2016-03-31T23:50:00')
+    data['Spd'] = np.sin(np.arange(len(data)) / 50.0) + data['Mean Wind Speed']
+    data = data.drop(data.index[1000:1500])
+    chunks = [data.iloc[i:i + 997] for i in range(0, len(data), 997)]
+
+    for period in ['1H', '5H', '1D', '1W', '1M']:
+        for aggregation_method in ['mean', 'sum', 'std']:
+            avg, cvg = bw.average_data_by_period(data, period, aggregation_method=aggregation_method,
+                                                 coverage_threshold=0.5, return_coverage=True)
+            chunked = list(bw.average_data_by_period_chunked(iter(chunks), period,
+                                                             aggregation_method=aggregation_method,
+                                                             coverage_threshold=0.5, return_coverage=True))
+            chunked_avg = pd.concat([avg_cvg[0] for avg_cvg in chunked])
+            chunked_cvg = pd.concat([avg_cvg[1] for avg_cvg in chunked])
+            assert avg.index.equals(chunked_avg.index)
+            assert np.allclose(avg.values, chunked_avg.values, equal_nan=True)
+            assert np.allclose(cvg.values, chunked_cvg.values, equal_nan=True)
+
+    spd = data['Spd']
+    chunked_spd = pd.concat(bw.average_data_by_period_chunked((spd.iloc[i:i + 500] for i in range(0, len(spd), 500)),
+                                                              '1D'))
+    assert chunked_spd.name == 'Spd'
+    assert np.allclose(bw.average_data_by_period(spd, '1D').values, chunked_spd.values, equal_nan=True)
+
+    with pytest.raises(ValueError):
+        list(bw.average_data_by_period_chunked([chunks[1], chunks[0]], '1D'))
+
+
+def test_incremental_average():
+    data = dummy_data_frame('2016-01-01T00:00:00', '2016-05-31T23:50:00')
+    data['Spd'] = np.sin(np.arange(len(data)) / 50.0) + data['Mean Wind Speed']
+    data = data.drop(data.index[1000:1500])
+
+    for period in ['1D', '1W', '1M']:
+        for aggregation_method in ['mean', 'count', 'std']:
+            incremental = bw.IncrementalAverage(data[:'2016-02-10'], period, aggregation_method=aggregation_method,
+                                                coverage_threshold=0.5, return_coverage=True)
+            incremental.update(data['2016-02-11':'2016-03-31'])
+            avg, cvg = incremental.update(data['2016-04-01':])
+            expected_avg, expected_cvg = bw.average_data_by_period(data, period,
+                                                                   aggregation_method=aggregation_method,
+                                                                   coverage_threshold=0.5, return_coverage=True)
+            assert expected_avg.index.equals(avg.index)
+            assert np.allclose(expected_avg.values, avg.values, equal_nan=True)
+            assert np.allclose(expected_cvg.values, cvg.values, equal_nan=True)
+
+            original = data['2016-03-05':'2016-03-20']
+            cleaned = original.copy()
+            cleaned.loc[cleaned['Spd'] > 3.5, 'Spd'] = np.nan
+            avg = incremental.update(cleaned, removed_data=original)[0]
+            cleaned_data = data.copy()
+            cleaned_data.loc[cleaned.index] = cleaned
+            expected_avg = bw.average_data_by_period(cleaned_data, period, aggregation_method=aggregation_method,
+                                                     coverage_threshold=0.5)
+            assert np.allclose(expected_avg.values, avg.values, equal_nan=True)
+
+    incremental = bw.IncrementalAverage(data['Spd'][:'2016-02-10'], '1M')
+    avg = incremental.update(data['Spd']['2016-02-11':])
+    assert avg.name == 'Spd' and np.allclose(avg.values, bw.average_data_by_period(data['Spd'], '1M').values)
+
+    with pytest.raises(ValueError):
+        incremental.update(data[['Mean Wind Speed']])
+
+
+def test_preprocess_dir_data_for_correlations():
+    idx = pd.date_range('2016-01-01', periods=48, freq='10min')
+    spd = pd.Series(5.0, index=idx)
+    ref_dir = pd.Series(np.tile([350.0, 10.0], 24), index=idx)
+    target_dir = pd.Series(np.repeat([90.0, 180.0, 270.0, 315.0, 340.0, 359.0, 1.0, 45.0], 6), index=idx)
+    target_dir[[7, 8]] = np.nan
+    ref_dir_avg, target_dir_avg = bw.transform.transform._preprocess_dir_data_for_correlations(
+        spd, ref_dir, spd, target_dir, averaging_prd='1H', coverage_threshold=0.8)
+    assert list(ref_dir_avg.index) == list(target_dir_avg.index) == [idx[0]] + list(idx[12::6])
+    assert (ref_dir_avg.isin([0, 360])).all()
+    assert list(target_dir_avg.values) == [90.0, 270.0, 315.0, 340.0, 359.0, 1.0, 45.0]
+
+
+def test_detect_timestamp_offsets():
+    idx = pd.date_range('2016-01-01', '2016-03-31 23:50', freq='10min')
+    spd = pd.Series(8 + 2 * np.sin(np.arange(len(idx)) * 2 * np.pi / 144) +
+                    np.sin(np.arange(len(idx)) * 2 * np.pi / 1000), index=idx)
+    ref = spd.resample('1H').mean()
+    target = bw.offset_timestamps(spd, '2H', date_from='2016-02-01', date_to='2016-02-29 23:50', overwrite=True)
+
+    offsets = bw.detect_timestamp_offsets(ref, target, averaging_prd='1H', max_offset='6H')
+    assert list(offsets['offset']) == [pd.Timedelta(0), pd.Timedelta('-2H'), pd.Timedelta(0)]
+    assert offsets['date_from'][1] == pd.Timestamp('2016-02-01 02:00')
+    assert (offsets['correlation'] > 0.99).all()
+    assert offsets['correlation_no_offset'][1] < offsets['correlation'][1]
+
+    corrected = bw.offset_timestamps(target, offsets[offsets['offset'] != pd.Timedelta(0)], overwrite=True)
+    assert (bw.detect_timestamp_offsets(ref, corrected, max_offset='6H')['offset'] == pd.Timedelta(0)).all()
+
+
+def test_preprocess_refs_for_correlations():
+    target = dummy_data_frame('2016-01-01T00:00:00', '2016-04-30T23:50:00')['Mean Wind Speed'].rename('target')
+    target = target.drop(target.index[1000:1500])
+    refs = pd.DataFrame({'ref_{}'.format(i): target.resample('1H').mean() * (i + 1) for i in range(3)})
+    refs = refs['2015-12-01':'2016-04-15']
+
+    for averaging_prd in ['1H', '1D', '1M']:
+        aligned = bw.transform.transform._preprocess_refs_for_correlations(refs, target, averaging_prd, 0.9)
+        assert list(aligned.columns) == ['ref_0', 'ref_1', 'ref_2', 'target']
+        for col in refs.columns:
+            ref_avg, target_avg = bw.transform.transform._preprocess_data_for_correlations(refs[col], target,
+                                                                                           averaging_prd, 0.9)
+            assert aligned.index.equals(ref_avg.index)
+            assert np.allclose(aligned[col], ref_avg) and np.allclose(aligned['target'], target_avg)
+
+    # where the references cover different spans the periods kept are those kept for every pair
+    refs = {'ref_0': refs['ref_0'], 'ref_1': refs['ref_1']['2016-01-10':],
+            'ref_2': refs['ref_2']['2016-02-03 05:00':'2016-03-20']}
+    for averaging_prd in ['1H', '1D', '1M']:
+        aligned = bw.transform.transform._preprocess_refs_for_correlations(refs, target, averaging_prd, 0.9)
+        common_idxs = None
+        for col, ref in refs.items():
+            ref_avg, target_avg = bw.transform.transform._preprocess_data_for_correlations(ref, target,
+                                                                                           averaging_prd, 0.9)
+            common_idxs = ref_avg.index if common_idxs is None else common_idxs.intersection(ref_avg.index)
+            assert np.allclose(aligned[col], ref_avg.reindex(aligned.index))
+            assert np.allclose(aligned['target'], target_avg.reindex(aligned.index))
+        assert aligned.index.equals(common_idxs)
+
+    mlr = bw.analyse.correlation.MultipleLinearRegression([refs['ref_0'], refs['ref_1']], target, averaging_prd='1D')
+    mlr.run(show_params=False)
+    assert list(mlr.data.columns) == ['ref_spd_1', 'ref_spd_2', 'target_spd']
+    assert mlr.data.index.equals(bw.transform.transform._preprocess_refs_for_correlations(
+        {'ref_0': refs['ref_0'], 'ref_1': refs['ref_1']}, target, '1D', 0.9).index)
+
+    with pytest.raises(ValueError):
+        bw.transform.transform._preprocess_refs_for_correlations([refs['ref_0'].rename('target')], target, '1D', 0.9)
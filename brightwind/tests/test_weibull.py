@@ -0,0 +1,63 @@
+import pytest
+import brightwind as bw
+import pandas as pd
+import numpy as np
+
+
+def _get_data():
+    idx = pd.date_range('2017-01-01', periods=20000, freq='10min')
+    rng = np.random.RandomState(7)
+    wspds = pd.DataFrame({'Spd80mN': rng.weibull(2.2, len(idx)) * 9, 'Spd60mN': rng.weibull(1.8, len(idx)) * 7},
+                         idx)
+    wspds.iloc[::9, 0] = np.NaN
+    wdir = pd.Series(rng.uniform(0, 360, len(idx)), idx, name='Dir78mS')
+    return wspds, wdir
+
+
+def test_calc_weibull():
+    wspds, wdir = _get_data()
+    weibull = bw.calc_weibull(wspds, wdir, sectors=12)
+    assert weibull.shape == (2 * 13, 3)
+    assert np.allclose(weibull.xs('All', level='Direction Bin')[['A', 'k']], [[9, 2.2], [7, 1.8]], rtol=0.05)
+    assert np.allclose(weibull['Frequency'].sum(level='Variable'), 200.0)
+    assert np.allclose(weibull.loc['Spd60mN', 'Frequency'][:-1], bw.calc_dist_by_dir_sector(wspds.Spd60mN, wdir))
+
+    # each fit is as if it had been made on its own
+    sector_wspds = wspds.Spd80mN[(wdir >= 15) & (wdir < 45)].dropna()
+    for method in ['moment', 'energy_pattern_factor']:
+        for mle in [False, True]:
+            sector_weibull = bw.calc_weibull(sector_wspds, method=method, mle=mle)
+            assert np.allclose(bw.calc_weibull(wspds, wdir, method=method, mle=mle).loc[('Spd80mN', '15.0-45.0'),
+                                                                                        ['A', 'k']],
+                               sector_weibull.loc['All', ['A', 'k']])
+    mean, std = sector_wspds.mean(), sector_wspds.std(ddof=0)
+    from scipy.special import gamma
+    a, k = bw.calc_weibull(sector_wspds).loc['All', ['A', 'k']]
+    assert np.isclose(a * gamma(1 + 1 / k), mean) and \
+        np.isclose(a * np.sqrt(gamma(1 + 2 / k) - gamma(1 + 1 / k) ** 2), std)
+
+    # maximum likelihood estimates as from scipy
+    from scipy.stats import weibull_min
+    k, _, a = weibull_min.fit(sector_wspds[sector_wspds > 0], floc=0)
+    assert np.allclose(bw.calc_weibull(sector_wspds, mle=True).loc['All', ['A', 'k']], [a, k], rtol=1e-4)
+
+    weibull = bw.calc_weibull(wspds.Spd80mN, wdir, direction_bin_array=[0, 90, 180, 360, 400])
+    assert np.isnan(weibull.iloc[3]['A']) and weibull.iloc[3]['Frequency'] == 0
+    # directions below the first edge of a custom direction_bin_array aren't counted anywhere
+    weibull = bw.calc_weibull(wspds, wdir, direction_bin_array=[45, 135, 225, 315])
+    assert np.allclose(weibull, bw.calc_weibull(wspds, wdir[wdir >= 45], direction_bin_array=[45, 135, 225, 315]))
+    with pytest.raises(ValueError):
+        bw.calc_weibull(wspds, method='wasp')
+
+
+def test_calc_weibull_from_freq_table():
+    wspds, wdir = _get_data()
+    freq_tabs = {80: bw.calc_freq_table(wspds.Spd80mN, wdir, sectors=8),
+                 60: bw.calc_freq_table(wspds.Spd60mN, wdir, sectors=8)}
+    weibull = bw.calc_weibull_from_freq_table(freq_tabs)
+    assert weibull.index.get_level_values('Variable').unique().tolist() == [80, 60]
+    assert np.allclose(weibull[['A', 'k']], bw.calc_weibull(wspds, wdir, sectors=8)[['A', 'k']], rtol=0.02)
+    assert np.allclose(weibull.loc[80, 'Frequency'][:-1], freq_tabs[80].sum())
+    weibull = bw.calc_weibull_from_freq_table(freq_tabs[60], method='energy_pattern_factor', mle=True)
+    assert weibull.index.tolist()[-1] == 'All'
+    assert np.allclose(weibull.loc['All', ['A', 'k']], [7, 1.8], rtol=0.05)
@@ -20,11 +20,15 @@ import math
 from brightwind.utils import utils
 
 __all__ = ['average_data_by_period',
+           'average_data_by_period_chunked',
+           'IncrementalAverage',
+           'AggregationPyramid',
            'adjust_slope_offset',
            'scale_wind_speed',
            'offset_wind_direction',
            'selective_avg',
-           'offset_timestamps']
+           'offset_timestamps',
+           'detect_timestamp_offsets']
 
 
 def _compute_wind_vector(wspd, wdir):
@@ -60,6 +64,49 @@ def _get_min_overlap_timestamp(df1_timestamps, df2_timestamps):
     return max(df1_timestamps.min(), df2_timestamps.min())
 
 
+class _IndexInfo:
+    """
+    Resolution, monotonicity and gap information of a timestamp index, found in a single pass over its int64 values.
+    """
+
+    def __init__(self, data_idx):
+        timestamps = pd.DatetimeIndex(data_idx).asi8
+        time_diffs = np.diff(timestamps)
+        if len(time_diffs) == 0:
+            raise ValueError("At least two timestamps are needed to find the resolution of the data.")
+        time_diff_counts = pd.value_counts(time_diffs, sort=False)
+        # the most frequent time difference, the smallest one if more than one is most frequent
+        most_freq_time_diff = time_diff_counts.index[time_diff_counts.values == time_diff_counts.values.max()].min()
+        self.resolution = pd.Timedelta(int(most_freq_time_diff))
+        self.min_time_diff = pd.Timedelta(int(time_diffs.min()))
+        self.is_monotonic_increasing = bool(time_diffs.min() > 0)
+        self.gap_positions = np.flatnonzero(time_diffs != most_freq_time_diff)
+
+
+_index_info_cache = {}
+
+
+def _get_index_info(data_idx):
+    """
+    Returns the _IndexInfo of data_idx. As an index can't be changed once made it is only calculated the first time
+    an index is seen and then kept until the index is deleted. Giving a DataFrame a new index, or making a new
+    DataFrame by filtering, sorting, etc., creates a new index so the information is found again for it.
+    """
+    import weakref
+    key = id(data_idx)
+    cached = _index_info_cache.get(key)
+    if cached is not None and cached[0]() is data_idx:
+        return cached[1]
+
+    def _remove_from_cache(index_ref, key=key):
+        if _index_info_cache.get(key, (None,))[0] is index_ref:
+            del _index_info_cache[key]
+
+    info = _IndexInfo(data_idx)
+    _index_info_cache[key] = (weakref.ref(data_idx, _remove_from_cache), info)
+    return info
+
+
 def _get_data_resolution(data_idx):
     """
     Get the frequency of data i.e. the most common time interval between timestamps.
@@ -85,16 +132,61 @@ def _get_data_resolution(data_idx):
     """
 
     import warnings
-    time_diff_btw_timestamps = data_idx.to_series().diff()
-    most_freq_time_diff = time_diff_btw_timestamps.mode().values[0]
-    minimum_time_diff = time_diff_btw_timestamps.min()
-    if minimum_time_diff != most_freq_time_diff:
+    info = _get_index_info(data_idx)
+    if info.min_time_diff != info.resolution:
         warnings.warn("Frequency of input data might not be determined correctly (most frequent time "
                       "difference between adjacent timestamps"
                       " does not match minimum time difference) most frequent time difference: {0}  "
                       "minimum time difference {1}. Using most frequent time difference as resolution"
-                      .format(pd.to_timedelta(most_freq_time_diff, unit='s'), minimum_time_diff))
-    return pd.to_timedelta(most_freq_time_diff, unit='s')
+                      .format(info.resolution, info.min_time_diff))
+    return info.resolution
+
+
+@pd.api.extensions.register_dataframe_accessor('bw')
+@pd.api.extensions.register_series_accessor('bw')
+class _TimeIndexAccessor:
+    """
+    Gives the resolution, monotonicity and gaps of the timestamp index of a DataFrame or Series. The information is
+    found once for each index and kept with it, so asking for it again is free until the index is changed.
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+        data.bw.resolution
+        data.bw.is_monotonic_increasing
+        data.bw.gaps
+
+    """
+
+    def __init__(self, data):
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise AttributeError("The .bw accessor is only available for data with a DatetimeIndex.")
+        self._data = data
+
+    @property
+    def resolution(self):
+        """
+        The most common time difference between consecutive timestamps, see _get_data_resolution().
+        """
+        return _get_data_resolution(self._data.index)
+
+    @property
+    def is_monotonic_increasing(self):
+        """
+        True if each timestamp is later than the one before it.
+        """
+        return _get_index_info(self._data.index).is_monotonic_increasing
+
+    @property
+    def gaps(self):
+        """
+        A DataFrame of the timestamps either side of each place where the time difference between consecutive
+        timestamps is not the resolution.
+        """
+        index = self._data.index
+        gap_positions = _get_index_info(index).gap_positions
+        return pd.DataFrame({'Date From': index[gap_positions], 'Date To': index[gap_positions + 1]})
 
 
 def _round_timestamp_down_to_averaging_prd(timestamp, period):
@@ -132,21 +224,159 @@ def _get_overlapping_data(df1, df2, period):
     return df1[start:], df2[start:]
 
 
-def _max_coverage_count(data_index, averaged_data_index)->pd.Series:
+def _max_coverage_count(data_resolution, averaged_data_index)->pd.Series:
     """
     For a given resolution of data finds the maximum number of data points in the averaging period
     """
-    max_pts = (averaged_data_index.to_series().diff().shift(-1)) / _get_data_resolution(data_index)
+    max_pts = (averaged_data_index.to_series().diff().shift(-1)) / data_resolution
     max_pts[-1] = (((averaged_data_index[-1] + 1*averaged_data_index[-1].freq) - averaged_data_index[-1]) /
-                   _get_data_resolution(data_index))
+                   data_resolution)
     return max_pts
 
 
 def _get_coverage_series(data, grouper_obj):
-    coverage = grouper_obj.count().divide(_max_coverage_count(data.index, grouper_obj.mean().index), axis=0)
+    coverage = grouper_obj.count().divide(_max_coverage_count(_get_data_resolution(data.index),
+                                                              grouper_obj.mean().index), axis=0)
     return coverage
 
 
+def _convert_period(period):
+    """
+    Converts the period strings accepted by average_data_by_period to the frequencies used for resampling.
+    """
+    if isinstance(period, str):
+        if period[-1] == 'D':
+            period = _convert_days_to_hours(period)
+        if period[-1] == 'W':
+            period = _convert_weeks_to_hours(period)
+        if period[-1] == 'M':
+            period = period+'S'
+        if period[-1] == 'Y':
+            raise TypeError("Please use '1AS' for annual frequency at the start of the year.")
+    return period
+
+
+def _resample(data, period):
+    return data.resample(period, axis=0, closed='left', label='left', base=0,
+                         convention='start', kind='timestamp')
+
+
+def _period_statistics(data, period, shift, origin=None):
+    """
+    Returns the count, sum and sum of squared deviations from the mean of the data, less shift, for each period.
+    If an origin is given, periods of fixed length are counted from it instead of from the start of the first day in
+    the data, so that separate pieces of a time series are split into the same periods.
+    """
+    from pandas.tseries.frequencies import to_offset
+    shifted = data - shift
+    if origin is not None and isinstance(to_offset(period), pd.tseries.offsets.Tick):
+        period_nanos = to_offset(period).nanos
+        labels = origin.value + ((shifted.index.asi8 - origin.value) // period_nanos) * period_nanos
+        grouper_obj = shifted.groupby(pd.DatetimeIndex(labels))
+    else:
+        grouper_obj = _resample(shifted, period)
+    count = grouper_obj.count()
+    return count, grouper_obj.sum(), (grouper_obj.var(ddof=0) * count).fillna(0.0)
+
+
+def _merge_period_statistics(stats_1, stats_2):
+    """
+    Merges the count, sum and sum of squared deviations of two sets of period statistics, adding together those which
+    fall in the same period.
+    """
+    index = stats_1[0].index.union(stats_2[0].index)
+    count_1, sum_1, sum_sq_dev_1 = [stat.reindex(index, fill_value=0) for stat in stats_1]
+    count_2, sum_2, sum_sq_dev_2 = [stat.reindex(index, fill_value=0) for stat in stats_2]
+    count = count_1 + count_2
+    mean_deviation = sum_2 / count_2 - sum_1 / count_1
+    sum_sq_dev = sum_sq_dev_1 + sum_sq_dev_2 + (count_1 * count_2 / count * mean_deviation ** 2).fillna(0.0)
+    return count, sum_1 + sum_2, sum_sq_dev
+
+
+def _subtract_period_statistics(stats_1, stats_2):
+    """
+    Removes the count, sum and sum of squared deviations of stats_2 from those of stats_1, the reverse of
+    _merge_period_statistics(). Only the periods in stats_2 are returned.
+    """
+    count, sum_, sum_sq_dev = [stat.reindex(stats_2[0].index, fill_value=0) for stat in stats_1]
+    count_2, sum_2, sum_sq_dev_2 = stats_2
+    count_1 = count - count_2
+    if (count_1 < 0).any(axis=None):
+        raise ValueError("Data to be removed was never added.")
+    sum_1 = (sum_ - sum_2).where(count_1 > 0, 0.0)
+    mean_deviation = sum_2 / count_2 - sum_1 / count_1
+    sum_sq_dev_1 = sum_sq_dev - sum_sq_dev_2 - (count_1 * count_2 / count * mean_deviation ** 2).fillna(0.0)
+    return count_1, sum_1, sum_sq_dev_1.where(count_1 > 0, 0.0).clip(lower=0.0)
+
+
+def _aggregate_period_statistics(aggregation_method, count, sum_, sum_sq_dev, shift):
+    if aggregation_method == 'count':
+        return count
+    elif aggregation_method == 'sum':
+        return sum_ + count * shift
+    elif aggregation_method == 'mean':
+        return sum_ / count + shift
+    else:
+        var = (sum_sq_dev / (count - 1)).where(count > 1)
+        return var if aggregation_method == 'var' else np.sqrt(var)
+
+
+def _check_aggregation_method_for_statistics(aggregation_method):
+    aggregation_methods = ['mean', 'sum', 'count', 'std', 'var']
+    if aggregation_method not in aggregation_methods:
+        raise ValueError("aggregation_method '{0}' is not supported when averaging from stored sums and counts, use "
+                         "one of {1}.".format(aggregation_method, aggregation_methods))
+
+
+def _filter_by_coverage(grouped_data, coverage, coverage_threshold, return_coverage):
+    grouped_data = grouped_data[coverage >= coverage_threshold]
+
+    if return_coverage:
+        if isinstance(coverage, pd.DataFrame):
+            coverage.columns = [col_name+"_Coverage" for col_name in coverage.columns]
+        elif isinstance(coverage, pd.Series):
+            coverage = coverage.rename(grouped_data.name+'_Coverage')
+        else:
+            raise TypeError("Coverage not calculated correctly. Coverage", coverage)
+        return grouped_data, coverage[coverage >= coverage_threshold]
+    else:
+        return grouped_data
+
+
+def _is_vector_mean(aggregation_method):
+    return (isinstance(aggregation_method, str) and aggregation_method == 'vector_mean') or \
+           (isinstance(aggregation_method, tuple) and aggregation_method[0] == 'vector_mean')
+
+
+def _aggregate_by_column(data, period, aggregation_method):
+    """
+    Aggregates each column of data with its own method from the aggregation_method dict, columns not in the dict are
+    averaged. Directions using 'vector_mean', or ('vector_mean', <wind speed column>) to weight them by wind speed, are
+    all vector averaged together from the sums of the sine and cosine of each direction for each period. As in
+    average_wdirs() the sine and cosine are rounded to 5 decimal places so that directions which cancel give NaN.
+    Timestamps where the direction, or its wind speed, is missing are left out.
+    """
+    if not isinstance(aggregation_method, dict):
+        aggregation_method = {col: aggregation_method for col in data.columns}
+    vector_cols = [col for col in data.columns if _is_vector_mean(aggregation_method.get(col))]
+    other_methods = {col: aggregation_method.get(col, 'mean') for col in data.columns if col not in vector_cols}
+
+    grouped_data = []
+    if other_methods:
+        grouped_data.append(_resample(data[list(other_methods)], period).agg(other_methods))
+    if vector_cols:
+        wdirs = data[vector_cols].values.astype(float)
+        wspds = np.column_stack([data[aggregation_method[col][1]].values.astype(float)
+                                 if isinstance(aggregation_method[col], tuple) else np.ones(len(data))
+                                 for col in vector_cols])
+        sine, cosine = utils._direction_components(wdirs, wspds)
+        sums = _resample(pd.DataFrame(np.hstack([sine, cosine]), index=data.index), period).sum()
+        sine, cosine = sums.values[:, :len(vector_cols)], sums.values[:, len(vector_cols):]
+        grouped_data.append(pd.DataFrame(utils._direction_from_components(sine, cosine), index=sums.index,
+                                         columns=vector_cols))
+    return pd.concat(grouped_data, axis=1)[list(data.columns)]
+
+
 def average_data_by_period(data, period, aggregation_method='mean', coverage_threshold=None,
                            return_coverage=False):
     """
@@ -156,8 +386,9 @@ def average_data_by_period(data, period, aggregation_method='mean', coverage_thr
     specified. Can be used to find hourly, daily, weekly, etc. averages or sums. Can also return coverage and 
     filter the returned data by coverage.
 
-    :param data: Data to find average or aggregate of
-    :type data: pandas.Series
+    :param data: Data to find average or aggregate of. An AggregationPyramid can also be passed, in which case the
+        period is answered from its stored sums, counts and sums of squares rather than from the raw data.
+    :type data: pandas.Series or pandas.DataFrame or AggregationPyramid
     :param period: Groups data by the period specified here. The following formats are supported
 
             - Set period to 10min for 10 minute average, 20min for 20 minute average and so on for 4min, 15min, etc.
@@ -171,8 +402,12 @@ def average_data_by_period(data, period, aggregation_method='mean', coverage_thr
     :type period: str or pandas.DateOffset
     :param aggregation_method: Default `mean`, returns the mean of the data for the specified period. Can also use
         `median`, `prod`, `sum`, `std`,`var`, `max`, `min` which are shorthands for median, product, summation,
-        standard deviation, variance, maximum and minimum respectively.
-    :type aggregation_method: str
+        standard deviation, variance, maximum and minimum respectively. Use `vector_mean` to vector average wind
+        directions, or ('vector_mean', <wind speed column name>) to weight the directions by wind speed, see
+        average_wdirs(). To aggregate each column of a DataFrame differently give a dict of column names and
+        aggregation methods, e.g. {'Spd80mN': 'mean', 'Dir78mS': 'vector_mean', 'Spd80mNMax': 'max'}. Columns not in
+        the dict are averaged.
+    :type aggregation_method: str or tuple or dict
     :param coverage_threshold: Coverage is defined as the ratio of number of data points present in the period and the 
         maximum number of data points that a period should have. Example, for 10 minute data resolution and a period of 
         1 hour, the maximum number of data points in one period is 6. But if the number if data points available is only
@@ -204,8 +439,18 @@ def average_data_by_period(data, period, aggregation_method='mean', coverage_thr
         #To check the coverage for all months
         data_monthly_filtered = bw.average_data_by_period(data.Spd80mN, period='1M', return_coverage=True)
 
+        #To average the speeds, vector average the directions weighted by speed, find the maximum gust and total
+        #precipitation of each hour
+        data_hourly = bw.average_data_by_period(data[['Spd80mN', 'Dir78mS', 'Spd80mNMax', 'PrcpTot']], period='1H',
+                                                aggregation_method={'Dir78mS': ('vector_mean', 'Spd80mN'),
+                                                                    'Spd80mNMax': 'max', 'PrcpTot': 'sum'})
+
 
     """
+    if isinstance(data, AggregationPyramid):
+        return data.average(period, aggregation_method=aggregation_method, coverage_threshold=coverage_threshold,
+                            return_coverage=return_coverage)
+
     if coverage_threshold is None:
         coverage_threshold = 0
 
@@ -213,33 +458,426 @@ def average_data_by_period(data, period, aggregation_method='mean', coverage_thr
         raise TypeError("Invalid coverage_threshold, should be between 0 and 1, both ends inclusive")
 
     data = data.sort_index()
-    if isinstance(period, str):
-        if period[-1] == 'D':
-            period = _convert_days_to_hours(period)
-        if period[-1] == 'W':
-            period = _convert_weeks_to_hours(period)
-        if period[-1] == 'M':
-            period = period+'S'
-        if period[-1] == 'Y':
-            raise TypeError("Please use '1AS' for annual frequency at the start of the year.")
-    grouper_obj = data.resample(period, axis=0, closed='left', label='left', base=0,
-                                convention='start', kind='timestamp')
+    period = _convert_period(period)
+    grouper_obj = _resample(data, period)
 
-    grouped_data = grouper_obj.agg(aggregation_method)
+    if isinstance(aggregation_method, dict) or _is_vector_mean(aggregation_method):
+        if isinstance(data, pd.Series):
+            grouped_data = _aggregate_by_column(data.to_frame(), period, aggregation_method).iloc[:, 0]\
+                .rename(data.name)
+        else:
+            grouped_data = _aggregate_by_column(data, period, aggregation_method)
+    else:
+        grouped_data = grouper_obj.agg(aggregation_method)
     coverage = _get_coverage_series(data, grouper_obj)
 
-    grouped_data = grouped_data[coverage >= coverage_threshold]
+    return _filter_by_coverage(grouped_data, coverage, coverage_threshold, return_coverage)
 
-    if return_coverage:
-        if isinstance(coverage, pd.DataFrame):
-            coverage.columns = [col_name+"_Coverage" for col_name in coverage.columns]
-        elif isinstance(coverage, pd.Series):
-            coverage = coverage.rename(grouped_data.name+'_Coverage')
+
+def _period_statistics_to_data(stats, labels, shift, data_resolution, aggregation_method, coverage_threshold,
+                               return_coverage, series_name=None):
+    count, sum_, sum_sq_dev = [stat.reindex(labels, fill_value=0) for stat in stats]
+    grouped_data = _aggregate_period_statistics(aggregation_method, count, sum_, sum_sq_dev, shift)
+    coverage = count.divide(_max_coverage_count(data_resolution, labels), axis=0)
+    if series_name is not None:
+        grouped_data = grouped_data.iloc[:, 0].rename(series_name[0])
+        coverage = coverage.iloc[:, 0].rename(series_name[0])
+    return _filter_by_coverage(grouped_data, coverage, coverage_threshold, return_coverage)
+
+
+def average_data_by_period_chunked(chunks, period, aggregation_method='mean', coverage_threshold=None,
+                                   return_coverage=False, data_resolution=None):
+    """
+    Averages data, which arrives as a sequence of time ordered chunks, by the time period specified by period.
+
+    Gives the same results as average_data_by_period() on all of the data put together but only needs to hold one
+    chunk in memory at a time. The counts, sums and sums of squared deviations of a period which is split across
+    chunks are carried over to the next chunk, and the averages for each period are yielded as soon as the period is
+    finished. This allows very long high resolution time series, e.g. years of 1 Hz data, to be averaged with bounded
+    memory.
+
+    :param chunks: An iterable of Series or DataFrames with a timestamp index, for example the reader returned by
+        pandas.read_csv(..., chunksize=100000, index_col=0, parse_dates=True). The chunks must be in time order and
+        must not overlap.
+    :type chunks: iterable of pandas.Series or pandas.DataFrame
+    :param period: Groups data by the period specified here. Uses the same formats as average_data_by_period().
+    :type period: str or pandas.DateOffset
+    :param aggregation_method: Default `mean`, can also be `sum`, `count`, `std` or `var`.
+    :type aggregation_method: str
+    :param coverage_threshold: Periods with a coverage less than the coverage_threshold are removed, see
+        average_data_by_period(). It is set to None by default, i.e. data is not filtered.
+    :type coverage_threshold: float
+    :param return_coverage: If True yields a tuple of the averaged data and the coverage of each period, the
+        coverage columns are named as <column name>_Coverage.
+    :type return_coverage: bool
+    :param data_resolution: Resolution of the data, used for calculating coverage. By default it is found from the
+        first chunk.
+    :type data_resolution: pandas.Timedelta or str
+    :returns: A generator which yields a Series or DataFrame of aggregated data, or a tuple of the aggregated data and
+        its coverage if return_coverage is True, for the periods finished by each chunk.
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        import pandas as pd
+
+        chunks = pd.read_csv(r'C:\\some\\folder\\sonic_1Hz.csv', index_col=0, parse_dates=True, chunksize=500000)
+        data_10min = pd.concat(bw.average_data_by_period_chunked(chunks, period='10min'))
+
+        # To get the coverage too
+        chunks = pd.read_csv(r'C:\\some\\folder\\sonic_1Hz.csv', index_col=0, parse_dates=True, chunksize=500000)
+        for data_hourly, coverage_hourly in bw.average_data_by_period_chunked(chunks, period='1H',
+                                                                              return_coverage=True):
+            print(data_hourly, coverage_hourly)
+
+    """
+    from pandas.tseries.frequencies import to_offset
+    if coverage_threshold is None:
+        coverage_threshold = 0
+
+    if coverage_threshold < 0 or coverage_threshold > 1:
+        raise TypeError("Invalid coverage_threshold, should be between 0 and 1, both ends inclusive")
+
+    _check_aggregation_method_for_statistics(aggregation_method)
+    period = _convert_period(period)
+    period_offset = to_offset(period)
+    if data_resolution is not None:
+        data_resolution = pd.Timedelta(data_resolution)
+
+    shift = origin = series_name = pending = next_label = last_timestamp = index_name = None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        chunk = chunk.sort_index()
+        if last_timestamp is not None and chunk.index[0] <= last_timestamp:
+            raise ValueError("Chunks must be in time order and must not overlap. Chunk starting at {0} comes after "
+                             "data ending at {1}.".format(chunk.index[0], last_timestamp))
+        if shift is None:
+            series_name = (chunk.name,) if isinstance(chunk, pd.Series) else None
+            if data_resolution is None:
+                data_resolution = _get_data_resolution(chunk.index)
+        if series_name is not None:
+            chunk = chunk.to_frame()
+        if shift is None:
+            shift = chunk.mean().fillna(0.0)
+            origin = chunk.index[0].normalize()
+        last_timestamp, index_name = chunk.index[-1], chunk.index.name
+
+        stats = _period_statistics(chunk, period, shift, origin)
+        if pending is not None:
+            stats = _merge_period_statistics(pending, stats)
+        if next_label is None:
+            next_label = stats[0].index[0]
+        # the last period may continue into the next chunk so is held back
+        pending = tuple(stat.iloc[-1:] for stat in stats)
+        if stats[0].index[-1] > next_label:
+            labels = pd.date_range(next_label, stats[0].index[-1], freq=period_offset, name=chunk.index.name)[:-1]
+            yield _period_statistics_to_data(stats, labels, shift, data_resolution, aggregation_method,
+                                             coverage_threshold, return_coverage, series_name)
+            next_label = stats[0].index[-1]
+
+    if pending is not None:
+        labels = pd.date_range(next_label, pending[0].index[-1], freq=period_offset, name=index_name)
+        yield _period_statistics_to_data(pending, labels, shift, data_resolution, aggregation_method,
+                                         coverage_threshold, return_coverage, series_name)
+
+
+class IncrementalAverage:
+    """
+    Averages data by period, as average_data_by_period() does, and keeps the averages up to date as data is appended
+    or cleaned.
+
+    The count, sum and sum of squared deviations of each period are stored so that when rows are added or removed only
+    the periods they fall in are recalculated. For a long data set which is appended to every day this makes updating
+    the monthly means and coverage proportional to the size of the new data rather than the whole history.
+
+    :param data: Data to find the average or aggregate of.
+    :type data: pandas.Series or pandas.DataFrame
+    :param period: Groups data by the period specified here. Uses the same formats as average_data_by_period().
+    :type period: str or pandas.DateOffset
+    :param aggregation_method: Default `mean`, can also be `sum`, `count`, `std` or `var`.
+    :type aggregation_method: str
+    :param coverage_threshold: Periods with a coverage less than the coverage_threshold are removed, see
+        average_data_by_period(). It is set to None by default, i.e. data is not filtered.
+    :type coverage_threshold: float
+    :param return_coverage: If True the aggregated data is returned along with its coverage, the coverage columns are
+        named as <column name>_Coverage.
+    :type return_coverage: bool
+    :param data_resolution: Resolution of the data, used for calculating coverage. By default it is found from data.
+    :type data_resolution: pandas.Timedelta or str
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+        monthly = bw.IncrementalAverage(data[['Spd80mN', 'Spd60mN']], period='1M', return_coverage=True)
+        monthly_means, monthly_coverage = monthly.data
+
+        # Append a new day of data
+        monthly_means, monthly_coverage = monthly.update(new_day[['Spd80mN', 'Spd60mN']])
+
+        # Replace rows which have been cleaned, passing the rows as they were before cleaning
+        monthly_means, monthly_coverage = monthly.update(cleaned_rows, removed_data=original_rows)
+
+    """
+
+    def __init__(self, data, period, aggregation_method='mean', coverage_threshold=None, return_coverage=False,
+                 data_resolution=None):
+        from pandas.tseries.frequencies import to_offset
+        if coverage_threshold is None:
+            coverage_threshold = 0
+        if coverage_threshold < 0 or coverage_threshold > 1:
+            raise TypeError("Invalid coverage_threshold, should be between 0 and 1, both ends inclusive")
+        _check_aggregation_method_for_statistics(aggregation_method)
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise TypeError("data must have a DatetimeIndex.")
+
+        self.period = _convert_period(period)
+        self.aggregation_method = aggregation_method
+        self.coverage_threshold = coverage_threshold
+        self.return_coverage = return_coverage
+        self._offset = to_offset(self.period)
+        self._is_series = isinstance(data, pd.Series)
+        self.name = data.name if self._is_series else None
+        data = self._to_frame(data.sort_index())
+        if data_resolution is None:
+            self.data_resolution = _get_data_resolution(data.index)
         else:
-            raise TypeError("Coverage not calculated correctly. Coverage", coverage)
-        return grouped_data, coverage[coverage >= coverage_threshold]
-    else:
-        return grouped_data
+            self.data_resolution = pd.Timedelta(data_resolution)
+        self._shift = data.mean().fillna(0.0)
+        self._origin = data.index[0].normalize()
+
+        count, sum_, sum_sq_dev = _period_statistics(data, self.period, self._shift, self._origin)
+        labels = pd.date_range(count.index[0], count.index[-1], freq=self._offset, name=data.index.name)
+        self._count, self._sum, self._sum_sq_dev = [stat.reindex(labels, fill_value=0)
+                                                    for stat in (count, sum_, sum_sq_dev)]
+        self._grouped_data = _aggregate_period_statistics(self.aggregation_method, self._count, self._sum,
+                                                          self._sum_sq_dev, self._shift)
+        self._coverage = self._count.divide(self._max_coverage_count(labels), axis=0)
+
+    def __repr__(self):
+        return "IncrementalAverage of {0} periods of '{1}' from {2} to {3}".format(
+            len(self._count), self.period, self._count.index[0], self._count.index[-1])
+
+    def _to_frame(self, data):
+        if isinstance(data, pd.Series):
+            data = data.to_frame(self.name if self._is_series else data.name)
+        if hasattr(self, '_shift'):
+            unknown_columns = data.columns.difference(self._shift.index)
+            if len(unknown_columns) > 0:
+                raise ValueError("Columns {0} were not in the data the IncrementalAverage was created "
+                                 "with.".format(list(unknown_columns)))
+            data = data.reindex(columns=self._shift.index)
+        return data
+
+    def _max_coverage_count(self, labels):
+        return pd.Series((labels + self._offset) - labels, index=labels) / self.data_resolution
+
+    @property
+    def data(self):
+        """
+        The aggregated data, and its coverage if return_coverage is True, as returned by average_data_by_period().
+        """
+        grouped_data, coverage = self._grouped_data.copy(), self._coverage.copy()
+        if self._is_series:
+            grouped_data = grouped_data.iloc[:, 0].rename(self.name)
+            coverage = coverage.iloc[:, 0].rename(self.name)
+        return _filter_by_coverage(grouped_data, coverage, self.coverage_threshold, self.return_coverage)
+
+    def update(self, new_data=None, removed_data=None):
+        """
+        Updates the periods touched by new_data and removed_data and returns the aggregated data.
+
+        :param new_data: Rows to add, e.g. newly appended data or the cleaned values of existing rows.
+        :type new_data: pandas.Series or pandas.DataFrame
+        :param removed_data: Rows to take away, as they were when they were added. To clean data pass the original
+            rows here and the cleaned rows as new_data.
+        :type removed_data: pandas.Series or pandas.DataFrame
+        :return: The aggregated data, and its coverage if return_coverage is True, as returned by
+            average_data_by_period().
+        """
+        touched = []
+        for data, combine in ((removed_data, _subtract_period_statistics), (new_data, _merge_period_statistics)):
+            if data is None or len(data) == 0:
+                continue
+            stats = _period_statistics(self._to_frame(data), self.period, self._shift, self._origin)
+            self._extend_periods(stats[0].index)
+            stats = combine([stat.reindex(stats[0].index) for stat in (self._count, self._sum, self._sum_sq_dev)],
+                            stats)
+            for stored, stat in zip((self._count, self._sum, self._sum_sq_dev), stats):
+                stored.loc[stat.index] = stat
+            touched.append(stats[0].index)
+
+        if touched:
+            labels = touched[0].append(touched[1:]).unique()
+            count = self._count.loc[labels]
+            self._grouped_data.loc[labels] = _aggregate_period_statistics(
+                self.aggregation_method, count, self._sum.loc[labels], self._sum_sq_dev.loc[labels], self._shift)
+            self._coverage.loc[labels] = count.divide(self._max_coverage_count(labels), axis=0)
+        return self.data
+
+    def _extend_periods(self, labels):
+        """
+        Adds any periods needed to cover labels, along with the empty periods between them and the existing ones.
+        """
+        first, last = min(labels[0], self._count.index[0]), max(labels[-1], self._count.index[-1])
+        if first == self._count.index[0] and last == self._count.index[-1]:
+            return
+        all_labels = pd.date_range(first, last, freq=self._offset, name=self._count.index.name)
+        self._count, self._sum, self._sum_sq_dev = [stat.reindex(all_labels, fill_value=0)
+                                                    for stat in (self._count, self._sum, self._sum_sq_dev)]
+        new_labels = all_labels.difference(self._grouped_data.index)
+        self._grouped_data = self._grouped_data.reindex(all_labels)
+        self._coverage = self._coverage.reindex(all_labels)
+        self._grouped_data.loc[new_labels] = _aggregate_period_statistics(
+            self.aggregation_method, self._count.loc[new_labels], self._sum.loc[new_labels],
+            self._sum_sq_dev.loc[new_labels], self._shift)
+        self._coverage.loc[new_labels] = 0.0
+
+
+class AggregationPyramid:
+    """
+    Stores the sufficient statistics of a time series, i.e. the counts, sums and sums of squared deviations of the
+    data, once for every base period. Averages, standard deviations and coverage for any period that is a multiple of
+    the base period are then found by combining these blocks rather than by going through the full resolution data
+    again. This makes it cheap to try many different averaging periods on the same data, e.g. 1H, 3H, 6H, 1D, 1W and
+    1MS.
+
+    The pyramid can be passed to average_data_by_period(), coverage() and to the correlation functions in place of
+    the raw data. Supported aggregation methods are 'mean', 'sum', 'count', 'std' and 'var'.
+
+    :param data: Data to summarise, timestamp must be the index.
+    :type data: pandas.Series or pandas.DataFrame
+    :param base_period: The finest period that will be averaged to, by default the resolution of the data. Any
+        period passed to average_data_by_period() must be made of whole base periods. Uses the same formats as
+        average_data_by_period().
+    :type base_period: str or pandas.DateOffset
+    :returns: An AggregationPyramid object
+
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+
+        pyramid = bw.AggregationPyramid(data[['Spd80mN', 'Spd60mN']], base_period='1H')
+
+        # Same results as averaging the raw data
+        hourly = bw.average_data_by_period(pyramid, period='1H')
+        six_hourly, six_hourly_coverage = bw.average_data_by_period(pyramid, period='6H', return_coverage=True)
+        daily_std = bw.average_data_by_period(pyramid, period='1D', aggregation_method='std')
+        monthly_coverage = bw.coverage(pyramid, period='1M')
+
+    """
+
+    def __init__(self, data, base_period=None):
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise TypeError('Input must have datetime index')
+        data = data.sort_index()
+        self._is_series = isinstance(data, pd.Series)
+        self.name = data.name if self._is_series else None
+        data = data.to_frame() if self._is_series else data
+        self.data_resolution = _get_data_resolution(data.index)
+        if base_period is None:
+            from pandas.tseries.frequencies import to_offset
+            base_period = to_offset(self.data_resolution)
+        self.base_period = _convert_period(base_period)
+        # Sums are taken about the mean of each column to keep them numerically stable
+        self._shift = data.mean().fillna(0.0)
+        self._count, self._sum, self._sum_sq_dev = _period_statistics(data, self.base_period, self._shift)
+        self._start = data.index[0]
+
+    def __repr__(self):
+        return 'Aggregation Pyramid with base period {0} from {1} to {2}'.format(
+            self.base_period, self._count.index[0], self._count.index[-1])
+
+    @property
+    def index(self):
+        """Starting timestamps of the base periods which contain data."""
+        return self._count.index[(self._count > 0).any(axis=1)]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('An AggregationPyramid can only be sliced by timestamp, e.g. pyramid[date_from:date_to]')
+        return self._subset(self._count.loc[key].index)
+
+    def _copy_with(self, count, sum_, sum_sq_dev):
+        new = object.__new__(AggregationPyramid)
+        new.__dict__.update(self.__dict__)
+        new._count, new._sum, new._sum_sq_dev = count, sum_, sum_sq_dev
+        if len(count) > 0:
+            new._start = max(self._start, count.index[0])
+        return new
+
+    def _subset(self, index):
+        return self._copy_with(self._count.loc[index], self._sum.loc[index], self._sum_sq_dev.loc[index])
+
+    def _mask(self, keep):
+        """Removes the data in the base periods where keep is False, keep can be one value per period or per column."""
+        if isinstance(keep, np.ndarray):
+            keep = pd.DataFrame(np.broadcast_to(keep[:, np.newaxis], self._count.shape),
+                                index=self._count.index, columns=self._count.columns)
+        return self._copy_with(self._count.where(keep, 0), self._sum.where(keep, 0.0),
+                               self._sum_sq_dev.where(keep, 0.0))
+
+    def _check_period(self, period):
+        """Raises an error if the period is not made of whole base periods."""
+        from pandas.tseries.frequencies import to_offset
+        base_offset = to_offset(self.base_period)
+        labels = _resample(self._count.iloc[:, 0], period).count().index
+        labels = labels[(labels >= self._count.index[0]) & (labels <= self._count.index[-1])]
+        if isinstance(base_offset, pd.tseries.offsets.Tick):
+            aligned = ((labels - self._count.index[0]).values.astype(np.int64) % base_offset.nanos == 0).all()
+        else:
+            aligned = all(base_offset.onOffset(label) for label in labels)
+        if not aligned:
+            raise ValueError("Period '{0}' is not a multiple of the base period '{1}' of the AggregationPyramid."
+                             .format(period, self.base_period))
+
+    def _combine(self, period):
+        """
+        Combines the base periods into the coarser period. The sums of squared deviations are combined using the
+        deviation of the mean of each base period from the mean of the coarser period it falls in.
+        """
+        self._check_period(period)
+        count_grouper, sum_grouper = _resample(self._count, period), _resample(self._sum, period)
+        mean_deviation = self._sum / self._count - sum_grouper.transform('sum') / count_grouper.transform('sum')
+        sum_sq_dev = self._sum_sq_dev + (self._count * mean_deviation ** 2).fillna(0.0)
+        return count_grouper.sum(), sum_grouper.sum(), _resample(sum_sq_dev, period).sum()
+
+    def average(self, period, aggregation_method='mean', coverage_threshold=None, return_coverage=False):
+        """
+        Same as average_data_by_period(), see that function's documentation. Only the aggregation methods 'mean',
+        'sum', 'count', 'std' and 'var' are supported.
+        """
+        if coverage_threshold is None:
+            coverage_threshold = 0
+
+        if coverage_threshold < 0 or coverage_threshold > 1:
+            raise TypeError("Invalid coverage_threshold, should be between 0 and 1, both ends inclusive")
+
+        _check_aggregation_method_for_statistics(aggregation_method)
+        count, sum_, sum_sq_dev = self._combine(_convert_period(period))
+        grouped_data = _aggregate_period_statistics(aggregation_method, count, sum_, sum_sq_dev, self._shift)
+        coverage = count.divide(_max_coverage_count(self.data_resolution, count.index), axis=0)
+        if self._is_series:
+            grouped_data = grouped_data.iloc[:, 0].rename(self.name)
+            coverage = coverage.iloc[:, 0].rename(self.name)
+        return _filter_by_coverage(grouped_data, coverage, coverage_threshold, return_coverage)
+
+    def _coarsen(self, base_period, aggregation_method='mean'):
+        """
+        Returns a new pyramid holding one aggregated value for each fully covered period of base_period. This is the
+        same as averaging the data to a coarser resolution with a coverage_threshold of 1, as is done when aligning
+        data of different resolutions for correlations.
+        """
+        from pandas.tseries.frequencies import to_offset
+        count, sum_, sum_sq_dev = self._combine(base_period)
+        full = count.divide(_max_coverage_count(self.data_resolution, count.index), axis=0) >= 1
+        values = _aggregate_period_statistics(aggregation_method, count, sum_, sum_sq_dev, self._shift) - self._shift
+        new = self._copy_with(full.astype(np.int64), values.where(full, 0.0), full * 0.0)
+        new.base_period = base_period
+        new.data_resolution = pd.Timedelta(to_offset(base_period).nanos, unit='ns')
+        return new
 
 
 def adjust_slope_offset(wspd, current_slope, current_offset, new_slope, new_offset):
@@ -311,70 +949,39 @@ def offset_wind_direction(wdir, offset: float):
     :param offset: Offset in degrees can be negative or positive
     :return: Series or Dataframe or single value with offsetted directions
     """
-    if isinstance(wdir, float):
-        return utils._range_0_to_360(wdir + offset)
-    elif isinstance(wdir, pd.DataFrame):
-        return wdir.add(offset).applymap(utils._range_0_to_360)
-    elif isinstance(wdir, pd.Series):
-        return wdir.add(offset).apply(utils._range_0_to_360)
-
-
-def _selective_avg(wspd1, wspd2, wdir, boom_dir1, boom_dir2,
-                   inflow_lower1, inflow_higher1, inflow_lower2, inflow_higher2, sector_width):
-    # duplicate threshold values into lists which are the same length as other inputs
-    inflow_lower1 = [inflow_lower1] * len(wdir)
-    inflow_higher1 = [inflow_higher1] * len(wdir)
-    inflow_lower2 = [inflow_lower2] * len(wdir)
-    inflow_higher2 = [inflow_higher2] * len(wdir)
-
-    # if boom 1 'inflow' sector overlaps with 0/360
-    if ((boom_dir1 + 180) % 360) >= (360 - (sector_width/2)) or ((boom_dir1 + 180) % 360) <= (sector_width/2):
-        # many nested if statments follow, all within one mapped lambda function
-        sel_avg = list(map(lambda spd1,spd2,Dir,inflowlow1,inflowhigh1,inflowlow2,inflowhigh2:
-                           # if one value is Nan, use the other one
-                           spd2 if (np.isnan(spd1)==True) else (spd1 if np.isnan(spd2)==True
-                               # use spd1 if 2 is in mast shadow
-                               else (spd1 if Dir >= inflowlow2 and Dir <= inflowhigh2
-                                  # use spd2 if 1 is in mast shadow ('left' of 360)
-                                  else (spd2 if Dir >= inflowlow1 and Dir <= 360
-                                        # use spd2 if 1 is in mast shadow ('right' of 0)
-                                        else (spd2 if Dir >= 0 and Dir <= inflowhigh1
-                                              # otherwise, selective average
-                                              else (spd1 + spd2)/2)))),
-                           # end of map function, list input variables
-                           wspd1,wspd2,wdir,inflow_lower1,inflow_higher1,inflow_lower2,inflow_higher2))
-
-    # if boom 2 'inflow' sector overlaps with 0/360
-    elif ((boom_dir2 + 180) % 360) >= (360 - (sector_width/2)) or ((boom_dir2 + 180) % 360) <= (sector_width/2):
-        # many nested if statments follow, all within one mapped lambda function
-        sel_avg = list(map(lambda spd1,spd2,Dir,inflowlow1,inflowhigh1,inflowlow2,inflowhigh2:
-                           # if one value is Nan, use the other one
-                           spd2 if (np.isnan(spd1)==True) else (spd1 if np.isnan(spd2)==True
-                               # use spd2 if 1 is in mast shadow
-                               else (spd2 if (Dir >= inflowlow1 and Dir <= inflowhigh1)
-                                  # use spd1 if 2 is in mast shadow ('left' of 360)
-                                  else (spd1 if (Dir >= inflowlow2 and Dir <= 360)
-                                        # use spd1 if 2 is in mast shadow ('right' of 0)
-                                        else (spd1 if (Dir >= 0 and Dir <= inflowhigh2)
-                                              # otherwise, selective average
-                                              else (spd1 + spd2)/2)))),
-                           # end of map function, list input variables
-                           wspd1,wspd2,wdir,inflow_lower1,inflow_higher1,inflow_lower2,inflow_higher2))
-    # if neither boom 'inflow' sectors overlap with 0/360 threshold
-    else:
-        # many nested if statements follow, all within one mapped lambda function
-        sel_avg = list(map(lambda spd1, spd2, Dir, inflowlow1, inflowhigh1, inflowlow2, inflowhigh2:
-                           # if one value is Nan, use the other one
-                           spd2 if np.isnan(spd1)==True else (spd1 if np.isnan(spd2)==True
-                              # use spd2 if 1 is in mast shadow
-                              else (spd2 if (Dir >= inflowlow1 and Dir <= inflowhigh1)
-                                    # use spd1 if 2 is in mast shadow and spd1 is not Nan
-                                    else (spd1 if (Dir >= inflowlow2 and Dir <= inflowhigh2)
-                                           # otherwise, selective average
-                                           else (spd1 + spd2) / 2))),
-                            # end of map function, list input variables
-                            wspd1,wspd2,wdir,inflow_lower1,inflow_higher1,inflow_lower2,inflow_higher2))
-    return sel_avg
+    return utils._range_0_to_360(wdir + offset)
+
+
+def _selective_avg(wspd1, wspd2, wdir, boom_dir1, boom_dir2, sector_width):
+    """
+    Selective average of each pair of columns of the 2D arrays wspd1 and wspd2 where boom_dir1 and boom_dir2 are arrays
+    of the boom directions of each pair. wdir is a 2D array with either one column, used for all pairs, or one column
+    for each pair.
+    """
+    inflow_lower1, inflow_higher1 = _calc_sector_limits(boom_dir1, sector_width)
+    inflow_lower2, inflow_higher2 = _calc_sector_limits(boom_dir2, sector_width)
+    # if boom 1 'inflow' sector overlaps with 0/360, otherwise if boom 2 'inflow' sector overlaps with 0/360
+    wraps1 = _inflow_sector_wraps(boom_dir1, sector_width)
+    wraps2 = ~wraps1 & _inflow_sector_wraps(boom_dir2, sector_width)
+
+    with np.errstate(invalid='ignore'):
+        # boom is in mast shadow, checking 'left' of 360 and 'right' of 0 where the 'inflow' sector overlaps 0/360
+        shadow1 = np.where(wraps1, ((wdir >= inflow_lower1) & (wdir <= 360)) | ((wdir >= 0) & (wdir <= inflow_higher1)),
+                           (wdir >= inflow_lower1) & (wdir <= inflow_higher1))
+        shadow2 = np.where(wraps2, ((wdir >= inflow_lower2) & (wdir <= 360)) | ((wdir >= 0) & (wdir <= inflow_higher2)),
+                           (wdir >= inflow_lower2) & (wdir <= inflow_higher2))
+
+    # conditions are checked in order, the first one that is true picks the speed used. If one speed is Nan use the
+    # other one, when boom 1 'inflow' sector overlaps 0/360 boom 2 shadow is checked first, otherwise boom 1 shadow
+    # is checked first. If neither boom is in mast shadow use the average
+    return np.select([np.isnan(wspd1), np.isnan(wspd2), wraps1 & shadow2, shadow1, shadow2],
+                     [wspd2, wspd1, wspd1, wspd2, wspd1], default=(wspd1 + wspd2) / 2)
+
+
+def _inflow_sector_wraps(boom_dir, sector_width):
+    # True where the 'inflow' sector of the boom overlaps with 0/360
+    inflow_dir = (np.asarray(boom_dir) + 180) % 360
+    return (inflow_dir >= (360 - (sector_width / 2))) | (inflow_dir <= (sector_width / 2))
 
 
 def _calc_sector_limits(boom_dir, sector_width):
@@ -404,20 +1011,27 @@ def selective_avg(wspd_1, wspd_2, wdir, boom_dir_1, boom_dir_2, sector_width=60)
     This function either averages the two wind speed values for a given timestamp or only includes the upstream wind
     speed value when the other is in the wake of the mast.
 
-    :param wspd_1: First wind speed time series
-    :type wspd_1: pandas.Series
-    :param wspd_2: Second wind speed time series
-    :type wspd_2: pandas.Series
-    :param wdir: Wind direction time series
-    :type wdir: pandas.Series
-    :param boom_dir_1: Boom direction in degrees of wspd_1
-    :type boom_dir_1: float
-    :param boom_dir_2: Boom direction in degrees of wspd_2
-    :type boom_dir_1: float
+    Several anemometer pairs, e.g. all the pairs on a mast, can be done in one go by passing a DataFrame of the first
+    anemometer of each pair as wspd_1, a DataFrame of the second anemometer of each pair, in the same order, as wspd_2
+    and a list of boom directions for each.
+
+    :param wspd_1: First wind speed time series, or a DataFrame of the first wind speed of each pair
+    :type wspd_1: pandas.Series or pandas.DataFrame
+    :param wspd_2: Second wind speed time series, or a DataFrame of the second wind speed of each pair
+    :type wspd_2: pandas.Series or pandas.DataFrame
+    :param wdir: Wind direction time series, or a DataFrame of the wind direction to use for each pair
+    :type wdir: pandas.Series or pandas.DataFrame
+    :param boom_dir_1: Boom direction in degrees of wspd_1, or a list with the boom direction of each column of wspd_1
+        if they are not all the same
+    :type boom_dir_1: float or list[float]
+    :param boom_dir_2: Boom direction in degrees of wspd_2, or a list with the boom direction of each column of wspd_2
+        if they are not all the same
+    :type boom_dir_2: float or list[float]
     :param sector_width: Angular width of upstream sector within which a boom is deemed to be in the wake of the mast.
     :type sector_width: float
-    :return: list of speed values for each timestamp of the input time series
-    :rtype: list
+    :return: Selective average wind speed for each timestamp of the input time series. For more than one pair a
+        DataFrame with a column named <wspd_1 column>_<wspd_2 column> for each pair.
+    :rtype: pandas.Series or pandas.DataFrame
 
     **Example usage**
     ::
@@ -428,6 +1042,10 @@ def selective_avg(wspd_1, wspd_2, wdir, boom_dir_1, boom_dir_2, sector_width=60)
         data['sel_avg_80m'] = bw.selective_avg(data.Spd80mN, data.Spd80mS, wdir=data.Dir78mS,
                                                boom_dir_1=0, boom_dir_2=180, sector_width=60)
 
+        # Derive selective averages of the 80 m and 60 m anemometer pairs together
+        sel_avgs = bw.selective_avg(data[['Spd80mN', 'Spd60mN']], data[['Spd80mS', 'Spd60mS']], wdir=data.Dir78mS,
+                                    boom_dir_1=[0, 0], boom_dir_2=[180, 180], sector_width=60)
+
         # When boom directions are specified too close to each other, the 'wake' sectors of each boom are found to
         # overlap.
         data['sel_avg_80m'] = bw.selective_avg(data.Spd80mN, data.Spd80mS, wdir=data.Dir78mS,
@@ -437,39 +1055,90 @@ def selective_avg(wspd_1, wspd_2, wdir, boom_dir_1, boom_dir_2, sector_width=60)
 
 
     """
-    wspd_1 = utils._convert_df_to_series(wspd_1)
-    wspd_2 = utils._convert_df_to_series(wspd_2)
-    wdir = utils._convert_df_to_series(wdir)
-    if _sectors_overlap(boom_dir_1, boom_dir_2, sector_width):
-        raise ValueError("Sectors overlap! Please check your inputs or reduce the size of your 'sector_width'.")
-    inflow_lower1, inflow_higher1 = _calc_sector_limits(boom_dir_1, sector_width)
-    inflow_lower2, inflow_higher2 = _calc_sector_limits(boom_dir_2, sector_width)
-    sel_avg = _selective_avg(wspd_1, wspd_2, wdir, boom_dir_1, boom_dir_2,
-                             inflow_lower1, inflow_higher1, inflow_lower2, inflow_higher2, sector_width)
-    return sel_avg
-
-
-def _preprocess_data_for_correlations(ref: pd.DataFrame, target: pd.DataFrame, averaging_prd, coverage_threshold,
-                                      aggregation_method_ref='mean', aggregation_method_target='mean',
-                                      get_coverage=False):
-    ref_overlap, target_overlap = _get_overlapping_data(ref.sort_index().dropna(), target.sort_index().dropna(),
-                                                        averaging_prd)
+    if isinstance(wspd_1, pd.DataFrame) and wspd_1.shape[1] > 1:
+        wspd_2, wdir = pd.DataFrame(wspd_2), pd.DataFrame(wdir)
+        if wspd_2.shape[1] != wspd_1.shape[1] or wdir.shape[1] not in [1, wspd_1.shape[1]]:
+            raise ValueError("wspd_2 must have a column for each column of wspd_1 and wdir must have either one "
+                             "column or a column for each column of wspd_1.")
+        name = [str(col_1) + '_' + str(col_2) for col_1, col_2 in zip(wspd_1.columns, wspd_2.columns)]
+    else:
+        wspd_1 = utils._convert_df_to_series(wspd_1)
+        wspd_2 = utils._convert_df_to_series(wspd_2)
+        wdir = utils._convert_df_to_series(wdir)
+        name = None
+    n_pairs = 1 if name is None else len(name)
+    boom_dir_1 = np.atleast_1d(np.asarray(boom_dir_1, dtype=float))
+    boom_dir_2 = np.atleast_1d(np.asarray(boom_dir_2, dtype=float))
+    if len(boom_dir_1) not in [1, n_pairs] or len(boom_dir_2) not in [1, n_pairs]:
+        raise ValueError("boom_dir_1 and boom_dir_2 must be a single direction or a direction for each pair.")
+    boom_dir_1, boom_dir_2 = np.broadcast_to(boom_dir_1, n_pairs), np.broadcast_to(boom_dir_2, n_pairs)
+    for boom_dir_1_pair, boom_dir_2_pair in zip(boom_dir_1, boom_dir_2):
+        if _sectors_overlap(boom_dir_1_pair, boom_dir_2_pair, sector_width):
+            raise ValueError("Sectors overlap! Please check your inputs or reduce the size of your 'sector_width'.")
+
+    sel_avg = _selective_avg(np.asarray(wspd_1, dtype=float).reshape(len(wspd_1), -1),
+                             np.asarray(wspd_2, dtype=float).reshape(len(wspd_2), -1),
+                             np.asarray(wdir, dtype=float).reshape(len(wdir), -1),
+                             boom_dir_1, boom_dir_2, sector_width)
+    if name is None:
+        return pd.Series(sel_avg[:, 0], index=wspd_1.index)
+    return pd.DataFrame(sel_avg, index=wspd_1.index, columns=name)
+
+
+def _align_pyramids_for_correlations(ref, target, averaging_prd, aggregation_method_ref='mean',
+                                     aggregation_method_target='mean'):
+    """
+    Equivalent of the overlap and resolution alignment done in _preprocess_data_for_correlations() for when the ref
+    or target is an AggregationPyramid. Data which is not already a pyramid is summarised at its own resolution.
+    """
     from pandas.tseries.frequencies import to_offset
-    ref_resolution = _get_data_resolution(ref_overlap.index)
-    target_resolution = _get_data_resolution(target_overlap.index)
+    if not isinstance(ref, AggregationPyramid):
+        ref = AggregationPyramid(ref.sort_index().dropna())
+    if not isinstance(target, AggregationPyramid):
+        target = AggregationPyramid(target.sort_index().dropna())
+    ref_overlap, target_overlap = _get_overlapping_data(ref, target, averaging_prd)
+    ref_resolution = ref_overlap.data_resolution
+    target_resolution = target_overlap.data_resolution
     if (to_offset(ref_resolution) != to_offset(averaging_prd)) and \
             (to_offset(target_resolution) != to_offset(averaging_prd)):
         if ref_resolution > target_resolution:
-            target_overlap = average_data_by_period(target_overlap, to_offset(ref_resolution),
-                                                    coverage_threshold=1,
-                                                    aggregation_method=aggregation_method_target)
+            target_overlap = target_overlap._coarsen(to_offset(ref_resolution), aggregation_method_target)
         if ref_resolution < target_resolution:
-            ref_overlap = average_data_by_period(ref_overlap, to_offset(target_resolution),
-                                                 coverage_threshold=1,
-                                                 aggregation_method=aggregation_method_ref)
-        common_idxs, data_pts = _common_idxs(ref_overlap, target_overlap)
-        ref_overlap = ref_overlap.loc[common_idxs]
-        target_overlap = target_overlap.loc[common_idxs]
+            ref_overlap = ref_overlap._coarsen(to_offset(target_resolution), aggregation_method_ref)
+        common_idxs = ref_overlap._count.index[(ref_overlap._count > 0).all(axis=1)].intersection(
+            target_overlap._count.index[(target_overlap._count > 0).all(axis=1)])
+        ref_overlap = ref_overlap._mask(ref_overlap._count.index.isin(common_idxs))
+        target_overlap = target_overlap._mask(target_overlap._count.index.isin(common_idxs))
+    return ref_overlap, target_overlap
+
+
+def _preprocess_data_for_correlations(ref: pd.DataFrame, target: pd.DataFrame, averaging_prd, coverage_threshold,
+                                      aggregation_method_ref='mean', aggregation_method_target='mean',
+                                      get_coverage=False):
+    if isinstance(ref, AggregationPyramid) or isinstance(target, AggregationPyramid):
+        ref_overlap, target_overlap = _align_pyramids_for_correlations(ref, target, averaging_prd,
+                                                                       aggregation_method_ref,
+                                                                       aggregation_method_target)
+    else:
+        ref_overlap, target_overlap = _get_overlapping_data(ref.sort_index().dropna(), target.sort_index().dropna(),
+                                                            averaging_prd)
+        from pandas.tseries.frequencies import to_offset
+        ref_resolution = _get_data_resolution(ref_overlap.index)
+        target_resolution = _get_data_resolution(target_overlap.index)
+        if (to_offset(ref_resolution) != to_offset(averaging_prd)) and \
+                (to_offset(target_resolution) != to_offset(averaging_prd)):
+            if ref_resolution > target_resolution:
+                target_overlap = average_data_by_period(target_overlap, to_offset(ref_resolution),
+                                                        coverage_threshold=1,
+                                                        aggregation_method=aggregation_method_target)
+            if ref_resolution < target_resolution:
+                ref_overlap = average_data_by_period(ref_overlap, to_offset(target_resolution),
+                                                     coverage_threshold=1,
+                                                     aggregation_method=aggregation_method_ref)
+            # periods without full coverage are set to NaN, rather than removed, when averaging a DataFrame
+            common_idxs, data_pts = _common_idxs(ref_overlap.dropna(how='all'), target_overlap.dropna(how='all'))
+            ref_overlap = ref_overlap.loc[common_idxs]
+            target_overlap = target_overlap.loc[common_idxs]
 
     if get_coverage:
         return pd.concat([average_data_by_period(ref_overlap, averaging_prd,
@@ -489,18 +1158,128 @@ def _preprocess_data_for_correlations(ref: pd.DataFrame, target: pd.DataFrame, a
         return ref_processed.loc[concurrent_idxs], target_processed.loc[concurrent_idxs]
 
 
+def _preprocess_refs_for_correlations(refs, target, averaging_prd, coverage_threshold, aggregation_method_ref='mean',
+                                      aggregation_method_target='mean'):
+    """
+    Equivalent of _preprocess_data_for_correlations() for many references and one target. The target is sorted,
+    cleaned and averaged once and all the references are aligned with it over a shared overlapping period and index
+    intersection. Returns one DataFrame with a column for each reference followed by the target, for the periods where
+    all of them have data, which can be used to fit models to all of the references together, as in
+    MultipleLinearRegression. Where the references cover different spans these are the periods kept for every pair.
+
+    :param refs: The references, as a DataFrame with a column for each, a dict of names and Series, or a list of
+        Series with different names.
+    :param target: The target
+    :type target: pandas.Series
+    """
+    from pandas.tseries.frequencies import to_offset
+    if isinstance(refs, pd.DataFrame):
+        refs = {col: refs[col] for col in refs.columns}
+    elif not isinstance(refs, dict):
+        refs = {ref.name: ref for ref in refs}
+        if len(refs) != len(set(refs)) or None in refs:
+            raise ValueError("Each reference must have a different name, use a dict to name them.")
+    target = utils._convert_df_to_series(target).sort_index().dropna()
+    refs = {name: utils._convert_df_to_series(ref).sort_index().dropna() for name, ref in refs.items()}
+    if target.name in refs:
+        raise ValueError("The target has the same name as one of the references.")
+
+    # one overlapping period shared by all
+    start = max([target.index[0]] + [ref.index[0] for ref in refs.values()])
+    if isinstance(averaging_prd, str):
+        start = _round_timestamp_down_to_averaging_prd(start, averaging_prd)
+    target = target[start:]
+    refs = {name: ref[start:] for name, ref in refs.items()}
+
+    # bring everything to the coarsest resolution where none of the data is at the averaging period already, so that
+    # only the periods which are complete in all of the data are used
+    resolutions = {name: _get_data_resolution(ref.index) for name, ref in refs.items()}
+    target_resolution = _get_data_resolution(target.index)
+    all_resolutions = list(resolutions.values()) + [target_resolution]
+    if all(to_offset(resolution) != to_offset(averaging_prd) for resolution in all_resolutions) and \
+            len(set(all_resolutions)) > 1:
+        coarsest = max(all_resolutions)
+        if target_resolution < coarsest:
+            target = average_data_by_period(target, to_offset(coarsest), coverage_threshold=1,
+                                            aggregation_method=aggregation_method_target)
+        refs = {name: average_data_by_period(ref, to_offset(coarsest), coverage_threshold=1,
+                                             aggregation_method=aggregation_method_ref)
+                if resolutions[name] < coarsest else ref for name, ref in refs.items()}
+        common_idxs = target.index
+        for ref in refs.values():
+            common_idxs = common_idxs.intersection(ref.index)
+        target = target.loc[common_idxs]
+        refs = {name: ref.loc[common_idxs] for name, ref in refs.items()}
+
+    target_processed = average_data_by_period(target, averaging_prd, coverage_threshold=coverage_threshold,
+                                              aggregation_method=aggregation_method_target)
+    processed = [average_data_by_period(ref, averaging_prd, coverage_threshold=coverage_threshold,
+                                        aggregation_method=aggregation_method_ref).rename(name)
+                 for name, ref in refs.items()]
+    return pd.concat(processed + [target_processed], axis=1, join='inner')
+
+
+def _wind_vector_to_direction(wind_vector):
+    """
+    Returns the direction, between 0 and 360 degrees, of a DataFrame of north (N) and east (E) wind vector components.
+    """
+    return utils._range_0_to_360(np.degrees(np.arctan2(wind_vector['E'], wind_vector['N'])))
+
+
 def _preprocess_dir_data_for_correlations(ref_spd: pd.DataFrame, ref_dir: pd.DataFrame, target_spd: pd.DataFrame,
                                           target_dir: pd.DataFrame, averaging_prd, coverage_threshold):
-    ref_N, ref_E= _compute_wind_vector(ref_spd.sort_index().dropna(), ref_dir.sort_index().dropna().map(math.radians))
-    target_N, target_E = _compute_wind_vector(target_spd.sort_index().dropna(),
-                                              target_dir.sort_index().dropna().map(math.radians))
-    ref_N_avgd, target_N_avgd = _preprocess_data_for_correlations(ref_N, target_N, averaging_prd=averaging_prd,
-                                                                  coverage_threshold=coverage_threshold)
-    ref_E_avgd, target_E_avgd = _preprocess_data_for_correlations(ref_E, target_E, averaging_prd=averaging_prd,
-                                                                  coverage_threshold=coverage_threshold)
-    ref_dir_avgd = np.arctan2(ref_E_avgd, ref_N_avgd).map(math.degrees).map(utils._range_0_to_360)
-    target_dir_avgd = np.arctan2(target_E_avgd, target_N_avgd).map(math.degrees).map(utils._range_0_to_360)
-    return round(ref_dir_avgd.loc[:]), round(target_dir_avgd.loc[:])
+    ref_vector = pd.concat(_compute_wind_vector(ref_spd.sort_index().dropna(),
+                                                np.radians(ref_dir.sort_index().dropna())), axis=1, keys=['N', 'E'])
+    target_vector = pd.concat(_compute_wind_vector(target_spd.sort_index().dropna(),
+                                                   np.radians(target_dir.sort_index().dropna())), axis=1,
+                              keys=['N', 'E'])
+    # N and E components are missing for the same timestamps so can be aligned and averaged together
+    ref_vector_avgd, target_vector_avgd = _preprocess_data_for_correlations(ref_vector, target_vector,
+                                                                            averaging_prd=averaging_prd,
+                                                                            coverage_threshold=coverage_threshold)
+    if coverage_threshold:
+        # periods below the coverage threshold are set to NaN, rather than removed, when averaging a DataFrame
+        common_idxs, data_pts = _common_idxs(ref_vector_avgd.dropna(how='all'), target_vector_avgd.dropna(how='all'))
+        ref_vector_avgd, target_vector_avgd = ref_vector_avgd.loc[common_idxs], target_vector_avgd.loc[common_idxs]
+    return round(_wind_vector_to_direction(ref_vector_avgd)), round(_wind_vector_to_direction(target_vector_avgd))
+
+
+def _offset_timestamps_table(offset, date_from, date_to):
+    """
+    Returns the date_from, date_to and offset of each window as arrays sorted by date_from, NaT for the start or end of
+    the data. Raises an error if any of the windows overlap.
+    """
+    if isinstance(offset, pd.DataFrame):
+        table = offset[['date_from', 'date_to', 'offset']].values.tolist()
+    elif isinstance(offset, (list, tuple)):
+        table = [tuple(window) for window in offset]
+    else:
+        return (pd.DatetimeIndex([pd.to_datetime(date_from)]), pd.DatetimeIndex([pd.to_datetime(date_to)]),
+                pd.TimedeltaIndex([pd.Timedelta(offset)]))
+    if date_from is not None or date_to is not None:
+        raise ValueError("date_from and date_to can't be used with a table of offsets, give them in the table instead.")
+    if len(table) == 0:
+        raise ValueError("The table of offsets is empty.")
+    froms, tos, offsets = zip(*table)
+    froms, tos = pd.DatetimeIndex(pd.to_datetime(list(froms))), pd.DatetimeIndex(pd.to_datetime(list(tos)))
+    offsets = pd.TimedeltaIndex([pd.Timedelta(window_offset) for window_offset in offsets])
+    order = np.argsort(froms.fillna(pd.Timestamp.min).asi8, kind='mergesort')
+    froms, tos, offsets = froms[order], tos[order], offsets[order]
+    if (tos[:-1].isnull() | froms[1:].isnull() | (froms[1:] <= tos[:-1])).any():
+        raise ValueError("The date_from and date_to of the offsets overlap, each timestamp can only be offset once.")
+    return froms, tos, offsets
+
+
+def _offset_timestamps_int64(timestamps, froms, tos, offsets):
+    """
+    Offsets the int64 timestamps which are in each window, from date_from to date_to inclusive, by the window's offset
+    in one pass. Returns the offset timestamps and a mask of the ones which were in a window.
+    """
+    froms = froms.fillna(pd.Timestamp(timestamps[0])).asi8
+    tos = tos.fillna(pd.Timestamp(timestamps[-1])).asi8
+    window = np.searchsorted(froms, timestamps, side='right') - 1
+    in_window = (window >= 0) & (timestamps <= tos[np.maximum(window, 0)])
+    return timestamps + np.where(in_window, offsets.asi8[np.maximum(window, 0)], 0), in_window
 
 
 def offset_timestamps(data, offset, date_from=None, date_to=None, overwrite=False):
@@ -518,14 +1297,19 @@ def offset_timestamps(data, offset, date_from=None, date_to=None, overwrite=Fals
             - Set offset to 1W to add a week and -1W to subtract from each timestamp and so on for 2W, 4W, etc.
             - Set offset to 1M to add a month and -1M to subtract a month from each timestamp and so on for 2M, 3M, etc.
             - Set offset to 1Y to add an year and -1Y to subtract an year from each timestamp and so on for 2Y, 3Y, etc.
+            - To correct several periods at once, e.g. after a logger's clock has been reset many times, give a table
+                of corrections as a list of (date_from, date_to, offset) or a DataFrame with date_from, date_to and
+                offset columns. A date_from or date_to of None means the start or end of the data. The periods can't
+                overlap and are all offset in one go using the original timestamps.
 
-    :type offset: str
+    :type offset: str or list[tuple] or pandas.DataFrame
     :param date_from: (Optional) The timestamp from input data where to start offsetting from.
     :type date_from: str, datetime, dict
     :param date_to: (Optional) The timestamp from input data where to end offsetting.
     :type date_to: str, datetime, dict
     :param overwrite: Change to True to overwrite the unadjusted timestamps if they are same outside of the slice of
-        data you want to offset. False by default.
+        data you want to offset. False by default. Where offset timestamps from two different periods are the same the
+        earlier original timestamp is kept.
     :type overwrite: bool
     :returns: Offsetted DateTimeIndex/Series/DataFrame, same format is input data
 
@@ -553,57 +1337,155 @@ def offset_timestamps(data, offset, date_from=None, date_to=None, overwrite=Fals
         op5 = bw.offset_timestamps(data.index, offset='3.5H', date_from='2016-01-01 00:20:00',
             date_from='2016-01-01 01:40:00')
 
+        #To apply a table of clock corrections in one go
+        clock_corrections = [('2016-01-01 00:20:00', '2016-01-01 01:40:00', '10min'),
+                             ('2016-01-05 12:00:00', '2016-01-09 06:00:00', '-20min'),
+                             ('2016-02-01 00:00:00', None, '1H')]
+        op6 = bw.offset_timestamps(data, offset=clock_corrections, overwrite=True)
+
     """
     import datetime
-    date_from = pd.to_datetime(date_from)
-    date_to = pd.to_datetime(date_to)
-
     if isinstance(data, pd.Timestamp) or isinstance(data, datetime.date)\
             or isinstance(data, datetime.time)\
             or isinstance(data, datetime.datetime):
         return data + pd.Timedelta(offset)
 
-    if isinstance(data, pd.DatetimeIndex):
-        original = pd.to_datetime(data.values)
+    if isinstance(data, pd.Series) or isinstance(data, pd.DataFrame):
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise TypeError('Input must have datetime index')
+        index = data.index
+    else:
+        index = data
+
+    froms, tos, offsets = _offset_timestamps_table(offset, date_from, date_to)
+    original = pd.to_datetime(index.values).asi8
+    shifted, in_window = _offset_timestamps_int64(original, froms, tos, offsets)
 
-        if pd.isnull(date_from):
-            date_from = data[0]
+    if isinstance(data, pd.DatetimeIndex):
+        return pd.DatetimeIndex(np.unique(shifted))
+
+    # where timestamps collide keep the offset one if overwrite, otherwise the one which wasn't offset
+    keep_first = in_window if overwrite else ~in_window
+    order = np.lexsort((np.arange(len(shifted)), ~keep_first, shifted))
+    sorted_shifted = shifted[order]
+    group_start = np.r_[True, sorted_shifted[1:] != sorted_shifted[:-1]][:len(order)]
+    group = np.cumsum(group_start) - 1
+    collides = np.bincount(group, weights=in_window[order]) > 0
+    keep = group_start | ~collides[group]
+    df_copy = data.iloc[order[keep]].copy(deep=False)
+    df_copy.index = pd.DatetimeIndex(sorted_shifted[keep], name=index.name)
+    return df_copy
+
+
+def _lagged_correlations(target, ref, max_lag):
+    """
+    Pearson correlation between each row of target and the same row of ref lagged by -max_lag to max_lag steps,
+    ignoring NaNs. ref has max_lag extra columns before and after the columns of target. All lags are found together
+    from FFT cross-correlations of the masked values, counts, sums and sums of squares. Returns the correlations and
+    the number of data points for each row and lag.
+    """
+    target_mask, ref_mask = ~np.isnan(target), ~np.isnan(ref)
+    target, ref = np.where(target_mask, target, 0.0), np.where(ref_mask, ref, 0.0)
+    # remove the mean of each row to keep the sums of squares small
+    target = np.where(target_mask, target - target.sum(axis=1, keepdims=True) /
+                      np.maximum(target_mask.sum(axis=1, keepdims=True), 1), 0.0)
+    ref = np.where(ref_mask, ref - ref.sum(axis=1, keepdims=True) / np.maximum(ref_mask.sum(axis=1, keepdims=True), 1),
+                   0.0)
+    n_fft = 1 << int(np.ceil(np.log2(target.shape[1] + ref.shape[1])))
+
+    def _cross_correlate(target_values, ref_values):
+        cross = np.fft.irfft(np.conj(np.fft.rfft(target_values, n_fft)) * np.fft.rfft(ref_values, n_fft), n_fft)
+        return cross[:, :2 * max_lag + 1]
+
+    target_mask, ref_mask = target_mask.astype(float), ref_mask.astype(float)
+    num_data_pts = np.round(_cross_correlate(target_mask, ref_mask))
+    sum_target, sum_ref = _cross_correlate(target, ref_mask), _cross_correlate(target_mask, ref)
+    sum_sq_target, sum_sq_ref = _cross_correlate(target ** 2, ref_mask), _cross_correlate(target_mask, ref ** 2)
+    sum_product = _cross_correlate(target, ref)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = (num_data_pts * sum_product - sum_target * sum_ref) / \
+            np.sqrt((num_data_pts * sum_sq_target - sum_target ** 2) * (num_data_pts * sum_sq_ref - sum_ref ** 2))
+    correlation[num_data_pts < 3] = np.NaN
+    return correlation, num_data_pts.astype(int)
+
+
+def detect_timestamp_offsets(ref, target, averaging_prd='1H', max_offset='12H', period='1M', coverage_threshold=0.9):
+    """
+    Finds the offset of the timestamps of target, e.g. because of a logger's clock being set wrongly, by comparing it
+    to a reference such as a reanalysis dataset.
+
+    The ref and target are averaged to the averaging_prd and put on the same regular time grid. For each period, by
+    default each month, the correlation between target and ref is found for every offset from -max_offset to
+    max_offset, in steps of averaging_prd, all at once using FFT cross-correlations. The offset with the highest
+    correlation is the one which should be added to the target timestamps to line them up with the ref. The table
+    returned can be given straight to offset_timestamps() to correct the target.
+
+    :param ref: Reference data, usually wind speed.
+    :type ref: pandas.Series
+    :param target: Data whose timestamps are to be checked, e.g. the mast wind speed.
+    :type target: pandas.Series
+    :param averaging_prd: Period to average the ref and target to before comparing them. This is also the step between
+        the offsets which are tried.
+    :type averaging_prd: str
+    :param max_offset: Largest offset, forwards or backwards, to try.
+    :type max_offset: str
+    :param period: Period for which to find the offset, e.g. '1M' for each month or '1W' for each week.
+    :type period: str
+    :param coverage_threshold: Minimum coverage for each averaging_prd of the ref and target, see
+        average_data_by_period().
+    :type coverage_threshold: float
+    :return: A DataFrame with a row for each period with the date_from and date_to of the target data in the period,
+        the offset found, the correlation at that offset, the correlation with no offset and the number of data points
+        used.
+    :rtype: pandas.DataFrame
 
-        if pd.isnull(date_to):
-            date_to = data[-1]
+    **Example usage**
+    ::
+        import brightwind as bw
+        data = bw.load_csv(bw.datasets.demo_data)
+        m2_ne = bw.load_csv(bw.datasets.demo_merra2_NE)
 
-        shifted_slice = original[(original >= date_from) & (original <= date_to)] + pd.Timedelta(offset)
-        shifted = original[original < date_from].append(shifted_slice)
-        shifted = shifted.append(original[original > date_to])
-        shifted = shifted.drop_duplicates().sort_values()
-        return pd.DatetimeIndex(shifted)
+        offsets = bw.detect_timestamp_offsets(m2_ne['WS50m_m/s'], data['Spd80mN'], averaging_prd='1H',
+                                              max_offset='6H')
+        print(offsets)
 
-    if isinstance(data, pd.Series) or isinstance(data, pd.DataFrame):
+        # Correct the months which are offset
+        data_corrected = bw.offset_timestamps(data, offsets[offsets['offset'] != pd.Timedelta(0)], overwrite=True)
 
-        if not isinstance(data.index, pd.DatetimeIndex):
-            raise TypeError('Input must have datetime index')
-        else:
-            original = pd.to_datetime(data.index.values)
-            df_copy = data.copy(deep=False)
-            if pd.isnull(date_from):
-                date_from = data.index[0]
-
-            if pd.isnull(date_to):
-                date_to = data.index[-1]
-
-            shifted_slice = original[(original >= date_from) & (original <= date_to)] + pd.Timedelta(offset)
-            intersection_front = original[(original < date_from)].intersection(shifted_slice)
-            intersection_back = original[(original > date_to)].intersection(shifted_slice)
-            if overwrite:
-                df_copy = df_copy.drop(intersection_front, axis=0)
-                df_copy = df_copy.drop(intersection_back, axis=0)
-                sec1 = original[original < date_from].drop(intersection_front)
-                sec2 = original[original > date_to].drop(intersection_back)
-                shifted = (sec1.append(shifted_slice)).append(sec2)
-            else:
-                df_copy = df_copy.drop(intersection_front - pd.Timedelta(offset), axis=0)
-                df_copy = df_copy.drop(intersection_back - pd.Timedelta(offset), axis=0)
-                sec_mid = shifted_slice.drop(intersection_front).drop(intersection_back)
-                shifted = (original[(original < date_from)].append(sec_mid)).append(original[(original > date_to)])
-            df_copy.index = shifted
-            return df_copy.sort_index()
+    """
+    ref, target = utils._convert_df_to_series(ref), utils._convert_df_to_series(target)
+    # ref and target are averaged separately, rather than only keeping concurrent periods as for correlations, so
+    # that the ref is still there for the target periods it is compared to when offset
+    ref_avgd = average_data_by_period(ref.dropna(), averaging_prd, coverage_threshold=coverage_threshold)
+    target_avgd = average_data_by_period(target.dropna(), averaging_prd, coverage_threshold=coverage_threshold).dropna()
+    step = pd.Timedelta(averaging_prd)
+    max_lag = int(pd.Timedelta(max_offset) / step)
+    if len(target_avgd) == 0:
+        raise ValueError("There is no concurrent data between ref and target to compare.")
+
+    # put both on one regular grid, with max_lag extra steps at each end for the ref
+    grid = pd.date_range(target_avgd.index[0] - max_lag * step, target_avgd.index[-1] + max_lag * step, freq=step)
+    target_grid = target_avgd.reindex(grid).values.astype(float)
+    ref_grid = ref_avgd.reindex(grid).values.astype(float)
+    target_positions = pd.Series(np.arange(len(grid)), index=grid)[target_avgd.index]
+    periods = _resample(target_positions, _convert_period(period)).agg(['min', 'max']).dropna().astype(int)
+
+    width = (periods['max'] - periods['min']).max() + 1
+    target_rows = np.full((len(periods), width), np.NaN)
+    ref_rows = np.full((len(periods), width + 2 * max_lag), np.NaN)
+    for row, (first, last) in enumerate(zip(periods['min'], periods['max'])):
+        target_rows[row, :last - first + 1] = target_grid[first:last + 1]
+        ref_rows[row, :last - first + 1 + 2 * max_lag] = ref_grid[first - max_lag:last + 1 + max_lag]
+    correlation, num_data_pts = _lagged_correlations(target_rows, ref_rows, max_lag)
+
+    best_lag = np.argmax(np.where(np.isnan(correlation), -np.inf, correlation), axis=1)
+    rows = np.arange(len(periods))
+    target_timestamps = target.dropna().sort_index().index
+    target_dates = _resample(pd.Series(target_timestamps, index=target_timestamps),
+                             _convert_period(period)).agg(['min', 'max']).reindex(periods.index)
+    return pd.DataFrame({'date_from': target_dates['min'],
+                         'date_to': target_dates['max'],
+                         'offset': (best_lag - max_lag) * step,
+                         'correlation': correlation[rows, best_lag],
+                         'correlation_no_offset': correlation[:, max_lag],
+                         'num_data_pts': num_data_pts[rows, best_lag]}, index=periods.index)
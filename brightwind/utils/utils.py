@@ -15,19 +15,106 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import importlib
+import types
 import numpy as np
 import pandas as pd
 
 __all__ = ['slice_data']
 
 
+class _LazyModule(types.ModuleType):
+    """
+    Module type whose attributes listed in the module's _lazy_attributes dict, of names and (module name, attribute)
+    with None for the module itself, are only imported when first used. Set as the __class__ of a package, rather than
+    defining a module level __getattr__, so that it also works before Python 3.7.
+    """
+    _lazy_attributes = {}
+
+    def __getattr__(self, name):
+        if name not in self._lazy_attributes:
+            raise AttributeError("module {!r} has no attribute {!r}".format(self.__name__, name))
+        module_name, attribute = self._lazy_attributes[name]
+        module = importlib.import_module(module_name, self.__name__)
+        value = module if attribute is None else getattr(module, attribute)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+
 def _range_0_to_360(direction):
-    if direction < 0:
-        return direction+360
-    elif direction > 360:
-        return direction % 360
+    """
+    Wraps directions into the range [0, 360), except that a direction of exactly 360 is left as 360. Works
+    element-wise on a single value, a numpy array, a pd.Series or a pd.DataFrame and returns the same type; NaNs are
+    passed through.
+    """
+    wrapped = np.mod(direction, 360)
+    # a tiny negative direction gives exactly 360 after the mod due to float rounding
+    with np.errstate(invalid='ignore'):
+        return wrapped - 360 * (wrapped >= 360) + 360 * (direction == 360)
+
+
+def _angular_difference(from_dir, to_dir):
+    """
+    Returns the signed angle, in the range [-180, 180], to turn from from_dir to to_dir. Positive is clockwise. A
+    difference of exactly 180 or -180 keeps its sign, e.g. from 180 to 0 is -180.
+    """
+    return 180 - _range_0_to_360(180 - (to_dir - from_dir))
+
+
+def _direction_from_components(east, north):
+    """
+    Returns the direction, in the range [0, 360), of vectors given by their east (sine) and north (cosine)
+    components. Where both components are zero the vectors have cancelled out and NaN is returned.
+    """
+    east, north = np.asarray(east, dtype=float), np.asarray(north, dtype=float)
+    direction = np.where((east == 0) & (north == 0), np.NaN, _range_0_to_360(np.rad2deg(np.arctan2(east, north))))
+    if direction.ndim == 0:
+        return np.NaN if np.isnan(direction) else float(direction)
+    return direction
+
+
+def _direction_components(directions, weights=None, decimals=5):
+    """
+    Returns the east (sine) and north (cosine) components of directions, optionally weighted by e.g. wind speed, to be
+    summed for a vector average. The sine and cosine are rounded to 5 decimal places, by default, so that directions
+    which cancel out, e.g. 0 and 180, sum to exactly zero. Set decimals to None to leave them unrounded. Where either
+    the direction or the weight is NaN both components are 0.
+    """
+    directions = np.asarray(directions, dtype=float)
+    if weights is None:
+        weights = np.ones(directions.shape)
     else:
-        return direction
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), directions.shape)
+    valid = ~np.isnan(directions) & ~np.isnan(weights)
+    radians, weights = np.deg2rad(np.where(valid, directions, 0)), np.where(valid, weights, 0)
+    if decimals is None:
+        return np.sin(radians) * weights, np.cos(radians) * weights
+    return np.round(np.sin(radians), decimals) * weights, np.round(np.cos(radians), decimals) * weights
+
+
+def _vector_mean_dir(directions, weights=None, axis=None):
+    """
+    Vector average of directions, optionally weighted by e.g. wind speed, along axis. Pairs where either the direction
+    or the weight is NaN are skipped and directions which cancel out, e.g. 0 and 180, give NaN.
+    """
+    east, north = _direction_components(directions, weights)
+    return _direction_from_components(np.sum(east, axis=axis), np.sum(north, axis=axis))
+
+
+def _circular_std(directions, axis=None):
+    """
+    Circular standard deviation, in degrees, of directions along axis, skipping NaNs. Calculated from the mean
+    resultant length R of the unit vectors of the directions as sqrt(-2 ln R).
+    """
+    # the components are left unrounded as the std is sensitive to R close to 1
+    east, north = _direction_components(directions, decimals=None)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultant = np.hypot(np.sum(east, axis=axis), np.sum(north, axis=axis)) / \
+            np.sum(~np.isnan(np.asarray(directions, dtype=float)), axis=axis)
+        return np.rad2deg(np.sqrt(2 * np.log(1 / np.minimum(resultant, 1))))
 
 
 def get_direction_bin_array(sectors):